@@ -0,0 +1,70 @@
+"""Report the size of polygon layers (json as sent to the map) with and without
+the compact layer mode, for polygon files (X, Y, Z, ID) given on the command
+line or for a synthetic fault file where each fault is split into segments
+
+Usage: PYTHONPATH=. python tests/benchmarks/benchmark_layer_payload.py [polygon files]
+"""
+
+import sys
+import json
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+from webviz_4d._datainput._polygons import make_polyline_layer, make_polygon_layers
+
+
+def make_fault_df(number_of_faults=2000, segments_per_fault=25):
+    """Faults as chains of two point segments, each segment with its own ID"""
+    rng = np.random.default_rng(1)
+    x_values = []
+    y_values = []
+    ids = []
+
+    for fault in range(number_of_faults):
+        start = rng.uniform([450000, 5920000], [470000, 5940000])
+        steps = rng.normal(0, 30, (segments_per_fault, 2)) + [40, 10]
+        points = start + np.vstack([[0, 0], np.cumsum(steps, axis=0)])
+
+        for segment in range(segments_per_fault):
+            x_values.extend(points[segment : segment + 2, 0])
+            y_values.extend(points[segment : segment + 2, 1])
+            ids.extend([fault * segments_per_fault + segment] * 2)
+
+    return pd.DataFrame(
+        {"X": x_values, "Y": y_values, "Z": 1600.0, "ID": np.array(ids, dtype=float)}
+    )
+
+
+def payload_bytes(layer):
+    return len(json.dumps(layer, cls=PlotlyJSONEncoder))
+
+
+def report(name, polygon_df):
+    layer = make_polyline_layer(
+        "zone", polygon_df, "csv", "faultlines", "Faults", "faults", "gray"
+    )
+    print(name, "(points: " + str(len(polygon_df)) + ")")
+
+    for compact, decimals in [(False, None), (True, None), (True, 1), (True, 0)]:
+        layers = make_polygon_layers(layer, compact=compact, decimals=decimals)
+        sizes = [
+            "{}: {:>9} bytes {:>6} polylines".format(
+                level, payload_bytes(level_layer), len(level_layer["data"])
+            )
+            for level, level_layer in layers.items()
+        ]
+        mode = "compact, decimals=" + str(decimals) if compact else "full"
+        print("  {:<22}".format(mode), " | ".join(sizes))
+
+
+def main():
+    if len(sys.argv) > 1:
+        for polygon_file in sys.argv[1:]:
+            report(polygon_file, pd.read_csv(polygon_file))
+    else:
+        report("Synthetic faults", make_fault_df())
+
+
+if __name__ == "__main__":
+    main()
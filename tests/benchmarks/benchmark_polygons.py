@@ -0,0 +1,90 @@
+"""Time convert_polygon_layer and make_polyline_layer on a synthetic fault
+line file (X, Y, Z, ID) and compare with a row by row split. The number of
+points sent to the map for each level of detail is also reported
+
+Usage: PYTHONPATH=. python tests/benchmarks/benchmark_polygons.py [points] [polylines]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from webviz_4d._datainput._polygons import (
+    convert_polygon_layer,
+    make_polyline_layer,
+    make_polygon_layers,
+)
+
+
+def split_rows(polygon_df):
+    """Split into polylines row by row (the implementation before vectorization)"""
+    all_positions = []
+    positions = []
+    poly_id = polygon_df["ID"].iloc[0]
+
+    for _index, row in polygon_df.iterrows():
+        if row["ID"] != poly_id:
+            all_positions.append(positions)
+            positions = []
+            poly_id = row["ID"]
+
+        positions.append([row["X"], row["Y"]])
+
+    all_positions.append(positions)
+
+    return all_positions
+
+
+def make_polygon_df(number_of_points, number_of_polylines):
+    rng = np.random.default_rng(1)
+    ids = np.sort(rng.integers(0, number_of_polylines, number_of_points))
+
+    return pd.DataFrame(
+        {
+            "X": 460000 + np.cumsum(rng.normal(size=number_of_points)),
+            "Y": 5930000 + np.cumsum(rng.normal(size=number_of_points)),
+            "Z": np.full(number_of_points, 1600.0),
+            "ID": ids,
+        }
+    )
+
+
+def main():
+    number_of_points = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    number_of_polylines = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    polygon_df = make_polygon_df(number_of_points, number_of_polylines)
+
+    start = time.perf_counter()
+    positions = split_rows(polygon_df)
+    rows_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layer_df = convert_polygon_layer(polygon_df)
+    convert_time = time.perf_counter() - start
+
+    assert list(layer_df["coordinates"]) == positions
+
+    start = time.perf_counter()
+    layer = make_polyline_layer(
+        "zone", polygon_df, "csv", "faultlines", "Faults", "faults", "gray"
+    )
+    layer_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layers = make_polygon_layers(layer)
+    simplify_time = time.perf_counter() - start
+
+    print("Points, polylines:", number_of_points, len(positions))
+    print("Row by row split:      {:8.3f} s".format(rows_time))
+    print("convert_polygon_layer: {:8.3f} s".format(convert_time))
+    print("make_polyline_layer:   {:8.3f} s".format(layer_time))
+    print("make_polygon_layers:   {:8.3f} s".format(simplify_time))
+
+    for level, level_layer in layers.items():
+        points = sum(len(item["positions"]) for item in level_layer["data"])
+        print("Points ({}): {:>10}".format(level, points))
+
+
+if __name__ == "__main__":
+    main()
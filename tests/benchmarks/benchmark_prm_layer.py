@@ -0,0 +1,105 @@
+"""Time the PRM receiver line layer (make_prm_layer_df and make_polyline_layer)
+on a synthetic receiver grid and compare with a row by row implementation
+
+Usage: PYTHONPATH=. python tests/benchmarks/benchmark_prm_layer.py [lines] [receivers per line]
+"""
+
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+
+from webviz_4d._datainput._polygons import make_prm_layer_df, make_polyline_layer
+
+
+def create_prm_layer_rows(prm_df, layer_name):
+    """Create the PRM layer row by row (the implementation before vectorization)"""
+    layer_df = pd.DataFrame()
+    years = []
+    lines = []
+    coordinates = []
+    coordinates_row = []
+
+    current_line = 1
+    for _index, row in prm_df.iterrows():
+        utmx = float(row["RCV_UTMX"])
+        utmy = float(row["RCV_UTMY"])
+        line = int(row["RECEIVER_LINE"])
+        year = int(row["Installation"])
+
+        if current_line == 1:
+            current_year = year
+
+        if line == current_line:
+            coordinates_row.append([utmx, utmy])
+        else:
+            coordinates.append(coordinates_row)
+            years.append(current_year)
+            lines.append(current_line)
+
+            coordinates_row = []
+            coordinates_row.append([utmx, utmy])
+            current_line = line
+            current_year = year
+
+    coordinates.append(coordinates_row)
+    years.append(current_year)
+    lines.append(current_line)
+
+    layer_df["line"] = lines
+    layer_df["geometry"] = "Polygon"
+    layer_df["coordinates"] = coordinates
+    layer_df["year"] = years
+    layer_df["name"] = layer_name
+
+    return layer_df
+
+
+def make_prm_df(number_of_lines, receivers_per_line):
+    lines = np.repeat(np.arange(1, number_of_lines + 1), receivers_per_line)
+    points = np.tile(np.arange(1, receivers_per_line + 1), number_of_lines)
+
+    return pd.DataFrame(
+        {
+            "Installation": np.where(lines <= number_of_lines // 2, 2018, 2019),
+            "RECEIVER_POINT": points,
+            "RECEIVER_LINE": lines,
+            "RCV_UTMX": 460000 + 50.0 * points,
+            "RCV_UTMY": 5930000 + 300.0 * lines,
+        }
+    )
+
+
+def main():
+    number_of_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    receivers_per_line = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    prm_df = make_prm_df(number_of_lines, receivers_per_line)
+
+    start = time.perf_counter()
+    rows_df = create_prm_layer_rows(prm_df, "prm_receivers")
+    rows_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layer_df = make_prm_layer_df(prm_df, "prm_receivers")
+    vectorized_time = time.perf_counter() - start
+
+    assert layer_df.equals(rows_df)
+
+    # The layer file (csv) stores the coordinates as text
+    layer_df["coordinates"] = layer_df["coordinates"].apply(json.dumps)
+
+    start = time.perf_counter()
+    make_polyline_layer(
+        "additional", layer_df, "csv", "prm_receivers", "PRM", "prm", "black"
+    )
+    layer_time = time.perf_counter() - start
+
+    print("Receivers, lines:", len(prm_df), len(layer_df))
+    print("Row by row:          {:8.3f} s".format(rows_time))
+    print("make_prm_layer_df:   {:8.3f} s".format(vectorized_time))
+    print("make_polyline_layer: {:8.3f} s".format(layer_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare memory use and load time of the production data loaders
+
+Usage: PYTHONPATH=. python tests/benchmarks/benchmark_production_loader.py production_folder
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from webviz_4d._datainput._production import load_production_data
+
+CSV_FILES = ["BORE_OIL_VOL.csv", "BORE_GI_VOL.csv", "BORE_WI_VOL.csv"]
+
+
+def read_csvs(folder, csv_files):
+    """The original loader (read_csvs in _webvizstore.py without webvizstore)"""
+    import pandas as pd
+
+    all_prod_df = pd.DataFrame()
+
+    for name in csv_files:
+        csv_file = os.path.join(folder, name)
+
+        if os.path.isfile(csv_file):
+            prod_df = pd.read_csv(csv_file)
+            all_prod_df = pd.concat([all_prod_df, prod_df])
+
+    all_prod_df.reset_index(inplace=True, drop=True)
+
+    return all_prod_df
+
+
+def megabytes(dataframe):
+    return dataframe.memory_usage(deep=True).sum() / 1024**2
+
+
+def main():
+    folder = sys.argv[1]
+    cache_file = os.path.join(tempfile.mkdtemp(), "production_data.parquet")
+
+    start = time.perf_counter()
+    prod_data = read_csvs(folder, CSV_FILES)
+    csv_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compact_data = load_production_data(folder, CSV_FILES, cache_file)
+    compact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_production_data(folder, CSV_FILES, cache_file)
+    cache_time = time.perf_counter() - start
+
+    print("Rows, columns:", prod_data.shape)
+    print(
+        "read_csvs:            {:8.1f} MB {:8.2f} s".format(
+            megabytes(prod_data), csv_time
+        )
+    )
+    print(
+        "load_production_data: {:8.1f} MB {:8.2f} s".format(
+            megabytes(compact_data), compact_time
+        )
+    )
+    print("  from parquet cache:             {:8.2f} s".format(cache_time))
+    print(
+        "Parquet cache size:   {:8.1f} MB".format(os.path.getsize(cache_file) / 1024**2)
+    )
+
+
+if __name__ == "__main__":
+    main()
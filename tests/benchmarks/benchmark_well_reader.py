@@ -0,0 +1,52 @@
+"""Compare the fast RMS ascii well reader with xtgeo on the test wells
+
+Usage: PYTHONPATH=. python tests/benchmarks/benchmark_well_reader.py [well_folder] [repeats]
+"""
+
+import sys
+import glob
+import time
+from pathlib import Path
+import xtgeo
+
+from webviz_4d._datainput._rms_well import read_rms_well
+
+
+def time_reader(reader, well_files, repeats):
+    start = time.perf_counter()
+
+    for _i in range(repeats):
+        for well_file in well_files:
+            well = reader(well_file)
+            well.rescale(delta=40)
+
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    well_folder = Path(__file__).parents[1] / "data" / "well_data"
+    repeats = 10
+
+    if len(sys.argv) > 1:
+        well_folder = Path(sys.argv[1])
+
+    if len(sys.argv) > 2:
+        repeats = int(sys.argv[2])
+
+    well_files = sorted(glob.glob(str(well_folder / "*.w")))
+
+    xtgeo_time = time_reader(
+        lambda well_file: xtgeo.well_from_file(well_file, mdlogname="MD"),
+        well_files,
+        repeats,
+    )
+    fast_time = time_reader(read_rms_well, well_files, repeats)
+
+    print("Number of wells:", len(well_files))
+    print("xtgeo:       {:8.1f} ms".format(xtgeo_time * 1000))
+    print("fast reader: {:8.1f} ms".format(fast_time * 1000))
+    print("Speed-up:    {:8.1f}x".format(xtgeo_time / fast_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+
+import numpy as np
+import xtgeo
+
+from webviz_4d._datainput._background_jobs import (
+    BackgroundJobs,
+    get_mp_context,
+    run_job,
+    write_json,
+)
+from webviz_4d._datainput._ensemble_statistics import (
+    calculate_statistic,
+    make_statistic_surface,
+)
+
+
+def write_surfaces(tmp_path, number_of_surfaces=3):
+    surface_files = []
+
+    for number in range(number_of_surfaces):
+        surface = xtgeo.RegularSurface(
+            ncol=4, nrow=3, xinc=25, yinc=25, values=float(number)
+        )
+        surface_file = tmp_path / f"realization-{number}.gri"
+        surface.to_file(surface_file)
+        surface_files.append(str(surface_file))
+
+    return surface_files
+
+
+def wait_for_job(jobs, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    status = jobs.status(job_id)
+
+    while status["state"] in ["queued", "running"] and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = jobs.status(job_id)
+
+    return status
+
+
+def test_calculate_statistic():
+    values = np.arange(1.0, 11.0).reshape(10, 1)
+    values[0] = np.nan
+
+    assert calculate_statistic(values, "mean")[0] == 6.0
+    assert calculate_statistic(values, "p90")[0] == calculate_statistic(
+        values[1:], "p90"
+    )
+    assert calculate_statistic(values, "p10")[0] > calculate_statistic(values, "p90")
+
+
+def test_background_job(tmp_path):
+    surface_files = write_surfaces(tmp_path)
+    jobs = BackgroundJobs(tmp_path / "jobs", max_workers=1)
+
+    try:
+        job_id = jobs.submit(make_statistic_surface, surface_files, "mean")
+        status = wait_for_job(jobs, job_id)
+
+        assert status["state"] == "done"
+        assert status["progress"] == 1
+        assert xtgeo.surface_from_file(status["result"]).values.mean() == 1.0
+
+        # The result is reused
+        assert jobs.submit(make_statistic_surface, surface_files, "mean") == job_id
+        assert jobs.status(job_id) == status
+    finally:
+        jobs.shutdown()
+
+
+def test_cancelled_job(tmp_path):
+    surface_files = write_surfaces(tmp_path)
+    jobs = BackgroundJobs(tmp_path / "jobs")
+    job_id = jobs.get_job_id(make_statistic_surface, [surface_files, "mean"])
+
+    jobs.cancel(job_id)
+    status = run_job(
+        jobs.directory, job_id, make_statistic_surface, [surface_files, "mean"]
+    )
+
+    assert status["state"] == "cancelled"
+    assert jobs.status(job_id)["state"] == "cancelled"
+
+    status = run_job(jobs.directory, "missing", make_statistic_surface, [[], "mean"])
+
+    assert status["state"] == "failed"
+
+
+def test_job_id_file_versions(tmp_path):
+    surface_files = write_surfaces(tmp_path)
+    jobs = BackgroundJobs(tmp_path / "jobs")
+    args = (surface_files, "mean")
+    job_id = jobs.get_job_id(make_statistic_surface, args, surface_files)
+
+    assert jobs.get_job_id(make_statistic_surface, args, surface_files) == job_id
+
+    # A rerun realization gives a new job
+    os.utime(surface_files[1], ns=(0, 0))
+    assert jobs.get_job_id(make_statistic_surface, args, surface_files) != job_id
+
+
+def test_remove_old_jobs(tmp_path):
+    jobs = BackgroundJobs(tmp_path / "jobs", max_bytes=2500)
+
+    for number, state in enumerate(["done", "failed", "running", "done"]):
+        job_id = f"job{number}"
+        write_json(os.path.join(jobs.directory, job_id + ".json"), {"state": state})
+
+        with open(os.path.join(jobs.directory, job_id + ".result"), "wb") as stream:
+            stream.write(bytes(1000))
+
+        os.utime(os.path.join(jobs.directory, job_id + ".json"), (number, number))
+
+    jobs.remove_old_jobs()
+
+    # The least recently used completed jobs are removed, running jobs are kept
+    assert sorted(os.listdir(jobs.directory)) == [
+        "job2.json",
+        "job2.result",
+        "job3.json",
+        "job3.result",
+    ]
+
+
+def test_get_mp_context():
+    # Worker processes are not forked while other threads are running
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+
+    try:
+        assert get_mp_context().get_start_method() != "fork"
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_shutdown(tmp_path):
+    surface_files = write_surfaces(tmp_path)
+    jobs = BackgroundJobs(tmp_path / "jobs", max_workers=1)
+    job_ids = [
+        jobs.submit(make_statistic_surface, surface_files, statistic)
+        for statistic in ["mean", "p10", "p50", "p90"]
+    ]
+
+    jobs.shutdown()
+
+    # Jobs not yet sent to the worker are cancelled
+    assert jobs.futures[job_ids[-1]].cancelled()
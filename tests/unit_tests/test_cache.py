@@ -0,0 +1,145 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from webviz_4d._datainput import _surface as surface_module
+from webviz_4d._datainput._cache import LRUCache, SingleFlight
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+
+    # "b" is now the least recently used item
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.keys() == ["a", "c"]
+
+
+def test_lru_cache_get_or_create():
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def create():
+        calls.append(1)
+        return [1, 2, 3]
+
+    assert cache.get_or_create("interval", create) == [1, 2, 3]
+    assert cache.get_or_create("interval", create) == [1, 2, 3]
+    assert len(calls) == 1
+
+
+def test_lru_cache_get_or_create_concurrent():
+    cache = LRUCache(maxsize=2)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def create():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=10)
+        return [1, 2, 3]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.get_or_create, "interval", create)
+        started.wait(timeout=10)
+        second = executor.submit(cache.get_or_create, "interval", create)
+
+        while cache._creating.counters()["collapsed"] < 1:
+            pass
+
+        release.set()
+
+        assert first.result() is second.result()
+
+    assert len(calls) == 1
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load(path):
+        calls.append(path)
+        started.set()
+        release.wait(timeout=10)
+        return {"path": path}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flights.do, "a.gri", load, "a.gri")
+        started.wait(timeout=10)
+        followers = [
+            executor.submit(flights.do, "a.gri", load, "a.gri") for _ in range(3)
+        ]
+
+        while flights.counters()["collapsed"] < 3:
+            pass
+
+        release.set()
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert calls == ["a.gri"]
+    assert all(result is results[0] for result in results)
+    assert flights.counters() == {"calls": 4, "executions": 1, "collapsed": 3}
+
+    # Finished calls are not shared
+    assert flights.do("a.gri", load, "a.gri") is not results[0]
+    assert len(calls) == 2
+
+
+def test_single_flight_error():
+    flights = SingleFlight()
+
+    def load():
+        raise OSError("missing file")
+
+    with pytest.raises(OSError):
+        flights.do("a.gri", load)
+
+    assert flights.counters()["executions"] == 1
+
+
+def test_surface_layer_single_flight(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def make_layer(surface, **_kwargs):
+        calls.append(surface)
+        started.set()
+        release.wait(timeout=10)
+        return {"surface": surface}
+
+    monkeypatch.setattr(surface_module, "_make_surface_layer", make_layer)
+    counters = surface_module.surface_layers.counters()
+    surface_key = ("a.gri", 1)
+
+    # Surfaces loaded separately by each request share the layer render
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(
+            surface_module.make_surface_layer, "surface-1", surface_key=surface_key
+        )
+        started.wait(timeout=10)
+        follower = executor.submit(
+            surface_module.make_surface_layer, "surface-2", surface_key=surface_key
+        )
+
+        while (
+            surface_module.surface_layers.counters()["collapsed"]
+            == counters["collapsed"]
+        ):
+            pass
+
+        release.set()
+
+        assert leader.result() is follower.result()
+
+    assert calls == ["surface-1"]
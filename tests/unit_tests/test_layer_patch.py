@@ -0,0 +1,62 @@
+import dash
+
+from webviz_4d.plugins._surface_viewer_4D._layer_patch import (
+    LayerSignatures,
+    make_layers_patch,
+)
+
+
+def make_layers(surface_url):
+    return [
+        {"name": "amplitude", "data": [{"type": "image", "url": surface_url}]},
+        {"name": "Faults", "data": [{"type": "polyline", "positions": [[0, 0]]}]},
+    ]
+
+
+def test_layer_signatures():
+    layer_signatures = LayerSignatures()
+    layers = make_layers("first.png")
+
+    assert layer_signatures.get(layers[0]) == layer_signatures.get(layers[0])
+    assert layer_signatures.get(layers[0]) != layer_signatures.get(layers[1])
+    assert layer_signatures.get(layers[1]) == layer_signatures.get(
+        make_layers("second.png")[1]
+    )
+
+    # Surface layers are signed by their render key
+    layer_signatures = LayerSignatures()
+    signatures = layer_signatures.get_map(layers, ("first.gri", "amplitude", 1))
+    assert signatures[0] == layer_signatures.get_surface(("first.gri", "amplitude", 1))
+    assert signatures[0] != layer_signatures.get_surface(("first.gri", "amplitude", 2))
+    assert signatures[1] == layer_signatures.get(layers[1])
+    assert id(layers[0]) not in layer_signatures.cache.keys()
+    assert layer_signatures.get_map([], None) == []
+
+
+def test_make_layers_patch():
+    layer_signatures = LayerSignatures()
+    layers = make_layers("first.png")
+    signatures = [layer_signatures.get(layer) for layer in layers]
+
+    # All layers are sent the first time
+    assert make_layers_patch(layers, signatures, None) == (layers, signatures)
+
+    new_layers = make_layers("second.png")
+    new_signatures = [layer_signatures.get(layer) for layer in new_layers]
+    patch, patch_signatures = make_layers_patch(new_layers, new_signatures, signatures)
+
+    assert isinstance(patch, dash.Patch)
+    assert patch_signatures == new_signatures
+
+    operations = patch.to_plotly_json()["operations"]
+    assert [operation["location"] for operation in operations] == [[0]]
+    assert operations[0]["params"]["value"] == new_layers[0]
+
+    # Nothing is sent if no layers have changed
+    assert make_layers_patch(layers, signatures, signatures) == (
+        dash.no_update,
+        dash.no_update,
+    )
+
+    # All layers are sent if the number of layers has changed
+    assert make_layers_patch(layers[:1], signatures[:1], signatures)[0] == layers[:1]
@@ -1,6 +1,8 @@
 import os
 import json
 from pathlib import Path
+import numpy as np
+import pandas as pd
 
 from webviz_4d.plugins._surface_viewer_4D._webvizstore import (
     find_files,
@@ -9,6 +11,18 @@ from webviz_4d.plugins._surface_viewer_4D._webvizstore import (
 from webviz_4d._datainput.common import (
     read_config,
 )
+from webviz_4d._datainput._polygons import (
+    convert_polygon_layer,
+    make_polyline_layer,
+    make_polygon_layers,
+    simplify_positions,
+    get_polygon_files,
+    PolygonFileIndex,
+    read_prm_receivers,
+    make_prm_layer_df,
+    compact_polyline_layer,
+)
+from webviz_4d._datainput._zone_polygon import Polygon
 
 # from webviz_4d._datainput._polygons import (
 #     load_zone_polygons,
@@ -82,3 +96,259 @@ zone_items = {
 
 #         tooltip = data.get("tooltip")
 #         assert tooltip == zone_items[index].get("tooltip")
+
+
+def get_polygon_df():
+    return pd.DataFrame(
+        {
+            "X": [0.0, 1.0, 2.0, 10.0, 11.0, 20.0, 21.0, 22.0],
+            "Y": [0.0, 1.0, 2.0, 10.0, 11.0, 20.0, 21.0, 22.0],
+            "Z": [1000.0] * 8,
+            "ID": [1, 1, 1, 2, 2, 3, 3, 3],
+        }
+    )
+
+
+def test_convert_polygon_layer():
+    polygon_df = get_polygon_df()
+    layer_df = convert_polygon_layer(polygon_df)
+
+    assert list(layer_df["id"]) == [1, 2, 3]
+    assert list(layer_df["geometry"]) == ["Polygon"] * 3
+    assert layer_df["coordinates"][0] == [[0.0, 0.0], [1.0, 1.0], [2.0, 2.0]]
+    assert layer_df["coordinates"][1] == [[10.0, 10.0], [11.0, 11.0]]
+    assert layer_df["coordinates"][2] == [[20.0, 20.0], [21.0, 21.0], [22.0, 22.0]]
+    assert "tooltip" not in layer_df.columns
+
+    # Rows not starting at index 0 (e.g. after filtering on REAL)
+    layer_df = convert_polygon_layer(polygon_df.iloc[3:])
+    assert list(layer_df["id"]) == [2, 3]
+
+    polygon_df["tooltip"] = ["A", "A", "A", "B", "B", "C", "C", "C"]
+    layer_df = convert_polygon_layer(polygon_df)
+    assert list(layer_df["tooltip"]) == ["A", "B", "C"]
+
+
+def test_make_polyline_layer():
+    polygon_df = get_polygon_df()
+    layer = make_polyline_layer(
+        "zone", polygon_df, "csv", "faultlines", "Faults", "topvolantis", "gray"
+    )
+
+    assert layer["name"] == "Faults"
+    assert len(layer["data"]) == 3
+    assert layer["data"][1] == {
+        "type": "polyline",
+        "color": "gray",
+        "positions": [[10.0, 10.0], [11.0, 11.0]],
+        "tooltip": "topvolantis",
+    }
+
+    assert convert_polygon_layer(polygon_df.iloc[:0]).empty
+
+
+def test_simplify_positions():
+    # Points within the tolerance of the line from the first to the last point
+    positions = [[0.0, 0.0], [10.0, 1.0], [20.0, -1.0], [30.0, 0.0]]
+    assert simplify_positions(positions, 2.0).tolist() == [[0.0, 0.0], [30.0, 0.0]]
+    assert len(simplify_positions(positions, 0.5)) == 4
+    assert len(simplify_positions(positions, 0)) == 4
+
+    # Closed outline: a square with extra points on the edges
+    outline = [[0, 0], [5, 0.1], [10, 0], [10, 10], [5, 9.9], [0, 10], [0, 0]]
+    simplified = simplify_positions(outline, 1.0)
+    assert simplified.tolist() == [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+
+    # Outlines are not collapsed
+    assert len(simplify_positions(outline, 100.0)) >= 4
+
+
+def test_make_polygon_layers():
+    angles = np.linspace(0, 2 * np.pi, 361)
+    circle = np.column_stack([1000 * np.cos(angles), 1000 * np.sin(angles)])
+    circle[-1] = circle[0]
+    layer = {
+        "name": "FWL",
+        "checked": True,
+        "base_layer": False,
+        "data": [{"type": "polyline", "positions": circle.tolist(), "tooltip": "fwl"}],
+    }
+
+    layers = make_polygon_layers(layer, {"low": 25, "medium": 10, "high": 0})
+    assert layers["high"] is layer
+
+    points = [len(layers[level]["data"][0]["positions"]) for level in layers]
+    assert points[0] < points[1] < points[2] == 361
+    assert layers["low"]["data"][0]["positions"][0] == circle[0].tolist()
+    assert layers["low"]["data"][0]["positions"][-1] == circle[0].tolist()
+    assert layers["low"]["data"][0]["tooltip"] == "fwl"
+
+    assert make_polygon_layers(None) == {}
+
+
+def test_get_polygon_files(tmp_path):
+    for folder in ["realization-0/iter-0", "iter-0"]:
+        polygon_dir = tmp_path / folder / "share/results/polygons"
+        polygon_dir.mkdir(parents=True)
+        (polygon_dir / "topvolantis--faultlines.csv").write_text("X,Y,Z,ID\n")
+        (polygon_dir / "basevolantis--faultlines.csv").write_text("X,Y,Z,ID\n")
+
+    mapping = pd.DataFrame(
+        {
+            "surface_name": ["topvolantis", "basevolantis"],
+            "faultlines": ["topvolantis", "topvolantis"],
+            "outline_fwl": ["topvolantis", "topvolantis"],
+        }
+    )
+    selection = {
+        "simulated": {
+            "realization": ["realization-0", "realization-1"],
+            "iteration": ["iter-0"],
+        }
+    }
+
+    polygon_files = PolygonFileIndex()
+    paths = get_polygon_files(
+        mapping, selection, "share/results", str(tmp_path), polygon_files
+    )
+
+    assert paths == [
+        str(tmp_path / folder / "share/results/polygons/topvolantis--faultlines.csv")
+        for folder in ["realization-0/iter-0", "iter-0"]
+    ]
+
+    # Lookups use the folder listing from the scan
+    folder = str(tmp_path / "iter-0/share/results/polygons")
+    (tmp_path / "iter-0/share/results/polygons/new--faultlines.csv").write_text("")
+    assert polygon_files.find(folder, "topvolantis--faultlines.csv") == paths[1]
+    assert polygon_files.find(folder, "new--faultlines.csv") is None
+    assert polygon_files.scan(str(tmp_path / "realization-1/iter-0")) is None
+
+
+def test_polygon_file_index_mtime(tmp_path):
+    polygon_file = tmp_path / "topvolantis--faultlines.csv"
+    polygon_file.write_text("")
+    os.utime(polygon_file, (1000, 1000))
+
+    polygon_files = PolygonFileIndex()
+    assert polygon_files.get_mtime(str(polygon_file)) == 1000
+    assert polygon_files.get_mtime(str(tmp_path / "missing.csv")) is None
+
+    # The recorded modification time is used until the folder is rescanned
+    os.utime(polygon_file, (2000, 2000))
+    assert polygon_files.get_mtime(str(polygon_file)) == 1000
+
+    polygon_files.rescan_interval = 0
+    assert polygon_files.get_mtime(str(polygon_file)) == 2000
+
+
+def test_make_prm_layer(tmp_path):
+    prm_file = tmp_path / "prm_receivers.txt"
+    prm_df = pd.DataFrame(
+        {
+            "Installation": [2018, 2018, 2018, 2019, 2019],
+            "RECEIVER_POINT": [1, 2, 3, 1, 2],
+            "RECEIVER_LINE": [1, 1, 1, 2, 2],
+            "RCV_UTMX": [0.0, 1.0, 2.0, 10.0, 11.0],
+            "RCV_UTMY": [5.0, 5.0, 5.0, 6.0, 6.0],
+        }
+    )
+    prm_df.to_csv(prm_file, sep="\t", index=False)
+
+    receivers_df = read_prm_receivers(prm_file)
+    assert list(receivers_df.columns) == [
+        "Installation",
+        "RECEIVER_LINE",
+        "RCV_UTMX",
+        "RCV_UTMY",
+    ]
+
+    layer_df = make_prm_layer_df(receivers_df, "prm_receivers")
+    assert list(layer_df["line"]) == [1, 2]
+    assert list(layer_df["year"]) == [2018, 2019]
+    assert layer_df["coordinates"][1] == [[10.0, 6.0], [11.0, 6.0]]
+
+    # The layer file stores the coordinates as text
+    layer_df["coordinates"] = layer_df["coordinates"].apply(json.dumps)
+    layer = make_polyline_layer(
+        "additional", layer_df, "csv", "prm_receivers", "PRM", "prm", "black"
+    )
+
+    assert [item["tooltip"] for item in layer["data"]] == [
+        "Line 1 (2018)",
+        "Line 2 (2019)",
+    ]
+    assert layer["data"][0]["positions"] == [[0.0, 5.0], [1.0, 5.0], [2.0, 5.0]]
+
+
+def test_compact_polyline_layer():
+    def polyline(positions, tooltip="faults"):
+        return {
+            "type": "polyline",
+            "color": "gray",
+            "positions": positions,
+            "tooltip": tooltip,
+        }
+
+    layer = {
+        "name": "Faults",
+        "checked": True,
+        "base_layer": False,
+        "data": [
+            polyline([[0.04, 0.0], [1.0, 1.01], [1.0, 1.0]]),
+            polyline([[1.0, 1.0], [2.0, 2.0]]),
+            polyline([[2.0, 2.0], [3.0, 3.0]], "other fault"),
+            polyline([[5.0, 5.0], [6.0, 6.0]]),
+        ],
+    }
+
+    compact_layer = compact_polyline_layer(layer, decimals=1)
+    assert compact_layer["name"] == "Faults"
+    assert compact_layer["data"] == [
+        polyline([[0.0, 0.0], [1.0, 1.0], [2.0, 2.0]]),
+        polyline([[2.0, 2.0], [3.0, 3.0]], "other fault"),
+        polyline([[5.0, 5.0], [6.0, 6.0]]),
+    ]
+
+    # The input layer is not changed
+    assert layer["data"][0]["positions"] == [[0.04, 0.0], [1.0, 1.01], [1.0, 1.0]]
+    assert compact_polyline_layer(layer)["data"][0]["positions"][:2] == [
+        [0.04, 0.0],
+        [1.0, 1.01],
+    ]
+
+
+def create_rms_layer_iterrows(polygon_df):
+    """Previous row by row implementation of Polygon.create_rms_layer"""
+    all_positions = []
+    positions = []
+
+    for _index, row in polygon_df.iterrows():
+        if not np.isnan(row["ID"]):
+            if _index == 0:
+                poly_id = row["ID"]
+
+            if row["ID"] != poly_id:
+                all_positions.append(positions)
+                positions = []
+                poly_id = row["ID"]
+
+            positions.append([row["X"], row["Y"]])
+
+    all_positions.append(positions)
+
+    return all_positions
+
+
+def test_polygon_create_rms_layer(tmp_path):
+    polygon_df = get_polygon_df()
+    polygon_df.loc[4, "ID"] = np.nan
+    polygon_file = tmp_path / "topvolantis--outline.csv"
+    polygon_df.to_csv(polygon_file, index=False)
+
+    layer_df = Polygon(str(polygon_file), "Outline").create_rms_layer()
+
+    assert list(layer_df["coordinates"]) == create_rms_layer_iterrows(polygon_df)
+    assert list(layer_df["id"]) == [1, 2, 3]
+    assert list(layer_df["geometry"]) == ["Polygon"] * 3
+    assert list(layer_df["name"]) == ["Outline"] * 3
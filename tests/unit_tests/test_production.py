@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+
+from webviz_4d._datainput._production import (
+    ProductionCube,
+    extract_production_info,
+    load_production_data,
+)
+from webviz_4d._datainput._interval_well_layers import create_interval_layer_data
+
+
+def get_production_data():
+    return pd.DataFrame(
+        {
+            "PDM well name": ["A-1", "A-2", "A-1"],
+            "Production type": ["production", "production", "injection"],
+            "Fluid": ["oil", "oil", "water"],
+            "Start date": ["2019-01-01", "2020-11-01", "2020-01-01"],
+            "Last date": ["2021-05-01", None, None],
+            "2018-01-01-2019-10-01": [10.0, 0.0, 0.0],
+            "2018-01-01-2020-10-01": [20.0, 0.0, 5.0],
+            "2018-01-01-2021-10-01": [30.0, 40.0, 15.0],
+        }
+    )
+
+
+def test_production_cube():
+    cube = ProductionCube(get_production_data())
+
+    assert cube.wells == ["A-1", "A-2"]
+    assert cube.volumes.shape == (2, 2, 2, 4)
+
+    volumes = cube.get_interval_volumes("2019-10-01-2021-10-01", "production", "oil")
+    assert np.allclose(volumes, [20.0, 40.0])
+
+    volumes = cube.get_interval_volumes("2018-01-01-2019-10-01", "production", "oil")
+    assert np.allclose(volumes, [10.0, 0.0])
+
+    volumes = cube.get_interval_volumes("2019-10-01-2021-10-01", "injection", "water")
+    assert np.isnan(volumes[1])
+    assert volumes[0] == 15.0
+
+    assert np.allclose(cube.get_total_volumes("production", "oil"), [30.0, 40.0])
+
+
+def test_extract_production_info():
+    prod_data = get_production_data()
+    cube = ProductionCube(prod_data)
+
+    info = extract_production_info(
+        "A-1", cube, "2019-10-01-2020-10-01", "production", "oil"
+    )
+    assert info == ("2019-01-01", "2021-05-01", 10.0, 30.0)
+
+    info = extract_production_info(
+        "A-2", prod_data, "2019-10-01-2020-10-01", "production", "oil"
+    )
+    assert info == ("2020-11-01", None, None, 40.0)
+
+    info = extract_production_info("A-3", cube, "", "production", "oil")
+    assert info == (None, None, None, None)
+
+
+def test_load_production_data(tmp_path):
+    prod_data = get_production_data()
+    folder = tmp_path / "production"
+    folder.mkdir()
+    prod_data.iloc[:2].to_csv(folder / "BORE_OIL_VOL.csv", index=False)
+    prod_data.iloc[2:].to_csv(folder / "BORE_WI_VOL.csv", index=False)
+    csv_files = ["BORE_OIL_VOL.csv", "BORE_GI_VOL.csv", "BORE_WI_VOL.csv"]
+    cache_directory = tmp_path / "cache"
+
+    compact_data = load_production_data(folder, csv_files, cache_directory)
+
+    assert len(compact_data) == 3
+    assert compact_data["PDM well name"].dtype == "category"
+    assert compact_data["2018-01-01-2021-10-01"].dtype == np.float32
+    assert len(os.listdir(cache_directory)) == 1
+
+    # Nothing is written to the production data folder
+    assert sorted(os.listdir(folder)) == ["BORE_OIL_VOL.csv", "BORE_WI_VOL.csv"]
+
+    cached_data = load_production_data(folder, csv_files, cache_directory)
+    pd.testing.assert_frame_equal(compact_data, cached_data)
+
+    cube = ProductionCube(cached_data)
+    volumes = cube.get_interval_volumes("2019-10-01-2021-10-01", "production", "oil")
+    assert cube.volumes.dtype == np.float32
+    assert np.allclose(volumes, [20.0, 40.0])
+
+    # A removed csv file gives a new cache, which replaces the old one
+    os.remove(folder / "BORE_WI_VOL.csv")
+    compact_data = load_production_data(folder, csv_files, cache_directory)
+
+    assert len(compact_data) == 2
+    assert len(os.listdir(cache_directory)) == 1
+
+
+def test_create_interval_layer_data():
+    cube = ProductionCube(get_production_data())
+    pdm_wells_info = pd.DataFrame(
+        {
+            "wellbore.pdm_name": ["A-1", "A-2"],
+            "wellbore.true_name": ["55/33-A-1", "55/33-A-2"],
+            "wellbore.top_res_md": [1500.0, 1600.0],
+            "top_completion_md": [np.nan, 1700.0],
+            "base_completion_md": [np.nan, np.nan],
+        }
+    )
+
+    layer_data = create_interval_layer_data(
+        cube, pdm_wells_info, "2020-10-01-2019-10-01"
+    )
+
+    producers = layer_data["production"]
+    assert list(producers["true_name"]) == ["55/33-A-1"]
+    assert list(producers["md_start"]) == [1500.0]
+    assert list(producers["color"]) == ["green"]
+    assert list(layer_data["injection"]["true_name"]) == ["55/33-A-1"]
+    assert list(layer_data["injection_start"]["true_name"]) == ["55/33-A-1"]
+
+    # Interval dates between the production dates are interpolated
+    layer_data = create_interval_layer_data(
+        cube, pdm_wells_info, "2020-11-01-2021-06-01"
+    )
+
+    assert list(layer_data["production"]["true_name"]) == ["55/33-A-1", "55/33-A-2"]
+    assert list(layer_data["production_start"]["md_start"]) == [1700.0]
+    assert list(layer_data["production_completed"]["true_name"]) == ["55/33-A-1"]
@@ -0,0 +1,45 @@
+import os
+
+from webviz_4d._datainput._render_cache import DiskRenderCache
+
+
+def test_disk_render_cache(tmp_path):
+    surface_file = tmp_path / "topvolantis--amplitude.gri"
+    surface_file.write_bytes(b"surface")
+    cache = DiskRenderCache(tmp_path / "cache", max_bytes=10000)
+
+    key = cache.get_key(surface_file, ["amplitude", {"min": 0, "max": 3}])
+    layer = {"name": "amplitude", "data": [{"type": "image", "url": "x" * 4000}]}
+
+    assert cache.get(key) is None
+
+    cache.put(key, layer)
+
+    assert cache.get(key) == layer
+    assert cache.get_key(surface_file, ["amplitude", {"max": 3, "min": 0}]) == key
+    assert cache.get_key(surface_file, ["amplitude", {"min": 1, "max": 3}]) != key
+    assert cache.get_key(tmp_path / "missing.gri", []) is None
+
+    # A new version of the surface file gets a new key
+    os.utime(surface_file, ns=(0, 0))
+    assert cache.get_key(surface_file, ["amplitude", {"min": 0, "max": 3}]) != key
+
+
+def test_disk_render_cache_size(tmp_path):
+    # Room for three layers
+    cache = DiskRenderCache(tmp_path / "cache", max_bytes=13000)
+    layer = {"url": "x" * 4000}
+    keys = [f"{number:064x}" for number in range(3)]
+
+    for number, key in enumerate(keys):
+        cache.put(key, layer)
+        os.utime(cache.get_file(key), ns=(number, number))
+
+    # The first layer is used, the second is then the least recently used
+    assert cache.get(keys[0]) == layer
+
+    cache.put(f"{3:064x}", layer)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == layer
+    assert len(cache.get_files()) == 3
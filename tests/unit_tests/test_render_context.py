@@ -0,0 +1,475 @@
+import json
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dash
+from dash import html
+import pandas as pd
+import pytest
+import xtgeo
+import yaml
+from webviz_config.common_cache import CACHE
+
+from webviz_4d.plugins import SurfaceViewer4D
+from webviz_4d._datainput._shared_data import shared_data
+import webviz_4d.plugins._surface_viewer_4D._surface_viewer_4D as surface_viewer
+from webviz_4d.plugins._surface_viewer_4D._render_context import (
+    RenderGenerations,
+    get_surface_type,
+)
+from webviz_4d.plugins._surface_viewer_4D._callbacks import get_maps_to_update
+
+realizations = ["realization-0", "realization-1", "realization-2", "realization-3"]
+interval = "2020-10-01-2019-10-01"
+
+
+def write_case(case_dir):
+    """Write a small FMU case, where the fault polygons are different for each
+    realization (shifted by 1000 * realization number)"""
+    metadata = []
+
+    for number, realization in enumerate(realizations):
+        results_dir = case_dir / "fmu" / realization / "iter-0" / "share" / "results"
+        (results_dir / "maps").mkdir(parents=True)
+        (results_dir / "polygons").mkdir()
+
+        surface_file = (
+            results_dir / "maps" / "topvolantis--amplitude--20201001_20191001.gri"
+        )
+        xtgeo.RegularSurface(
+            ncol=5, nrow=5, xinc=100, yinc=100, values=float(number)
+        ).to_file(surface_file)
+
+        for map_type in ["observed", "simulated"]:
+            metadata.append(
+                [realization, "iter-0", map_type, "2019-10-01", "2020-10-01"]
+                + ["topvolantis", "amplitude", str(surface_file)]
+            )
+
+        pd.DataFrame(
+            {
+                "X": [1000.0 * number, 1000.0 * number + 10],
+                "Y": [0.0, 10.0],
+                "Z": [1600.0, 1600.0],
+                "ID": [1, 1],
+            }
+        ).to_csv(results_dir / "polygons" / "topvolantis--faultlines.csv", index=False)
+
+    pd.DataFrame(
+        metadata,
+        columns=[
+            "fmu_id.realization",
+            "fmu_id.iteration",
+            "map_type",
+            "data.time.t1",
+            "data.time.t2",
+            "data.name",
+            "data.attribute",
+            "filename",
+        ],
+    ).to_csv(case_dir / "surface_metadata.csv", index=False)
+
+    selection = {
+        "attribute": ["amplitude"],
+        "interval": [interval],
+        "iteration": ["iter-0"],
+        "name": ["topvolantis"],
+        "realization": realizations,
+    }
+    (case_dir / "selectors.yaml").write_text(
+        yaml.dump({"observed": selection, "simulated": selection})
+    )
+    (case_dir / "surface_scaling.csv").write_text(
+        "map_type,data.attribute,interval,data.name,lower_limit,upper_limit\n"
+    )
+    (case_dir / "settings.yaml").write_text(
+        yaml.dump({"attribute_settings": {"amplitude": {"min": 0, "max": 3}}})
+    )
+
+    production_dir = case_dir / "production"
+    production_dir.mkdir()
+
+    for name in ["BORE_OIL_VOL.csv", "BORE_GI_VOL.csv", "BORE_WI_VOL.csv"]:
+        (production_dir / name).write_text(
+            "PDM well name,Production type,Fluid,Start date,Last date\n"
+        )
+
+
+def write_well_case(case_dir):
+    """Add well data and production data (for the wells A-1 to A-3) to a case,
+    without precomputed well layers"""
+    well_dir = case_dir / "well_data"
+    well_dir.mkdir()
+    shutil.copy("tests/data/well_data/wellbore_info.csv", well_dir)
+    (well_dir / ".welldata_update.yaml").write_text(
+        "- welldata:\n    update_time: 2022-01-01 00:00:00\n"
+    )
+    (well_dir / ".production_update.yaml").write_text(
+        "- production:\n    start_date: 2018-01-01\n    last_date: 2021-12-01\n"
+    )
+
+    for name, production_type, fluid in [
+        ("BORE_OIL_VOL.csv", "production", "oil"),
+        ("BORE_GI_VOL.csv", "injection", "gas"),
+        ("BORE_WI_VOL.csv", "injection", "water"),
+    ]:
+        pd.DataFrame(
+            {
+                "PDM well name": ["55/33-A-1", "55/33-A-2", "55/33-A-3"],
+                "Production type": production_type,
+                "Fluid": fluid,
+                "Start date": ["2019-01-01", "2020-11-01", "2019-01-01"],
+                "Last date": [None, None, "2021-05-01"],
+                "2018-01-01-2019-10-01": [10.0, 0.0, 30.0],
+                "2018-01-01-2020-10-01": [20.0, 0.0, 60.0],
+                "2018-01-01-2021-10-01": [30.0, 20.0, 60.0],
+            }
+        ).to_csv(case_dir / "production" / name, index=False)
+
+    (case_dir / "well_layers").mkdir()
+    (case_dir / "well_layers" / "well_layers.yaml").write_text(
+        yaml.dump({"basic": {}, "additional": {}})
+    )
+
+    return well_dir
+
+
+@pytest.fixture(name="plugin")
+def fixture_plugin(tmp_path):
+    write_case(tmp_path)
+    plugin = create_plugin(tmp_path)
+
+    yield plugin
+
+    plugin.close()
+
+
+def create_plugin(tmp_path, app=None, shared_settings=None, **kwargs):
+    if app is None:
+        app = dash.Dash(__name__)
+
+    CACHE.init_app(app.server, config={"CACHE_TYPE": "SimpleCache"})
+    app.webviz_settings = {
+        "shared_settings": {
+            "fmu_directory": str(tmp_path / "fmu"),
+            "top_reservoir": {
+                "realization": "realization-0",
+                "iteration": "iter-0",
+                "directory": "share/results",
+                "polygons_directory": "polygons",
+                "polygon_name": "topvolantis",
+            },
+            "additional_well_layers": {},
+            "zone_polygon_layers": {
+                "faults": {
+                    "tagname": "faultlines",
+                    "label": "Faults",
+                    "format": "csv",
+                }
+            },
+        }
+    }
+
+    app.webviz_settings["shared_settings"].update(shared_settings or {})
+
+    map_defaults = {
+        "attribute": "amplitude",
+        "name": "topvolantis",
+        "iteration": "iter-0",
+        "realization": "realization-0",
+        "interval": interval,
+    }
+
+    return SurfaceViewer4D(
+        app,
+        production_data=tmp_path / "production",
+        settings_file=tmp_path / "settings.yaml",
+        surface_metadata_file=tmp_path / "surface_metadata.csv",
+        surface_scaling_file=tmp_path / "surface_scaling.csv",
+        selector_file=tmp_path / "selectors.yaml",
+        map1_defaults=dict(map_defaults, map_type="observed"),
+        map2_defaults=dict(map_defaults, map_type="simulated"),
+        map3_defaults=dict(map_defaults, map_type="simulated"),
+        well_data_reload_interval=0,
+        **kwargs,
+    )
+
+
+def test_get_surface_type():
+    assert get_surface_type("realization-1") == "realization"
+    assert get_surface_type("p50") == "aggregation"
+    assert get_surface_type("2019-10-01---2020-10-01") == "observation"
+
+
+def test_concurrent_make_map(plugin):
+    data = json.dumps({"name": "topvolantis", "attr": "amplitude", "date": interval})
+    attribute_settings = json.dumps(plugin.attribute_settings)
+    requests = [
+        (realizations[number % 4], 1 + number % 2, ["low", "high"][number % 3 == 0])
+        for number in range(200)
+    ]
+
+    def render(request):
+        realization, map_idx, detail_level = request
+        return plugin.make_map(
+            data, "iter-0", realization, attribute_settings, map_idx, detail_level
+        )
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(render, requests))
+
+    for (realization, _map_idx, _detail_level), result in zip(requests, results):
+        heading, sim_info, layers, label, signatures = result
+        number = realizations.index(realization)
+
+        assert heading == "Simulated map: amplitude (topvolantis)"
+        assert sim_info == "iter-0 " + realization
+        assert label != "-"
+
+        fault_layer = layers[1]
+        assert fault_layer["name"] == "Faults"
+        assert fault_layer["data"][0]["positions"][0] == [1000.0 * number, 0.0]
+        assert len(signatures) == len(layers)
+        assert signatures[0].startswith("surface-")
+
+
+def test_make_maps(plugin):
+    data = json.dumps({"name": "topvolantis", "attr": "amplitude", "date": interval})
+    map_requests = [
+        (0, data, "iter-0", "realization-0"),
+        (1, data, "iter-0", "realization-1"),
+        (2, data, "iter-0", "realization-1"),
+    ]
+
+    results = plugin.make_maps(map_requests, json.dumps(plugin.attribute_settings))
+
+    assert [result[1] for result in results] == [
+        "-",
+        "iter-0 realization-1",
+        "iter-0 realization-1",
+    ]
+
+    # The same surface is only rendered once
+    assert results[1][2][0] is results[2][2][0]
+    assert results[0][2][0] is not results[1][2][0]
+
+    # Surface layers are signed by their render key, not kept by the plugin
+    assert results[1][4] == results[2][4]
+    assert results[0][4][0] != results[1][4][0]
+    assert id(results[1][2][0]) not in plugin.layer_signatures.cache.keys()
+    assert id(results[1][2][1]) in plugin.layer_signatures.cache.keys()
+
+
+def test_get_maps_to_update():
+    map_inputs = [["selector", "iteration"], ["selector2"], ["selector3"]]
+
+    assert get_maps_to_update(["iteration"], map_inputs) == [0]
+    assert get_maps_to_update(["selector3", "selector"], map_inputs) == [0, 2]
+    assert get_maps_to_update(["attribute-settings"], map_inputs) == [0, 1, 2]
+    assert get_maps_to_update([], map_inputs) == [0, 1, 2]
+
+
+def test_render_generations():
+    generations = RenderGenerations()
+    first = generations.start(("client", 1))
+    other_map = generations.start(("client", 2))
+
+    assert generations.is_current(("client", 1), first)
+
+    generations.start(("client", 1))
+
+    assert not generations.is_current(("client", 1), first)
+    assert generations.is_current(("client", 2), other_map)
+
+    # Only the most recently rendered maps are kept
+    generations = RenderGenerations(maxsize=2)
+    first = generations.start(("session-1", 0))
+    generations.start(("session-2", 0))
+    generations.start(("session-1", 0))
+    generations.start(("session-3", 0))
+
+    assert generations.is_current(("session-1", 0), first + 1)
+    assert not generations.is_current(("session-2", 0), 1)
+
+
+def test_superseded_render(plugin, monkeypatch):
+    data = json.dumps({"name": "topvolantis", "attr": "amplitude", "date": interval})
+    attribute_settings = json.dumps(plugin.attribute_settings)
+    load_surface = surface_viewer.load_surface
+    loaded = []
+
+    def load_and_click_next(surface_file):
+        # A newer render of map 1 is requested while the surface is loaded
+        loaded.append(surface_file)
+        plugin.render_generations.start(("client", 1))
+        return load_surface(surface_file)
+
+    monkeypatch.setattr(surface_viewer, "load_surface", load_and_click_next)
+
+    map_requests = [
+        (1, data, "iter-0", "realization-1"),
+        (2, data, "iter-0", "realization-2"),
+    ]
+    results = plugin.make_maps(map_requests, attribute_settings, client="client")
+
+    assert len(loaded) == 2
+    assert results[0] is None
+    assert results[1][1] == "iter-0 realization-2"
+
+    # Renders without a client are never superseded
+    result = plugin.make_map(data, "iter-0", "realization-1", attribute_settings, 1)
+
+    assert result[1] == "iter-0 realization-1"
+
+
+def test_shared_plugin_data(tmp_path):
+    write_case(tmp_path)
+    plugin = create_plugin(tmp_path)
+    other_plugin = create_plugin(tmp_path)
+
+    assert other_plugin.well_data_snapshot is plugin.well_data_snapshot
+    assert other_plugin.surface_metadata is plugin.surface_metadata
+    assert other_plugin.polygon_layers_cache is plugin.polygon_layers_cache
+
+    well_data_key = plugin.well_data_key
+    assert shared_data.references(well_data_key) == 2
+
+    plugin.close()
+    assert shared_data.references(well_data_key) == 1
+
+    other_plugin.close()
+    assert shared_data.references(well_data_key) == 0
+
+
+def test_render_cache(tmp_path, monkeypatch):
+    write_case(tmp_path)
+    data = json.dumps({"name": "topvolantis", "attr": "amplitude", "date": interval})
+    plugin = create_plugin(tmp_path, render_cache_directory=tmp_path / "cache")
+    attribute_settings = json.dumps(plugin.attribute_settings)
+    result = plugin.make_map(data, "iter-0", "realization-1", attribute_settings, 1)
+
+    # Another worker gets the surface layer from the cache
+    other_plugin = create_plugin(tmp_path, render_cache_directory=tmp_path / "cache")
+    monkeypatch.setattr(surface_viewer, "load_surface", None)
+    cached_result = other_plugin.make_map(
+        data, "iter-0", "realization-1", attribute_settings, 1
+    )
+
+    assert cached_result[2][0] == json.loads(json.dumps(result[2][0]))
+    assert len(other_plugin.render_cache.get_files()) == 1
+
+    plugin.close()
+    other_plugin.close()
+
+
+def test_statistic_job(tmp_path):
+    write_case(tmp_path)
+    plugin = create_plugin(tmp_path, job_directory=tmp_path / "jobs")
+    data = json.dumps({"name": "topvolantis", "attr": "amplitude", "date": interval})
+
+    # The process pool is only created when a job is started
+    assert plugin.background_jobs.executor is None
+
+    try:
+        job_id = plugin.start_statistic_job(1, data, "iter-0", "mean")
+        status = plugin.background_jobs.status(job_id)
+
+        while status["state"] in ["queued", "running"]:
+            time.sleep(0.1)
+            status = plugin.background_jobs.status(job_id)
+
+        assert status["state"] == "done"
+        assert xtgeo.surface_from_file(status["result"]).values.mean() == 1.5
+
+        job = {
+            "map_idx": 1,
+            "data": data,
+            "iteration": "iter-0",
+            "statistic": "mean",
+            "result": status["result"],
+        }
+        heading, sim_info, layers, _label, signatures = plugin.make_statistic_map(
+            job, json.dumps(plugin.attribute_settings)
+        )
+
+        assert heading == "Simulated map: amplitude (topvolantis)"
+        assert sim_info == "iter-0 mean"
+        assert layers[0]["name"] == "amplitude"
+        assert len(signatures) == len(layers)
+    finally:
+        plugin.close()
+
+
+def test_job_status_callback(tmp_path, monkeypatch):
+    write_case(tmp_path)
+    app = dash.Dash(__name__)
+    plugin = create_plugin(tmp_path, app=app)
+    app.layout = html.Div(plugin.layout)
+    status = {"state": "running", "progress": 0.5, "message": "Realization 2"}
+    monkeypatch.setattr(plugin.background_jobs, "status", lambda _job_id: status)
+
+    key = [key for key in app.callback_map if "job-status" in key][0]
+    callback = app.callback_map[key]
+    outputs = [
+        dict(zip(["id", "property"], output.rsplit(".", 1)))
+        for output in key.strip(".").split("...")
+    ]
+    job = {
+        "job_id": "job",
+        "map_idx": 1,
+        "data": "{}",
+        "iteration": "iter-0",
+        "statistic": "mean",
+        "state": "running",
+    }
+    values = [None, None, 1, 1, "p10", job] + [None] * 6
+    payload = {
+        "output": key,
+        "outputs": outputs,
+        "inputs": [
+            dict(item, value=value) for item, value in zip(callback["inputs"], values)
+        ],
+        "state": [
+            dict(item, value=value)
+            for item, value in zip(callback["state"], values[3:])
+        ],
+        "changedPropIds": [plugin.uuid("job-interval") + ".n_intervals"],
+    }
+    client = app.server.test_client()
+
+    try:
+        # Polls without a change of the job state only update the progress
+        for _poll in range(2):
+            response = client.post("/_dash-update-component", json=payload)
+            assert response.status_code == 200
+
+            outputs = response.get_json()["response"]
+            assert plugin.uuid("job") not in outputs
+            assert outputs[plugin.uuid("job-progress")]["value"] == "0.5"
+            assert outputs[plugin.uuid("job-status")]["children"] == (
+                "mean: running Realization 2"
+            )
+    finally:
+        plugin.close()
+
+
+def test_interval_well_layers(tmp_path):
+    write_case(tmp_path)
+    well_dir = write_well_case(tmp_path)
+    plugin = create_plugin(
+        tmp_path, shared_settings={"additional_well_layers": None}, well_data=well_dir
+    )
+
+    try:
+        # Intervals without precomputed well layers are made from the production data
+        well_layers = plugin.well_data_snapshot.get_interval_well_layers(
+            "2021-10-01-2020-10-01"
+        )
+        names = [layer["name"] for layer in well_layers["high"]]
+
+        assert "Producers" in names
+        assert "Producers - started" in names
+        assert all(layer["data"] for layer in well_layers["high"])
+    finally:
+        plugin.close()
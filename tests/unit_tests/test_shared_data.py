@@ -0,0 +1,38 @@
+import os
+
+from webviz_4d._datainput._shared_data import SharedDataRegistry
+
+
+def test_shared_data_registry(tmp_path):
+    registry = SharedDataRegistry()
+    csv_file = tmp_path / "wellbore_info.csv"
+    csv_file.write_text("wellbore.name\n")
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {"wells": []}
+
+    key, first = registry.acquire("wells", [csv_file], load)
+    other_key, second = registry.acquire("wells", [str(csv_file)], load)
+
+    assert key == other_key
+    assert first is second
+    assert len(loads) == 1
+    assert registry.references(key) == 2
+
+    # Updated files are loaded again
+    os.utime(csv_file, ns=(0, 0))
+    updated_key, updated = registry.acquire("wells", [csv_file], load)
+
+    assert updated_key != key
+    assert updated is not first
+    assert len(loads) == 2
+
+    # The data are released when there are no users left
+    registry.release(key)
+    assert registry.references(key) == 1
+
+    registry.release(key)
+    assert registry.references(key) == 0
+    assert len(registry) == 1
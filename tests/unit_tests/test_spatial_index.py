@@ -0,0 +1,57 @@
+import numpy as np
+
+from webviz_4d._datainput._spatial_index import SpatialIndex, cull_layer
+
+wells = {
+    "A-1": [[0.0, 0.0], [100.0, 0.0], [200.0, 50.0]],
+    "A-2": [[0.0, 500.0], [0.0, 1000.0]],
+    "A-3": [[1000.0, 1000.0], [1200.0, 1200.0], [1500.0, 1250.0]],
+}
+outline = [
+    [-50.0, -50.0],
+    [300.0, -50.0],
+    [300.0, 300.0],
+    [-50.0, 300.0],
+    [-50.0, -50.0],
+]
+
+
+def test_nearest():
+    index = SpatialIndex(wells.keys(), wells.values(), cell_size=100)
+
+    assert index.nearest(150, 10)[0] == "A-1"
+    assert index.nearest(10, 700) == ("A-2", 10.0)
+    assert index.nearest(1100, 1150)[0] == "A-3"
+    assert index.nearest(5000, 5000, max_distance=100) == (None, None)
+
+
+def test_query_bbox():
+    index = SpatialIndex(wells.keys(), wells.values(), cell_size=100)
+
+    assert index.query_bbox_keys(-10, -10, 50, 600) == ["A-1", "A-2"]
+    assert index.query_bbox_keys(1300, 1100, 1400, 1300) == ["A-3"]
+    assert index.query_bbox_keys(2000, 2000, 3000, 3000) == []
+
+
+def test_contains():
+    index = SpatialIndex(["outline", "A-1"], [outline, wells["A-1"]])
+
+    assert index.contains(100, 100) == ["outline"]
+    assert index.contains(500, 100) == []
+
+
+def test_cull_layer():
+    layer = {
+        "name": "Drilled wells",
+        "checked": False,
+        "base_layer": False,
+        "data": [
+            {"type": "polyline", "positions": positions, "tooltip": name}
+            for name, positions in wells.items()
+        ],
+    }
+    index = SpatialIndex.from_layer(layer)
+    culled_layer = cull_layer(layer, index, 900, 900, 2000, 2000)
+
+    assert [item["tooltip"] for item in culled_layer["data"]] == ["A-3"]
+    assert len(layer["data"]) == 3
@@ -0,0 +1,63 @@
+import json
+import shutil
+import subprocess
+
+import dash
+import pytest
+
+from webviz_4d._private_plugins.surface_selector import SurfaceSelector, step_value_js
+
+
+def step_value(triggered_id, value, options):
+    """Run the clientside step callback in node"""
+    script = f"""
+    const dash_clientside = {{
+        no_update: "no_update",
+        callback_context: {{
+            triggered: [{{prop_id: "{triggered_id}.n_clicks", value: 1}}],
+            triggered_id: "{triggered_id}",
+            inputs_list: [{{id: "prev", property: "n_clicks"}}, {{id: "next", property: "n_clicks"}}],
+        }},
+    }};
+    const step = {step_value_js};
+    console.log(JSON.stringify(step(1, 1, {json.dumps(value)}, {json.dumps(options)})));
+    """
+    output = subprocess.run(
+        ["node", "-e", script], capture_output=True, check=True, text=True
+    )
+
+    return json.loads(output.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_step_value_js():
+    options = [{"label": real, "value": real} for real in ["real-0", "real-1"]]
+
+    assert step_value("next", "real-0", options) == "real-1"
+    assert step_value("prev", "real-1", options) == "real-0"
+    assert step_value("next", "real-1", options) == "no_update"
+    assert step_value("prev", "real-5", options) == "no_update"
+    assert step_value("next", 2020, [2019, 2020, 2021]) == 2021
+
+
+def test_selector_layout():
+    selections = {
+        "observed": {
+            "attribute": ["amplitude"],
+            "name": ["topvolantis", "basevolantis"],
+            "interval": ["20201001_20191001"],
+        }
+    }
+    map_defaults = {
+        "map_type": "observed",
+        "attribute": "amplitude",
+        "name": "missing",
+        "interval": "20201001_20191001",
+    }
+    selector = SurfaceSelector(dash.Dash(__name__), selections, map_defaults)
+    layout = selector.layout
+
+    name_dropdown = layout.children[0].children[1].children[1].children[0]
+    assert name_dropdown.id == selector.name_id
+    assert name_dropdown.value == "topvolantis"
+    assert len(name_dropdown.options) == 2
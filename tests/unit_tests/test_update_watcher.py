@@ -0,0 +1,43 @@
+import os
+
+from webviz_4d._datainput._update_watcher import UpdateWatcher
+
+
+def test_update_watcher(tmp_path):
+    update_file = tmp_path / ".production_update.yaml"
+    update_file.write_text("- production:\n")
+    updates = []
+
+    watcher = UpdateWatcher([update_file], lambda: updates.append(1), interval=1)
+
+    assert not watcher.check()
+    assert updates == []
+
+    mtime = os.path.getmtime(update_file)
+    os.utime(update_file, (mtime + 10, mtime + 10))
+
+    assert watcher.check()
+    assert updates == [1]
+    assert not watcher.check()
+
+
+def test_update_watcher_retry(tmp_path):
+    update_file = tmp_path / ".welldata_update.yaml"
+    update_file.write_text("- well_data:\n")
+    updates = []
+
+    def reload():
+        updates.append(1)
+
+        if len(updates) == 1:
+            raise ValueError("half written file")
+
+    watcher = UpdateWatcher([update_file], reload, interval=1)
+    mtime = os.path.getmtime(update_file)
+    os.utime(update_file, (mtime + 10, mtime + 10))
+
+    # The failed update is retried at the next check
+    assert watcher.check()
+    assert watcher.check()
+    assert not watcher.check()
+    assert updates == [1, 1]
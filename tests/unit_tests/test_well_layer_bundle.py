@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+
+from webviz_4d._datainput._well_layer_bundle import (
+    get_bundle_file,
+    get_bundle_version,
+    get_bundle_sources,
+    write_well_layer_bundle,
+    load_well_layer_bundle,
+)
+
+
+def test_well_layer_bundle(tmp_path):
+    well_update = "2022-01-01"
+    production_update = "2021-12-01"
+
+    bundle_file = get_bundle_file(tmp_path, well_update, production_update)
+    version = get_bundle_version(well_update, production_update)
+
+    basic_layers = [
+        {
+            "name": "Drilled wells",
+            "checked": False,
+            "base_layer": False,
+            "data": [
+                {
+                    "type": "polyline",
+                    "color": "black",
+                    "positions": np.array([[1.0, 2.0], [3.0, 4.0]]),
+                    "tooltip": "55/33-A-1",
+                }
+            ],
+        }
+    ]
+    interval_layers = {"2020-10-01-2019-10-01": []}
+
+    write_well_layer_bundle(bundle_file, version, basic_layers, interval_layers)
+    bundle = load_well_layer_bundle(bundle_file, version)
+
+    positions = bundle["basic"][0]["data"][0]["positions"]
+    assert positions == [[1.0, 2.0], [3.0, 4.0]]
+    assert bundle["additional"] == interval_layers
+
+    # A bundle from an older data update is not current
+    old_version = get_bundle_version(well_update, "2021-06-01")
+    assert load_well_layer_bundle(bundle_file, old_version) is None
+
+
+def test_bundle_version_sources(tmp_path):
+    (tmp_path / "basic").mkdir()
+    layer_file = tmp_path / "basic" / "drilled_wells.csv"
+    layer_file.write_text("wellbore.name\n55/33-A-1\n")
+    (tmp_path / "well_layers.yaml").write_text("basic: {}\n")
+    overview = {"basic": {"drilled_wells": "drilled_wells.csv"}, "additional": {}}
+    basic_labels = {"drilled_wells": "Drilled wells"}
+
+    def version(labels=basic_labels, delta=40):
+        sources = get_bundle_sources(
+            overview, tmp_path, "2021-12-01", labels, {}, delta
+        )
+        return get_bundle_version("2022-01-01", "2021-12-01", sources)
+
+    current = version()
+    assert version() == current
+
+    # Changed labels, well resampling or layer files make the bundle stale
+    assert version(labels={"drilled_wells": "Wells"}) != current
+    assert version(delta=20) != current
+
+    mtime = os.stat(layer_file).st_mtime_ns
+    os.utime(layer_file, ns=(mtime + 10**9, mtime + 10**9))
+    assert version() != current
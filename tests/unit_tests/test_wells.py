@@ -11,7 +11,12 @@ from webviz_4d.plugins._surface_viewer_4D._webvizstore import (
 from webviz_4d._datainput.well import (
     load_well,
     load_all_wells,
+    get_position_data,
+    detail_levels,
+    load_resampled_well,
+    prune_well_cache,
 )
+from webviz_4d._datainput._rms_well import read_rms_well, get_short_wellname
 
 test_folder = "tests"
 data_folder = "data"
@@ -60,3 +65,76 @@ def test_load_all_wells():
 
     well_df = all_wells_df[all_wells_df["WELLBORE_NAME"] == well_name]
     assert np.allclose(well.dataframe["MD"].to_list(), well_df["MD"].to_list())
+
+
+def test_detail_levels():
+    well_name = "55/33-A-4"
+
+    wellbore_info = "wellbore_info.csv"
+    wellbore_info = Path(
+        os.path.join(test_folder, data_folder, well_folder, wellbore_info)
+    )
+    all_wells_info = read_csv(csv_file=wellbore_info)
+    all_wells_df = load_all_wells(all_wells_info, 40)
+    well_df = all_wells_df[all_wells_df["WELLBORE_NAME"] == well_name]
+
+    number_of_points = []
+
+    for level in ["low", "medium", "high"]:
+        positions = get_position_data(well_df, 0, np.nan, detail_levels[level])
+        number_of_points.append(len(positions))
+
+    assert number_of_points == sorted(number_of_points)
+    assert number_of_points[0] < number_of_points[-1]
+
+
+def test_read_rms_well():
+    columns = ["X_UTME", "Y_UTMN", "Z_TVDSS", "MD"]
+    well_file = "55_33-A-4.w"
+    well_file = Path(os.path.join(test_folder, data_folder, well_folder, well_file))
+
+    xtgeo_well = xtgeo.well_from_file(well_file, mdlogname="MD")
+    well = read_rms_well(well_file)
+
+    assert well.name == xtgeo_well.name
+    assert well.truewellname == xtgeo_well.truewellname
+    assert well.shortwellname == xtgeo_well.shortwellname
+    assert list(well.dataframe.columns) == columns
+    assert np.allclose(well.dataframe.values, xtgeo_well.dataframe[columns].values)
+
+    xtgeo_well.rescale(delta=40)
+    well.rescale(delta=40)
+
+    assert np.allclose(well.dataframe.values, xtgeo_well.dataframe[columns].values)
+
+
+def test_rescale_zero_delta():
+    well_file = Path(os.path.join(test_folder, data_folder, well_folder, "55_33-A-4.w"))
+    well = read_rms_well(well_file)
+
+    with pytest.raises(ValueError):
+        well.rescale(delta=0)
+
+
+def test_get_short_wellname():
+    assert get_short_wellname("31/2-G-5 AH") == "G-5AH"
+    assert get_short_wellname("6472_11-F-23_AH_T2") == "F-23AHT2"
+
+
+def test_well_cache(tmp_path):
+    source = Path(os.path.join(test_folder, data_folder, well_folder, "55_33-A-4.w"))
+    well_file = tmp_path / "55_33-A-4.w"
+    well_file.write_bytes(source.read_bytes())
+    well_cache = {}
+
+    well = load_resampled_well(well_file, 40, well_cache)
+    assert load_resampled_well(well_file, 40, well_cache) is well
+
+    # A modified file replaces the cached version
+    mtime = os.path.getmtime(well_file)
+    os.utime(well_file, (mtime + 10, mtime + 10))
+    assert load_resampled_well(well_file, 40, well_cache) is not well
+    assert len(well_cache) == 1
+
+    prune_well_cache(well_cache, [])
+    assert well_cache == {}
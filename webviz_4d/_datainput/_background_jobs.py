@@ -0,0 +1,273 @@
+import os
+import json
+import hashlib
+import time
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ._render_cache import remove_file
+from ._shared_data import get_file_versions
+
+
+class JobCancelled(Exception):
+    """Raised in a job when it has been cancelled"""
+
+
+def write_json(json_file, content):
+    """Write a json file atomically (a temporary file is renamed)"""
+    handle, temp_file = tempfile.mkstemp(dir=os.path.dirname(json_file), suffix=".tmp")
+
+    with os.fdopen(handle, "w", encoding="utf-8") as stream:
+        json.dump(content, stream)
+
+    os.replace(temp_file, json_file)
+
+
+def read_json(json_file):
+    try:
+        with open(json_file, encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+class JobProgress:
+    """Progress reporting for a running job (passed to the job function). The
+    progress is written to the status file of the job, and update() raises
+    JobCancelled if the job has been cancelled. The job function writes its
+    result to result_file"""
+
+    def __init__(self, job_dir, job_id):
+        self.status_file = os.path.join(job_dir, job_id + ".json")
+        self.cancel_file = os.path.join(job_dir, job_id + ".cancel")
+        self.result_file = os.path.join(job_dir, job_id + ".result")
+
+    def cancelled(self):
+        return os.path.exists(self.cancel_file)
+
+    def update(self, progress, message=""):
+        """Report the progress (0 - 1) and check if the job has been cancelled"""
+        if self.cancelled():
+            raise JobCancelled()
+
+        write_json(
+            self.status_file,
+            {"state": "running", "progress": progress, "message": message},
+        )
+
+
+def run_job(job_dir, job_id, function, args):
+    """Run a job in a worker process, function(*args, progress) returns the
+    result file name. The final state is written to the status file"""
+    progress = JobProgress(job_dir, job_id)
+
+    try:
+        progress.update(0, "Started")
+        result = function(*args, progress)
+        status = {"state": "done", "progress": 1, "message": "", "result": result}
+    except JobCancelled:
+        status = {"state": "cancelled", "progress": 0, "message": "Cancelled"}
+    except Exception as error:
+        status = {"state": "failed", "progress": 0, "message": str(error)}
+
+    write_json(progress.status_file, status)
+
+    return status
+
+
+def get_mp_context():
+    # Spawned (and forkserver) processes run the main module (the webviz app)
+    # again, forked processes do not. A process forked while other threads
+    # hold locks may deadlock, so fork is only used while the process has a
+    # single thread
+    start_methods = multiprocessing.get_all_start_methods()
+
+    if "fork" in start_methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+
+    if "forkserver" in start_methods:
+        return multiprocessing.get_context("forkserver")
+
+    return multiprocessing.get_context("spawn")
+
+
+class BackgroundJobs:
+    """Long running jobs (e.g. ensemble statistics) in a local process pool.
+    The job table is kept on local disk (one status file per job), so the
+    status of a job can be polled from any worker process. A job is identified
+    by its function, arguments and input file versions, and the result of a
+    completed job is reused as long as its result file exists. Queued or
+    running jobs without a status update for stale_after seconds (e.g. after a
+    restart) are started again. The least recently used completed jobs are
+    removed when the total size of the job files exceeds max_bytes"""
+
+    def __init__(self, directory, max_workers=2, stale_after=600, max_bytes=1024**3):
+        self.directory = str(directory)
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self.max_bytes = max_bytes
+        self.executor = None
+        self.futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _start(self):
+        # The process pool is created when the first job is submitted
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=get_mp_context()
+            )
+
+    def get_job_id(self, function, args, files=()):
+        """Return the id of a job, the modification times of the input files
+        are included so a job is run again when its input has changed"""
+        content = json.dumps(
+            [function.__module__, function.__name__, args, get_file_versions(files)],
+            default=str,
+        )
+
+        return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+    def submit(self, function, *args, files=()):
+        """Start a job (function(*args, progress)) unless the same job is
+        running or has completed, and return the job id. files are the input
+        files of the job"""
+        job_id = self.get_job_id(function, args, files)
+
+        with self._lock:
+            status = self.status(job_id)
+
+            if status["state"] in ["queued", "running"] and not self.is_stale(job_id):
+                future = self.futures.get(job_id)
+
+                # Jobs started by other processes are not restarted
+                if future is None or not future.done():
+                    return job_id
+
+            if status["state"] == "done" and os.path.exists(status.get("result", "")):
+                # The modification time of the status file is used as last use time
+                try:
+                    os.utime(os.path.join(self.directory, job_id + ".json"))
+                except OSError:
+                    pass
+
+                return job_id
+
+            self._start()
+
+            cancel_file = os.path.join(self.directory, job_id + ".cancel")
+
+            if os.path.exists(cancel_file):
+                os.remove(cancel_file)
+
+            write_json(
+                os.path.join(self.directory, job_id + ".json"),
+                {"state": "queued", "progress": 0, "message": "Queued"},
+            )
+            try:
+                future = self.executor.submit(
+                    run_job, self.directory, job_id, function, args
+                )
+            except BrokenProcessPool:
+                # A worker has died, the jobs are run in a new pool
+                self.executor = None
+                self._start()
+                future = self.executor.submit(
+                    run_job, self.directory, job_id, function, args
+                )
+
+            self.futures[job_id] = future
+            self.remove_old_jobs()
+
+        return job_id
+
+    def get_jobs(self):
+        """Return (last use time, size, job id) for the jobs in the directory,
+        except the queued and running jobs"""
+        jobs = {}
+
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            # Temporary files left by writes which did not complete
+            if entry.name.endswith(".tmp"):
+                if time.time() - stat.st_mtime > 3600:
+                    remove_file(entry.path)
+
+                continue
+
+            job_id = entry.name.split(".")[0]
+            mtime, size = jobs.get(job_id, (0, 0))
+
+            if entry.name.endswith(".json"):
+                mtime = stat.st_mtime_ns
+
+            jobs[job_id] = (mtime, size + stat.st_size)
+
+        return [
+            (mtime, size, job_id)
+            for job_id, (mtime, size) in jobs.items()
+            if self.status(job_id)["state"] not in ["queued", "running"]
+            or self.is_stale(job_id)
+        ]
+
+    def remove_old_jobs(self):
+        """Remove the files of the least recently used jobs until the total size
+        is below max_bytes"""
+        jobs = self.get_jobs()
+        total_size = sum(size for _mtime, size, _job_id in jobs)
+
+        for _mtime, size, job_id in sorted(jobs):
+            if total_size <= self.max_bytes:
+                break
+
+            for suffix in [".json", ".result", ".cancel"]:
+                remove_file(os.path.join(self.directory, job_id + suffix))
+
+            total_size -= size
+
+    def is_stale(self, job_id):
+        try:
+            updated = os.path.getmtime(os.path.join(self.directory, job_id + ".json"))
+        except OSError:
+            return True
+
+        return time.time() - updated > self.stale_after
+
+    def status(self, job_id):
+        """Return the state (queued, running, done, cancelled, failed or
+        unknown), progress, message and result (when done) of a job"""
+        status = read_json(os.path.join(self.directory, job_id + ".json"))
+
+        if status is None:
+            return {"state": "unknown", "progress": 0, "message": ""}
+
+        return status
+
+    def cancel(self, job_id):
+        """Cancel a job, a running job stops at its next progress update"""
+        with open(os.path.join(self.directory, job_id + ".cancel"), "w"):
+            pass
+
+        future = self.futures.get(job_id)
+
+        if future is not None and future.cancel():
+            write_json(
+                os.path.join(self.directory, job_id + ".json"),
+                {"state": "cancelled", "progress": 0, "message": "Cancelled"},
+            )
+
+    def shutdown(self):
+        # The pending jobs are cancelled (shutdown(cancel_futures=True) is
+        # not available in python 3.8)
+        for future in self.futures.values():
+            future.cancel()
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
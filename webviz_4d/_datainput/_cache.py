@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread safe cache which keeps a limited number of items and discards
+    the least recently used item when the limit is exceeded"""
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+        self._creating = SingleFlight()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def keys(self):
+        with self._lock:
+            return list(self._items.keys())
+
+    def get(self, key, default=None):
+        """Return a cached item and mark it as the most recently used"""
+        with self._lock:
+            if key not in self._items:
+                return default
+
+            self._items.move_to_end(key)
+
+            return self._items[key]
+
+    def put(self, key, value):
+        """Add an item to the cache, discard the oldest items if needed"""
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+
+            while self.maxsize is not None and len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def get_or_create(self, key, create_function):
+        """Return a cached item, or create and cache it if not existing.
+        The item is created outside the lock, so slow create functions do
+        not block lookups of other items. Concurrent callers asking for the
+        same missing item wait for one creation"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        return self._creating.do(key, self._create, key, create_function)
+
+    def _create(self, key, create_function):
+        # The item may have been created by a flight which just completed
+        with self._lock:
+            if key in self._items:
+                return self._items[key]
+
+        value = create_function()
+        self.put(key, value)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread safe deduplication of concurrent calls. The first caller for a
+    key runs the function, callers with the same key arriving before it has
+    finished wait for its result (or exception) instead of running it again"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """Return function(*args, **kwargs), shared with concurrent callers
+        using the same key"""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+
+            if leader:
+                self.executions += 1
+                flight = self._flights[key] = _Flight()
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            flight.done.wait()
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.result
+
+        try:
+            flight.result = function(*args, **kwargs)
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+            flight.done.set()
+
+        return flight.result
+
+    def counters(self):
+        """Number of calls, executions and calls collapsed into a running call"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "collapsed": self.collapsed,
+            }
@@ -31,6 +31,17 @@ def get_additional_well_layers(additional_well_layers):
     return additional_well_layers
 
 
+def get_well_layer_labels(shared_settings):
+    """Return the labels of the basic and the additional (interval) well layers,
+    used both by the plugin and when well layer bundles are created"""
+    basic_well_layers = get_basic_well_layers(shared_settings.get("basic_well_layers"))
+    additional_well_layers = get_additional_well_layers(
+        shared_settings.get("additional_well_layers")
+    )
+
+    return basic_well_layers, additional_well_layers
+
+
 def get_polygon_tagnames(shared_settings, polygon_class):
     polygon_layers = shared_settings.get(polygon_class + "_polygon_layers", None)
     polygon_tagnames = []
@@ -0,0 +1,55 @@
+import numpy as np
+import xtgeo
+
+ensemble_statistics = ["mean", "stddev", "p10", "p50", "p90"]
+
+
+def calculate_statistic(values, statistic):
+    """Calculate a statistic over the realizations (first axis) of stacked
+    surface values, undefined values are nan. The percentiles follow the
+    reservoir convention, p10 is the high case (90th percentile)"""
+    if statistic == "mean":
+        return np.nanmean(values, axis=0)
+
+    if statistic == "stddev":
+        return np.nanstd(values, axis=0)
+
+    if statistic in ["p10", "p50", "p90"]:
+        return np.nanpercentile(values, 100 - int(statistic[1:]), axis=0)
+
+    raise ValueError("Unknown statistic: " + str(statistic))
+
+
+def make_statistic_surface(surface_files, statistic, progress):
+    """Background job: calculate a statistic surface from the realization
+    surfaces, progress is reported for each surface read"""
+    if not surface_files:
+        raise ValueError("No realization surfaces found")
+
+    template = None
+    values = None
+
+    for index, surface_file in enumerate(surface_files):
+        progress.update(
+            index / (len(surface_files) + 1),
+            f"Reading surface {index + 1} of {len(surface_files)}",
+        )
+        surface = xtgeo.surface_from_file(surface_file)
+
+        if template is None:
+            template = surface
+            values = np.full(
+                (len(surface_files),) + surface.values.shape, np.nan, dtype=np.float32
+            )
+
+        values[index] = np.ma.filled(surface.values.astype(np.float32), np.nan)
+
+    progress.update(len(surface_files) / (len(surface_files) + 1), "Calculating")
+
+    with np.errstate(all="ignore"):
+        result = calculate_statistic(values, statistic)
+
+    template.values = np.ma.masked_invalid(result)
+    template.to_file(progress.result_file, fformat="irap_binary")
+
+    return progress.result_file
@@ -0,0 +1,183 @@
+"""Interval well layers (producers, injectors, started and completed wells)
+derived directly from the production data, for intervals without
+precomputed well layer files"""
+
+import numpy as np
+import pandas as pd
+
+from webviz_4d._datainput._production import (
+    check_interval,
+    check_interval_dates,
+    get_info,
+    make_well_layers,
+)
+
+fluid_colors = {"oil": "green", "gas": "red", "water": "blue", "wag": "purple"}
+production_types = ["production", "injection"]
+
+
+def get_wellbores(pdm_wells_info):
+    """Return PDM well name, true name and completed section (MD) of the wellbores"""
+    wellbores = pd.DataFrame()
+    wellbores["pdm_name"] = pdm_wells_info["wellbore.pdm_name"].values
+    wellbores["true_name"] = pdm_wells_info["wellbore.true_name"].values
+
+    # Use the top reservoir if the completion depths are not known
+    md_start = pdm_wells_info.get("top_completion_md")
+    md_top_res = pdm_wells_info.get("wellbore.top_res_md")
+
+    if md_start is None:
+        md_start = md_top_res
+    elif md_top_res is not None:
+        md_start = md_start.fillna(md_top_res)
+
+    md_end = pdm_wells_info.get("base_completion_md")
+
+    wellbores["md_start"] = np.nan if md_start is None else md_start.values
+    wellbores["md_end"] = np.nan if md_end is None else md_end.values
+
+    return wellbores.dropna(subset=["pdm_name"])
+
+
+def get_tooltips(names, start_dates, stop_dates, fluids, volumes):
+    tooltips = []
+
+    for name, start_date, stop_date, fluid, volume in zip(
+        names, start_dates, stop_dates, fluids, volumes
+    ):
+        volume = None if np.isnan(volume) else volume
+        info = get_info(start_date, stop_date, fluid, volume)
+        tooltips.append(name if info is None else name + " " + info)
+
+    return tooltips
+
+
+def classify_wells(production_cube, interval, production_type):
+    """Return a dataframe with the status in an interval for all wells with a
+    given production type, one row for each well and fluid. A well injecting
+    more than one fluid in the interval is marked as a WAG injector"""
+    interval = check_interval(interval)
+    type_index = production_cube.type_index.get(production_type)
+
+    if type_index is None:
+        return pd.DataFrame()
+
+    well_status = []
+
+    for fluid in production_cube.fluids:
+        fluid_index = production_cube.fluid_index[fluid]
+        exists = production_cube.exists[:, type_index, fluid_index]
+
+        if not exists.any():
+            continue
+
+        start_dates = production_cube.start_dates[:, type_index, fluid_index]
+        stop_dates = production_cube.stop_dates[:, type_index, fluid_index]
+        volumes = production_cube.get_interval_volumes(
+            interval, production_type, fluid, interpolate=True
+        )
+
+        status = pd.DataFrame(
+            {
+                "pdm_name": production_cube.wells,
+                "fluid": fluid,
+                "start_date": start_dates,
+                "stop_date": stop_dates,
+                "volume": volumes.astype(float),
+                "active": np.nan_to_num(volumes) > 0,
+                "started": check_interval_dates(interval, start_dates) == "inside",
+                "completed": check_interval_dates(interval, stop_dates) == "inside",
+            }
+        )
+        well_status.append(status[exists])
+
+    if not well_status:
+        return pd.DataFrame()
+
+    well_status = pd.concat(well_status, ignore_index=True)
+
+    if production_type == "injection":
+        active = well_status[well_status["active"]]
+        wag_wells = active["pdm_name"][active["pdm_name"].duplicated()].unique()
+        wag = well_status["pdm_name"].isin(wag_wells)
+
+        # One WAG row per well, with the first start date and the total volume
+        wag_status = well_status[wag & well_status["active"]]
+        wag_status = wag_status.groupby("pdm_name", as_index=False, sort=False).agg(
+            {
+                "start_date": "first",
+                "stop_date": "first",
+                "volume": "sum",
+                "started": "any",
+                "completed": "all",
+            }
+        )
+        wag_status["fluid"] = "wag"
+        wag_status["active"] = True
+
+        well_status = pd.concat(
+            [well_status[~(wag & well_status["active"])], wag_status],
+            ignore_index=True,
+        )
+
+    return well_status
+
+
+def create_interval_layer_data(production_cube, pdm_wells_info, interval):
+    """Return the well layer data (true_name, md_start, md_end, color and tooltip)
+    for the producers/injectors and started/completed wells in an interval"""
+    wellbores = get_wellbores(pdm_wells_info)
+    layer_data = {}
+
+    for production_type in production_types:
+        well_status = classify_wells(production_cube, interval, production_type)
+
+        if well_status.empty:
+            well_status = pd.DataFrame(
+                columns=["pdm_name", "fluid", "active", "started", "completed"]
+            )
+
+        well_status = well_status.merge(wellbores, on="pdm_name")
+        well_status["color"] = well_status["fluid"].map(fluid_colors).fillna("black")
+        well_status["tooltip"] = get_tooltips(
+            well_status["true_name"],
+            well_status.get("start_date", []),
+            well_status.get("stop_date", []),
+            well_status["fluid"],
+            well_status.get("volume", []),
+        )
+
+        columns = ["true_name", "md_start", "md_end", "color", "tooltip"]
+        selections = {
+            production_type: well_status["active"],
+            production_type + "_start": well_status["started"],
+            production_type + "_completed": well_status["completed"],
+        }
+
+        for key, selected in selections.items():
+            layer_data[key] = well_status.loc[selected.astype(bool), columns]
+
+    return layer_data
+
+
+def create_interval_well_layers(
+    production_cube, pdm_wells_info, wells_df, interval, labels, levels=None
+):
+    """Return the interval well layers, one list of layers for each level of
+    detail, for all layer keys with a label"""
+    layer_data = create_interval_layer_data(production_cube, pdm_wells_info, interval)
+    interval_well_layers = None
+
+    for key, label in labels.items():
+        if key not in layer_data or label is None:
+            continue
+
+        well_layers = make_well_layers(layer_data[key], wells_df, label, levels)
+
+        if interval_well_layers is None:
+            interval_well_layers = {level: [] for level in well_layers}
+
+        for level, well_layer in well_layers.items():
+            interval_well_layers[level].append(well_layer)
+
+    return interval_well_layers or {}
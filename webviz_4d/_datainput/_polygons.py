@@ -1,9 +1,10 @@
 import os
+import time
+import numpy as np
 import pandas as pd
 import json
 import glob
 
-
 default_colors = {
     "field_outline": "lightslategray",
     "fwl": "lightslategray",
@@ -14,6 +15,10 @@ default_colors = {
 
 checked = {"OWC": True, "GOC": True, "FWL": True, "Faults": True, "Field outline": True}
 
+# Maximum deviation (m) between the original and the simplified polylines
+# for each level of detail (0: all points are kept)
+polygon_detail_levels = {"low": 25, "medium": 10, "high": 0}
+
 
 def get_position_data(polyline):
     """Return x- and y-values for a selected polygon"""
@@ -27,6 +32,17 @@ def get_position_data(polyline):
     return positions
 
 
+def get_all_positions(coordinates):
+    """Return x- and y-values for all polygons in a coordinates column, the
+    coordinates stored as text (json) are parsed in one call"""
+    coordinates = list(coordinates)
+
+    if coordinates and all(isinstance(item, str) for item in coordinates):
+        return json.loads("[" + ",".join(coordinates) + "]")
+
+    return [get_position_data({"coordinates": item}) for item in coordinates]
+
+
 def has_header(df):
     """Check if a dataframe has headers and that one of them is X"""
     try:
@@ -43,56 +59,73 @@ def has_header(df):
     return status
 
 
+def split_polylines(polygon_df, id_column="ID", columns=("X", "Y")):
+    """Split the points in a dataframe (X, Y and ID) into polylines, a new
+    polyline starts each time the ID changes. Returns the ID and the first
+    row number of each polyline, and a list with x- and y-positions arrays"""
+    ids = polygon_df[id_column].values
+
+    if len(ids) == 0:
+        return ids, np.empty(0, dtype=int), []
+
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    positions = polygon_df[list(columns)].to_numpy(dtype=np.float64)
+
+    return ids[starts], starts, np.split(positions, starts[1:])
+
+
 def convert_polygon_layer(polygon_df):
     """Create polygon layer"""
-    all_positions = []
-    positions = []
-    ids = []
-    tooltips = []
-    tooltip = None
+    polygon_df = polygon_df.dropna(subset=["ID"])
+
+    if not has_header(polygon_df) or polygon_df.empty:
+        return pd.DataFrame()
+
+    ids, starts, positions = split_polylines(polygon_df)
 
-    polygon_df.dropna(subset=["ID"], inplace=True)
+    layer_df = pd.DataFrame()
+    layer_df["id"] = ids
+    layer_df["geometry"] = "Polygon"
+    layer_df["coordinates"] = [polyline.tolist() for polyline in positions]
 
-    if has_header(polygon_df):
-        for _index, row in polygon_df.iterrows():
-            if "tooltip" in polygon_df.columns:
-                tooltip = row["tooltip"]
+    if "tooltip" in polygon_df.columns:
+        tooltips = polygon_df["tooltip"].values[starts]
 
-            if _index == 0:
-                poly_id = row["ID"]
+        if pd.notnull(tooltips).any():
+            layer_df["tooltip"] = tooltips
 
-            if row["ID"] == poly_id:
-                position = [row["X"], row["Y"]]
-                positions.append(position)
-            else:
-                all_positions.append(positions)
-                positions = []
-                poly_id = row["ID"]
+    return layer_df
 
-                position = [row["X"], row["Y"]]
-                positions.append(position)
 
-                ids.append(poly_id)
+def read_prm_receivers(file_name):
+    """Read the receiver positions, lines and installation years from a PRM
+    receiver file (tab separated), only the columns used for the receiver
+    lines are kept"""
+    columns = ["Installation", "RECEIVER_LINE", "RCV_UTMX", "RCV_UTMY"]
+    dtypes = {
+        "Installation": np.int32,
+        "RECEIVER_LINE": np.int32,
+        "RCV_UTMX": np.float64,
+        "RCV_UTMY": np.float64,
+    }
 
-                if tooltip:
-                    tooltips.append(tooltip)
+    return pd.read_csv(file_name, sep="\t", usecols=columns, dtype=dtypes)
 
-        # Add last line
-        all_positions.append(positions)
-        ids.append(poly_id)
 
-        if tooltip:
-            tooltips.append(tooltip)
-    else:
-        return pd.DataFrame()
+def make_prm_layer_df(prm_df, layer_name):
+    """Create a PRM layer with one polyline per receiver line, a new line starts
+    each time RECEIVER_LINE changes. The installation year of a line is taken
+    from its first receiver"""
+    lines, starts, positions = split_polylines(
+        prm_df, "RECEIVER_LINE", ("RCV_UTMX", "RCV_UTMY")
+    )
 
     layer_df = pd.DataFrame()
-    layer_df["id"] = ids
+    layer_df["line"] = lines.astype(int)
     layer_df["geometry"] = "Polygon"
-    layer_df["coordinates"] = all_positions
-
-    if len(tooltips) > 0:
-        layer_df["tooltip"] = tooltips
+    layer_df["coordinates"] = [polyline.tolist() for polyline in positions]
+    layer_df["year"] = prm_df["Installation"].values[starts].astype(int)
+    layer_df["name"] = layer_name
 
     return layer_df
 
@@ -126,25 +159,43 @@ def make_polyline_layer(
             return None
 
         if format == "csv":
-            for _index, row in dataframe.iterrows():
-                if "tooltip" in dataframe.columns:
-                    tooltip = row["tooltip"]
+            if "tooltip" in dataframe.columns:
+                tooltips = dataframe["tooltip"].values
+            else:
+                tooltips = [tooltip] * len(dataframe)
 
-                polyline_data = get_polyline(row, tooltip, color)
+            for coordinates, polyline_tooltip in zip(
+                dataframe["coordinates"].values, tooltips
+            ):
+                polyline_data = get_polyline(
+                    {"coordinates": coordinates}, polyline_tooltip, color
+                )
 
                 if polyline_data:
                     data.append(polyline_data)
         else:
             print("ERROR unknown format:", format)
     elif polygon_type == "additional":
-        dataframe = polygon_df.copy()
+        dataframe = polygon_df
 
         if format == "csv":
-            for _index, row in dataframe.iterrows():
-                if "year" in dataframe.columns:
-                    tooltip = "Line " + str(row["line"]) + " (" + str(row["year"]) + ")"
+            if "year" in dataframe.columns:
+                tooltips = (
+                    "Line "
+                    + dataframe["line"].astype(str)
+                    + " ("
+                    + dataframe["year"].astype(str)
+                    + ")"
+                ).values
+            else:
+                tooltips = [tooltip] * len(dataframe)
 
-                polyline_data = get_polyline(row, tooltip, color)
+            for coordinates, polyline_tooltip in zip(
+                get_all_positions(dataframe["coordinates"]), tooltips
+            ):
+                polyline_data = get_polyline(
+                    {"coordinates": coordinates}, polyline_tooltip, color
+                )
 
                 if polyline_data:
                     data.append(polyline_data)
@@ -191,79 +242,314 @@ def get_polyline(layer, tooltip, color):
         return {}
 
 
-def get_polygon_files(polygon_mapping, selection_list, directory, fmu_dir):
-    # Create a list with filenames to all possible polygons
-    polygon_overview = {}
-    paths = []
+def _segment_distances(positions, start, end):
+    """Return the distances from points to the line segment from start to end"""
+    direction = end - start
+    length2 = np.dot(direction, direction)
+    points = positions - start
+
+    if length2 > 0:
+        fraction = np.clip(points @ direction / length2, 0.0, 1.0)
+        points = points - fraction[:, np.newaxis] * direction
+
+    return np.hypot(points[:, 0], points[:, 1])
+
+
+def _douglas_peucker(positions, tolerance):
+    """Return the points of an open polyline kept by the Douglas-Peucker algorithm"""
+    keep = np.zeros(len(positions), dtype=bool)
+    keep[0] = True
+    keep[-1] = True
+    segments = [(0, len(positions) - 1)]
+
+    while segments:
+        first, last = segments.pop()
+
+        if last - first < 2:
+            continue
+
+        distances = _segment_distances(
+            positions[first + 1 : last], positions[first], positions[last]
+        )
+        index = np.argmax(distances)
+
+        if distances[index] > tolerance:
+            index = index + first + 1
+            keep[index] = True
+            segments.append((first, index))
+            segments.append((index, last))
+
+    return positions[keep]
+
+
+def simplify_positions(positions, tolerance):
+    """Return a simplified polyline where no point of the original polyline is
+    further than tolerance from it. Closed polylines (outlines) are kept closed
+    with at least three corners, otherwise the original points are returned"""
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if tolerance <= 0 or len(positions) < 3:
+        return positions
+
+    if len(positions) > 3 and np.array_equal(positions[0], positions[-1]):
+        # Split the outline at the point furthest from the first point and
+        # simplify both halves, so the first point is not the only fixed point
+        distances = np.hypot(*(positions[1:-1] - positions[0]).T)
+        split = np.argmax(distances) + 1
+        first_half = _douglas_peucker(positions[: split + 1], tolerance)
+        second_half = _douglas_peucker(positions[split:], tolerance)
+        simplified = np.vstack([first_half[:-1], second_half])
+
+        if len(simplified) < 4:
+            return positions
+
+        return simplified
+
+    return _douglas_peucker(positions, tolerance)
+
+
+def simplify_polyline_layer(layer, tolerance):
+    """Return a copy of a polyline layer with simplified polylines"""
+    if not layer or tolerance <= 0:
+        return layer
+
+    data = []
+
+    for item in layer.get("data", []):
+        item = dict(item)
+
+        if "positions" in item:
+            item["positions"] = simplify_positions(
+                item["positions"], tolerance
+            ).tolist()
+
+        data.append(item)
+
+    simplified_layer = dict(layer)
+    simplified_layer["data"] = data
+
+    return simplified_layer
+
+
+def compact_polyline_layer(layer, decimals=None):
+    """Return a copy of a polyline layer with less data to send to the map: the
+    positions are rounded to the given number of decimals, repeated points are
+    removed, and polylines with the same color and tooltip are joined where
+    one polyline ends at the start of the next. With decimals <= 0 the
+    positions are sent as integers"""
+    if not layer:
+        return layer
+
+    data = []
+    joinable = None
+
+    for item in layer.get("data", []):
+        if item.get("type") != "polyline" or len(item.get("positions", [])) == 0:
+            data.append(item)
+            joinable = None
+            continue
+
+        positions = np.asarray(item["positions"], dtype=np.float64).reshape(-1, 2)
+
+        if decimals is not None:
+            positions = np.round(positions, decimals)
+
+            if decimals <= 0:
+                positions = positions.astype(np.int64)
+
+        repeated = np.r_[False, (positions[1:] == positions[:-1]).all(axis=1)]
+        positions = positions[~repeated]
+
+        style = (item.get("color"), item.get("tooltip"))
+
+        if (
+            joinable is not None
+            and joinable[0] == style
+            and joinable[1]["positions"][-1] == positions[0].tolist()
+        ):
+            joinable[1]["positions"].extend(positions[1:].tolist())
+            continue
+
+        item = dict(item)
+        item["positions"] = positions.tolist()
+        data.append(item)
+        joinable = (style, item)
+
+    compact_layer = dict(layer)
+    compact_layer["data"] = data
+
+    return compact_layer
+
+
+def make_polygon_layers(layer, levels=None, compact=False, decimals=None):
+    """Return a polyline layer for each level of detail, {} if no layer.
+    The layers can be returned in compact form (see compact_polyline_layer)"""
+    if not layer:
+        return {}
+
+    if levels is None:
+        levels = polygon_detail_levels
+
+    if compact:
+        # Join the polylines before the simplification, and round the
+        # positions after it
+        layer = compact_polyline_layer(layer)
+
+    layers = {
+        level: simplify_polyline_layer(layer, tolerance)
+        for level, tolerance in levels.items()
+    }
+
+    if compact and decimals is not None:
+        layers = {
+            level: compact_polyline_layer(level_layer, decimals)
+            for level, level_layer in layers.items()
+        }
+
+    return layers
+
+
+def split_polygon_file_name(file_name):
+    """Return the name, tagname and format of a polygon file (name--tagname.format),
+    None if the file name is not on that form"""
+    stem, extension = os.path.splitext(os.path.basename(file_name))
+
+    if "--" not in stem:
+        return None
+
+    name, tagname = stem.split("--", 1)
+
+    return name, tagname, extension[1:]
+
+
+class PolygonFileIndex:
+    """Index of the files in polygon folders. Each folder is listed once (or
+    again when it is older than rescan_interval seconds), and later lookups do
+    not access the file system. Folders which can not be listed (e.g. in a
+    portable app) are not indexed"""
+
+    def __init__(self, rescan_interval=None):
+        self.rescan_interval = rescan_interval
+        self.folders = {}
+        self.scan_times = {}
+        self.mtimes = {}
+
+    def scan(self, folder):
+        """Return the files in a folder ({file name: path}), None if the folder
+        can not be listed"""
+        folder = str(folder)
+        scan_time = self.scan_times.get(folder)
+
+        if scan_time is None or (
+            self.rescan_interval is not None
+            and time.monotonic() - scan_time >= self.rescan_interval
+        ):
+            try:
+                with os.scandir(folder) as entries:
+                    files = {}
+
+                    for entry in entries:
+                        if entry.is_file():
+                            files[entry.name] = entry.path
+                            self.mtimes[entry.path] = entry.stat().st_mtime
+            except OSError:
+                files = None
+
+            self.folders[folder] = files
+            self.scan_times[folder] = time.monotonic()
+
+        return self.folders[folder]
+
+    def get_mtime(self, path):
+        """Return the modification time of a file recorded by the last scan of
+        its folder, None if the file is not indexed"""
+        path = str(path)
+
+        if self.find(os.path.dirname(path), os.path.basename(path)) is None:
+            return None
+
+        return self.mtimes.get(path)
+
+    def get_files(self, folder):
+        """Return the paths to all files in a folder"""
+        files = self.scan(folder)
+
+        if not files:
+            return []
+
+        return [files[file_name] for file_name in sorted(files)]
+
+    def find(self, folder, file_name):
+        """Return the path to a file in a folder, None if the file does not exist.
+        If the folder is not indexed the path is returned unchecked"""
+        files = self.scan(folder)
+
+        if files is None:
+            return os.path.join(folder, file_name)
+
+        return files.get(file_name)
+
+
+def get_polygon_files(
+    polygon_mapping, selection_list, directory, fmu_dir, polygon_files=None
+):
+    """Return the paths to the existing polygon files (csv) given in the polygon
+    mapping, for all realizations and iterations and for the aggregations"""
+    if polygon_files is None:
+        polygon_files = PolygonFileIndex()
 
     # Create overview of polygon files  - both for single realizations and aggregations
     polygon_types = polygon_mapping.columns[1:]
+    polygon_overview = set()
 
     for polygon_type in polygon_types:
-        surface_names = polygon_mapping[polygon_type].to_list()
-        unique_names = list(set(surface_names))
-        polygon_overview.update({polygon_type: unique_names})
+        for surface_name in polygon_mapping[polygon_type].to_list():
+            polygon_overview.add((surface_name, polygon_type))
 
     realizations = selection_list.get("simulated").get("realization")
     iterations = selection_list.get("simulated").get("iteration")
 
-    # realization polygones
+    # realization polygons
+    folders = []
 
     for realization in realizations:
         if "realization" in realization:
             for iteration in iterations:
-                for polygon_type in polygon_overview.keys():
-                    surfaces = polygon_overview.get(polygon_type)
-
-                    for surface in surfaces:
-                        file_name = surface + "--" + polygon_type + ".csv"
-                        path = os.path.join(
-                            fmu_dir,
-                            realization,
-                            iteration,
-                            directory,
-                            "polygons",
-                            file_name,
-                        )
-
-                        paths.append(path)
+                folders.append(
+                    os.path.join(fmu_dir, realization, iteration, directory, "polygons")
+                )
 
     # aggregation polygons
-
     for iteration in iterations:
-        for polygon_type in polygon_overview.keys():
-            surfaces = polygon_overview.get(polygon_type)
-
-            for surface in surfaces:
-                file_name = surface + "--" + polygon_type + ".csv"
-                path = os.path.join(
-                    fmu_dir,
-                    iteration,
-                    directory,
-                    "polygons",
-                    file_name,
-                )
+        folders.append(os.path.join(fmu_dir, iteration, directory, "polygons"))
+
+    paths = []
+
+    for folder in folders:
+        for path in polygon_files.get_files(folder):
+            name_parts = split_polygon_file_name(path)
 
+            if (
+                name_parts is not None
+                and name_parts[2] == "csv"
+                and name_parts[:2] in polygon_overview
+            ):
                 paths.append(path)
 
     return paths
 
 
-def get_files_in_directory(directory_path):
+def get_files_in_directory(directory_path, polygon_files=None):
     """
     Retrieves a list of all files in the specified directory.
     """
-    file_list = []
+    if polygon_files is None:
+        polygon_files = PolygonFileIndex()
 
-    if os.path.exists(directory_path):
-        for entry in os.listdir(directory_path):
-            full_path = os.path.join(directory_path, entry)
-            if os.path.isfile(full_path):
-                file_list.append(full_path)
-    return file_list
+    return polygon_files.get_files(directory_path)
 
 
-def get_default_polygon_files(fmu_dir, top_reservoir):
+def get_default_polygon_files(fmu_dir, top_reservoir, polygon_files=None):
     directory = top_reservoir.get("directory")
     polygons_directory = top_reservoir.get("polygons_directory")
 
@@ -279,7 +565,7 @@ def get_default_polygon_files(fmu_dir, top_reservoir):
         polygons_directory,
     )
 
-    default_polygon_files = get_files_in_directory(polygons_folder)
+    default_polygon_files = get_files_in_directory(polygons_folder, polygon_files)
 
     # Default polygons if only aggregated data
     polygons_folder = os.path.join(
@@ -288,7 +574,7 @@ def get_default_polygon_files(fmu_dir, top_reservoir):
         polygons_directory,
     )
 
-    polygon_files = get_files_in_directory(polygons_folder)
-    default_polygon_files = default_polygon_files + polygon_files
+    aggregated_files = get_files_in_directory(polygons_folder, polygon_files)
+    default_polygon_files = default_polygon_files + aggregated_files
 
     return default_polygon_files
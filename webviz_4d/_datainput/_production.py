@@ -1,10 +1,14 @@
 import os
 import math
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
 from webviz_4d._datainput import common
-from webviz_4d._datainput.well import get_well_polyline
+from webviz_4d._datainput.well import get_well_polyline, detail_levels
+from webviz_4d._datainput._shared_data import get_file_versions
 
 # from webviz_4d.plugins._surface_viewer_4D._webvizstore import get_path
 
@@ -73,9 +77,20 @@ def make_new_well_layer(
     label="Drilled wells",
 ):
     """Make layeredmap wells layer"""
-    # t0 = time.time()
-    data = []
+    layers = make_new_well_layers(
+        well_layer_file, wells_df, label, {"default": detail_levels["medium"]}
+    )
 
+    return layers["default"]
+
+
+def make_new_well_layers(
+    well_layer_file,
+    wells_df,
+    label="Drilled wells",
+    levels=None,
+):
+    """Make layeredmap wells layers, one layer for each level of detail"""
     df_file = well_layer_file
 
     if os.path.exists(df_file):
@@ -83,71 +98,347 @@ def make_new_well_layer(
     else:
         layer_df = pd.DataFrame()
 
+    return make_well_layers(layer_df, wells_df, label, levels)
+
+
+def make_well_layers(layer_df, wells_df, label="Drilled wells", levels=None):
+    """Make layeredmap wells layers from a dataframe with true_name, md_start,
+    md_end, color and tooltip, one layer for each level of detail"""
+    if levels is None:
+        levels = detail_levels
+
+    data = {level: [] for level in levels}
+
     for _index, row in layer_df.iterrows():
         true_name = row["true_name"]
         well_dataframe = wells_df[wells_df["WELLBORE_NAME"] == true_name]
 
-        polyline_data = get_well_polyline(
-            well_dataframe,
-            row["md_start"],
-            row["md_end"],
-            row["color"],
-            row["tooltip"],
-        )
+        for level, delta in levels.items():
+            polyline_data = get_well_polyline(
+                well_dataframe,
+                row["md_start"],
+                row["md_end"],
+                row["color"],
+                row["tooltip"],
+                delta,
+            )
 
-        if polyline_data:
-            data.append(polyline_data)
+            if polyline_data:
+                data[level].append(polyline_data)
 
-    layer = {"name": label, "checked": False, "base_layer": False, "data": data}
+    layers = {}
 
-    return layer
+    for level in levels:
+        layers[level] = {
+            "name": label,
+            "checked": False,
+            "base_layer": False,
+            "data": data[level],
+        }
 
+    return layers
+
+
+def downcast_production_data(prod_data):
+    """Return the production data with categorical well name, production type,
+    fluid and date columns and float32 volumes"""
+    prod_data = prod_data.copy()
+
+    for column in prod_data.columns[:5]:
+        prod_data[column] = prod_data[column].astype("category")
+
+    volume_columns = prod_data.columns[5:]
+    prod_data[volume_columns] = prod_data[volume_columns].astype(np.float32)
+
+    return prod_data
+
+
+def get_production_cache_file(cache_directory, folder, csv_files):
+    """Return the cache file for the production data in a folder, named by the
+    paths and modification times of the csv files (also the missing ones), so
+    added, changed or removed csv files give another cache file"""
+    versions = get_file_versions(sorted(csv_files))
+    folder_hash = hashlib.sha1(os.path.realpath(folder).encode()).hexdigest()[:8]
+    files_hash = hashlib.sha1(json.dumps(versions).encode()).hexdigest()[:16]
+
+    return os.path.join(
+        cache_directory, "production_" + folder_hash + "_" + files_hash + ".parquet"
+    )
 
-def extract_production_info(pdm_well_name, prod_data, interval, production_type, fluid):
-    """Return well and production information/status for a selected
-    interval for production/injection wells"""
 
-    start_date = None
-    stop_date = None
-    interval_volume = None
-    total_volume = None
+def read_production_cache(cache_file):
+    """Return the cached production data, None if the cache does not exist"""
+    if not os.path.isfile(cache_file):
+        return None
+
+    try:
+        return pd.read_parquet(cache_file)
+    except (ImportError, OSError, ValueError) as error:
+        print("WARNING: Could not read production cache", cache_file, error)
+
+    return None
+
+
+def write_production_cache(cache_file, prod_data):
+    """Write the production data to a parquet file, and remove the older cache
+    files for the same folder. The file is written to a temporary file first,
+    so a reader never sees a partly written cache"""
+    cache_directory = os.path.dirname(cache_file)
+    folder_prefix = os.path.basename(cache_file).rsplit("_", 1)[0] + "_"
+    tmp_file = str(cache_file) + "." + str(os.getpid()) + ".tmp"
 
-    headers = prod_data.columns
-    first_date = common.get_dates(headers[5])[0]
     try:
-        prod_info = prod_data.loc[
-            (prod_data["PDM well name"] == pdm_well_name)
-            & (prod_data["Production type"] == production_type)
-            & (prod_data["Fluid"] == fluid)
+        os.makedirs(cache_directory, exist_ok=True)
+        prod_data.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+    except (ImportError, OSError, ValueError) as error:
+        print("WARNING: Could not write production cache", cache_file, error)
+
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+        return
+
+    for entry in os.scandir(cache_directory):
+        if (
+            entry.name.startswith(folder_prefix)
+            and entry.name.endswith(".parquet")
+            and entry.path != cache_file
+        ):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def load_production_data(folder, csv_files, cache_directory=None):
+    """Return the production data in all the csv files in a folder as one
+    compact dataframe (see downcast_production_data). If a cache directory is
+    given the dataframe is stored there as parquet, and read from there in
+    later calls as long as the same csv files exist and have not been changed"""
+    csv_files = [os.path.join(folder, name) for name in csv_files]
+    cache_file = None
+
+    if cache_directory is not None:
+        cache_file = get_production_cache_file(cache_directory, folder, csv_files)
+        prod_data = read_production_cache(cache_file)
+
+        if prod_data is not None:
+            return prod_data
+
+    prod_data_list = [
+        pd.read_csv(csv_file) for csv_file in csv_files if os.path.isfile(csv_file)
+    ]
+
+    if prod_data_list:
+        prod_data = pd.concat(prod_data_list, ignore_index=True)
+        prod_data = downcast_production_data(prod_data)
+    else:
+        prod_data = pd.DataFrame()
+
+    if cache_file is not None and not prod_data.empty:
+        write_production_cache(cache_file, prod_data)
+
+    return prod_data
+
+
+class ProductionCube:
+    """Cumulative production/injection volumes in a dense array indexed by
+    (well, production type, fluid, date), built once from the production data
+    (read_csvs or load_production_data). The first five columns of the production data are
+    PDM well name, Production type, Fluid, Start date and Last date, the
+    remaining columns are cumulative volumes from the first date"""
+
+    key_columns = ["PDM well name", "Production type", "Fluid"]
+
+    def __init__(self, prod_data):
+        if prod_data is None or len(prod_data.columns) < 6:
+            prod_data = pd.DataFrame(
+                columns=self.key_columns + ["Start date", "Last date"]
+            )
+            volume_columns = []
+            self.first_date = None
+        else:
+            volume_columns = list(prod_data.columns[5:])
+            self.first_date = common.get_dates(volume_columns[0])[0]
+
+        # As in a row wise lookup, the first row is used for duplicated wells
+        prod_data = prod_data.dropna(subset=self.key_columns)
+        prod_data = prod_data.drop_duplicates(subset=self.key_columns, keep="first")
+
+        self.wells = list(pd.unique(prod_data["PDM well name"].astype(object)))
+        self.production_types = list(
+            pd.unique(prod_data["Production type"].astype(object))
+        )
+        self.fluids = list(pd.unique(prod_data["Fluid"].astype(object)))
+        self.dates = [self.first_date] + [
+            common.get_dates(column)[1] for column in volume_columns
         ]
 
-        well_prod_info = prod_info.where(prod_info.notnull(), None)
+        self.well_index = {name: index for index, name in enumerate(self.wells)}
+        self.type_index = {
+            name: index for index, name in enumerate(self.production_types)
+        }
+        self.fluid_index = {name: index for index, name in enumerate(self.fluids)}
+        self.date_index = {date: index for index, date in enumerate(self.dates)}
+
+        shape = (len(self.wells), len(self.production_types), len(self.fluids))
+        wells = self._get_codes(prod_data["PDM well name"], self.well_index)
+        types = self._get_codes(prod_data["Production type"], self.type_index)
+        fluids = self._get_codes(prod_data["Fluid"], self.fluid_index)
+        dtype = np.float32 if self._is_float32(prod_data, volume_columns) else float
+
+        # The cumulative volume at the first date is 0
+        self.volumes = np.full(shape + (len(self.dates),), np.nan, dtype=dtype)
+        self.volumes[wells, types, fluids, 0] = 0.0
+        self.volumes[wells, types, fluids, 1:] = prod_data[volume_columns].values
+
+        self.exists = np.zeros(shape, dtype=bool)
+        self.exists[wells, types, fluids] = True
+
+        self.start_dates = np.full(shape, None, dtype=object)
+        self.start_dates[wells, types, fluids] = [
+            None if pd.isnull(date) else date
+            for date in prod_data["Start date"].astype(object)
+        ]
+        self.stop_dates = np.full(shape, None, dtype=object)
+        self.stop_dates[wells, types, fluids] = [
+            None if pd.isnull(date) else date
+            for date in prod_data["Last date"].astype(object)
+        ]
 
-        start_date = well_prod_info["Start date"].values[0]
-        stop_date = well_prod_info["Last date"].values[0]
-    except:
-        well_prod_info = pd.DataFrame()
+    def __len__(self):
+        return len(self.wells)
 
-    if not well_prod_info.empty:
-        total_volume = well_prod_info.iloc[:, -1:].values[0][0]
+    @staticmethod
+    def _get_codes(column, index):
+        return column.astype(object).map(index).values.astype(int)
 
-    if interval != "" and not well_prod_info.empty:
+    @staticmethod
+    def _is_float32(prod_data, volume_columns):
+        return len(volume_columns) > 0 and all(
+            prod_data[column].dtype == np.float32 for column in volume_columns
+        )
+
+    def _get_slice(self, production_type, fluid):
+        type_index = self.type_index.get(production_type)
+        fluid_index = self.fluid_index.get(fluid)
+
+        if type_index is None or fluid_index is None:
+            return None
+
+        return type_index, fluid_index
+
+    def get_cumulative_volumes(self, date, production_type, fluid):
+        """Return the cumulative volumes at a date for all wells. Dates between
+        two production dates are linearly interpolated (NaN outside the dates)"""
+        selected = self._get_slice(production_type, fluid)
+
+        if selected is None or date is None:
+            return np.full(len(self.wells), np.nan)
+
+        cumulative = self.volumes[:, selected[0], selected[1], :]
+        index = self.date_index.get(date)
+
+        if index is not None:
+            return cumulative[:, index]
+
+        days = np.array(self.dates, dtype="datetime64[D]").astype(float)
+        day = np.datetime64(date, "D").astype(float)
+        index = np.searchsorted(days, day)
+
+        if index == 0 or index == len(days):
+            return np.full(len(self.wells), np.nan)
+
+        fraction = (day - days[index - 1]) / (days[index] - days[index - 1])
+
+        return (1 - fraction) * cumulative[:, index - 1] + fraction * cumulative[
+            :, index
+        ]
+
+    def get_interval_volumes(self, interval, production_type, fluid, interpolate=False):
+        """Return the volumes in an interval for all wells (NaN if not available).
+        The interval dates must be production dates unless interpolate is True"""
+        selected = self._get_slice(production_type, fluid)
         dates = common.get_dates(interval)
 
-        if dates[0] == first_date:
-            column = interval
-            interval_volume = well_prod_info[column].values[0]
-        else:
-            column1 = first_date + "-" + dates[0]
-            column2 = first_date + "-" + dates[1]
-            interval_volume = (
-                well_prod_info[column2].values[0] - well_prod_info[column1].values[0]
-            )
+        if interpolate:
+            return self.get_cumulative_volumes(
+                dates[1], production_type, fluid
+            ) - self.get_cumulative_volumes(dates[0], production_type, fluid)
+
+        index1 = self.date_index.get(dates[0])
+        index2 = self.date_index.get(dates[1])
+
+        if selected is None or index1 is None or index2 is None:
+            return np.full(len(self.wells), np.nan)
+
+        cumulative = self.volumes[:, selected[0], selected[1], :]
+
+        return cumulative[:, index2] - cumulative[:, index1]
+
+    def get_total_volumes(self, production_type, fluid):
+        """Return the total volumes for all wells (NaN if not available)"""
+        selected = self._get_slice(production_type, fluid)
+
+        if selected is None or len(self.dates) < 2:
+            return np.full(len(self.wells), np.nan)
 
-        if math.isnan(interval_volume) or interval_volume == 0:
-            interval_volume = None
+        return self.volumes[:, selected[0], selected[1], -1].copy()
 
-    return start_date, stop_date, interval_volume, total_volume
+    def get_start_dates(self, production_type, fluid):
+        selected = self._get_slice(production_type, fluid)
+
+        if selected is None:
+            return np.full(len(self.wells), None, dtype=object)
+
+        return self.start_dates[:, selected[0], selected[1]]
+
+    def get_stop_dates(self, production_type, fluid):
+        selected = self._get_slice(production_type, fluid)
+
+        if selected is None:
+            return np.full(len(self.wells), None, dtype=object)
+
+        return self.stop_dates[:, selected[0], selected[1]]
+
+    def get_well_info(self, pdm_well_name, interval, production_type, fluid):
+        """Return start date, last date, interval volume and total volume for a
+        well (see extract_production_info)"""
+        well_index = self.well_index.get(pdm_well_name)
+        selected = self._get_slice(production_type, fluid)
+
+        if (
+            well_index is None
+            or selected is None
+            or not self.exists[well_index, selected[0], selected[1]]
+        ):
+            return None, None, None, None
+
+        start_date = self.start_dates[well_index, selected[0], selected[1]]
+        stop_date = self.stop_dates[well_index, selected[0], selected[1]]
+        total_volume = self.volumes[well_index, selected[0], selected[1], -1]
+        interval_volume = None
+
+        if interval != "":
+            interval_volume = self.get_interval_volumes(
+                interval, production_type, fluid
+            )[well_index]
+
+            if math.isnan(interval_volume) or interval_volume == 0:
+                interval_volume = None
+
+        return start_date, stop_date, interval_volume, total_volume
+
+
+def extract_production_info(pdm_well_name, prod_data, interval, production_type, fluid):
+    """Return well and production information/status for a selected
+    interval for production/injection wells. prod_data is either the
+    production data or a ProductionCube made from it"""
+    if not isinstance(prod_data, ProductionCube):
+        prod_data = ProductionCube(prod_data)
+
+    return prod_data.get_well_info(pdm_well_name, interval, production_type, fluid)
 
 
 def get_info(start_date, stop_date, fluid, volume):
@@ -195,3 +486,18 @@ def check_interval_date(interval, selected_date):
         status = "less"
 
     return status
+
+
+def check_interval_dates(interval, selected_dates):
+    """Check for many dates if they are included in a 4D interval or not,
+    returns an array with the same status values as check_interval_date"""
+    dates = pd.Series(selected_dates, dtype=object)
+    defined = dates.map(lambda date: isinstance(date, str)).values
+    dates = dates.where(defined, "").values.astype(str)
+
+    status = np.full(len(dates), None, dtype=object)
+    status[defined & (dates < interval[:10])] = "less"
+    status[defined & (dates >= interval[:10])] = "greater"
+    status[defined & (dates >= interval[:10]) & (dates < interval[11:])] = "inside"
+
+    return status
@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import tempfile
+import time
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+def remove_file(path):
+    # The file may already have been removed by another process
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DiskRenderCache:
+    """Cache of rendered layers on local disk, which can be shared by several
+    processes (e.g. gunicorn workers) on the same host. The layers are stored
+    as json files named by a hash of the surface file (path, modification
+    time and size) and the render parameters. Files are written atomically
+    (to a temporary file which is then renamed), and the least recently used
+    files are removed when the total size exceeds max_bytes"""
+
+    def __init__(self, directory, max_bytes=1024**3):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, surface_file, parameters):
+        """Return the key of a layer rendered from surface_file with the given
+        parameters, None if the surface file doesn't exist"""
+        surface_file = os.path.realpath(surface_file)
+
+        try:
+            stat = os.stat(surface_file)
+        except OSError:
+            return None
+
+        content = json.dumps(
+            [surface_file, stat.st_mtime_ns, stat.st_size, parameters],
+            sort_keys=True,
+            default=str,
+        )
+
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get_file(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """Return a cached layer (None if not cached)"""
+        cache_file = self.get_file(key)
+
+        try:
+            with open(cache_file, encoding="utf-8") as stream:
+                layer = json.load(stream)
+
+            # The modification time is used as last use time
+            os.utime(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        return layer
+
+    def put(self, key, layer):
+        cache_file = self.get_file(key)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+        try:
+            handle, temp_file = tempfile.mkstemp(
+                dir=os.path.dirname(cache_file), suffix=".tmp"
+            )
+
+            with os.fdopen(handle, "w", encoding="utf-8") as stream:
+                json.dump(layer, stream, cls=PlotlyJSONEncoder)
+
+            os.replace(temp_file, cache_file)
+        except OSError as error:
+            print("WARNING: could not write render cache file", cache_file, error)
+            return
+
+        self.remove_old_files()
+
+    def get_files(self):
+        """Return (last use time, size, file) for the cached files"""
+        files = []
+
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+
+            for entry in os.scandir(folder.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                # Temporary files left by writes which did not complete
+                if entry.name.endswith(".tmp"):
+                    if time.time() - stat.st_mtime > 3600:
+                        remove_file(entry.path)
+                elif entry.name.endswith(".json"):
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        return files
+
+    def remove_old_files(self):
+        """Remove the least recently used files until the total size is below
+        max_bytes (files may also be removed by other processes)"""
+        files = self.get_files()
+        total_size = sum(size for _mtime, size, _path in files)
+
+        for _mtime, size, path in sorted(files):
+            if total_size <= self.max_bytes:
+                break
+
+            remove_file(path)
+            total_size -= size
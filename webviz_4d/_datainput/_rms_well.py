@@ -0,0 +1,167 @@
+"""Fast reader for well trajectories in RMS ascii format. Only the positions
+(X, Y, Z) and the MD log are read, all other logs are skipped"""
+
+import numpy as np
+import pandas as pd
+
+XNAME = "X_UTME"
+YNAME = "Y_UTMN"
+ZNAME = "Z_TVDSS"
+UNDEF = -999
+
+
+def get_safe_wellname(wellname):
+    """Well name with '/' and spaces replaced by '_' (as xtgeo safewellname)"""
+    return wellname.replace("/", "_").replace(" ", "_")
+
+
+def get_true_wellname(wellname):
+    """Well name on the form '31/2-E-4 AH2' (as xtgeo truewellname)"""
+    xname = get_safe_wellname(wellname)
+
+    if "/" not in xname:
+        xname = xname.replace("_", "/", 1)
+        xname = xname.replace("_", " ")
+
+    return xname
+
+
+def get_short_wellname(wellname):
+    """Well name without block name and spaces (as xtgeo shortwellname),
+    e.g. '31/2-G-5 AH' -> 'G-5AH', '6472_11-F-23_AH_T2' -> 'F-23AHT2'"""
+    newname = []
+    first1 = False
+    first2 = False
+
+    for letter in wellname:
+        if first1 and first2:
+            newname.append(letter)
+        elif letter in ("_", "/"):
+            first1 = True
+        elif first1 and letter == "-":
+            first2 = True
+
+    return "".join(newname).replace("_", "").replace(" ", "")
+
+
+def read_rms_header(well_file):
+    """Return the well name and the log names from the header of a RMS ascii
+    well file, and the number of header lines"""
+    with open(well_file, "r", encoding="UTF-8") as stream:
+        stream.readline()  # File version
+        stream.readline()  # Well type
+
+        # The well name may contain spaces and the rkb is optional
+        row = stream.readline().split()
+        assume_rkb = False
+
+        if len(row) > 3:
+            try:
+                last_values = [float(item) for item in row[-3:]]
+                assume_rkb = last_values[-1] < 1000.0
+            except ValueError:
+                assume_rkb = False
+
+        if assume_rkb:
+            row.pop()
+
+        row.pop()  # Y position
+        row.pop()  # X position
+        wellname = " ".join(row)
+
+        nlogs = int(stream.readline())
+        lognames = []
+
+        for _i in range(nlogs):
+            logname = stream.readline().split()[0]
+
+            if "_index" in logname:
+                logname = logname.upper()
+
+            lognames.append(logname)
+
+    return wellname, [XNAME, YNAME, ZNAME] + lognames, 4 + nlogs
+
+
+class RmsWell:
+    """Well trajectory read from a RMS ascii file. The attributes used by
+    load_all_wells are named as in xtgeo.Well, so the two can be used in the
+    same way"""
+
+    def __init__(self, wellname, dataframe, mdlogname="MD"):
+        self.wellname = wellname
+        self.dataframe = dataframe
+        self.mdlogname = mdlogname
+
+    @property
+    def name(self):
+        return self.wellname
+
+    @property
+    def truewellname(self):
+        return get_true_wellname(self.wellname)
+
+    @property
+    def shortwellname(self):
+        return get_short_wellname(self.wellname)
+
+    def rescale(self, delta):
+        """Resample the trajectory with a constant MD step (as xtgeo rescale)"""
+        md = self.dataframe[self.mdlogname].values
+        start = md[0]
+        stop = md[-1]
+
+        if delta <= 0:
+            raise ValueError(f"Rescale step must be positive, got {delta}")
+
+        nentry = int(round((stop - start) / delta))
+        md_new = np.linspace(start, stop, num=nentry)
+
+        dataframe = pd.DataFrame()
+
+        for column in self.dataframe.columns:
+            if column == self.mdlogname:
+                dataframe[column] = md_new
+                continue
+
+            values = self.dataframe[column].values
+            defined = ~np.isnan(values)
+            dataframe[column] = np.interp(
+                md_new, md[defined], values[defined], left=np.nan, right=np.nan
+            )
+
+        self.dataframe = dataframe
+
+
+def read_rms_well(well_file, mdlogname="MD"):
+    """Return a RmsWell with the positions and the MD log of a RMS ascii well file.
+    A ValueError is raised if the file can not be read or if the MD log is
+    missing or not increasing, the caller should then use xtgeo"""
+    try:
+        wellname, lognames, nheader = read_rms_header(well_file)
+    except (IndexError, TypeError) as error:
+        raise ValueError(str(well_file) + ": Unexpected header") from error
+
+    if mdlogname not in lognames:
+        raise ValueError(str(well_file) + ": MD log " + mdlogname + " is missing")
+
+    columns = [XNAME, YNAME, ZNAME, mdlogname]
+
+    dataframe = pd.read_csv(
+        well_file,
+        sep=r"\s+",
+        skiprows=nheader,
+        header=None,
+        names=lognames,
+        usecols=columns,
+        dtype=np.float64,
+        na_values=UNDEF,
+        engine="c",
+    )[columns]
+
+    md = dataframe[mdlogname].values
+
+    if len(md) < 2 or np.isnan(md).any() or (np.diff(md) <= 0).any():
+        raise ValueError(str(well_file) + ": MD log is not increasing")
+
+    return RmsWell(wellname, dataframe, mdlogname)
@@ -0,0 +1,99 @@
+import os
+import threading
+
+
+def get_file_versions(paths):
+    """Return the resolved paths and modification times (None if missing) of files"""
+    versions = []
+
+    for path in paths:
+        path = os.path.realpath(path)
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        versions.append((path, mtime))
+
+    return tuple(versions)
+
+
+class SharedDataRegistry:
+    """Process wide registry of loaded data, shared by all plugin instances
+    (e.g. several SurfaceViewer4D pages using the same wells and production
+    data). The data are keyed by a name, the resolved paths and modification
+    times of the files they are loaded from and optional settings. Each user
+    holds a reference, and the data are released when the last user has
+    released them"""
+
+    def __init__(self):
+        self._entries = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name, paths, load_function, settings=None):
+        """Return the key and the data for the given files and settings. The
+        data are loaded by load_function() if not already loaded (once, also
+        if several users ask for them at the same time). The key must be
+        released with release() when the data are no longer used"""
+        key = (name, get_file_versions(paths), settings)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+
+                if entry is not None:
+                    entry[1] += 1
+                    return key, entry[0]
+
+                loading = self._loading.get(key)
+
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+
+            loading.wait()
+
+        try:
+            value = load_function()
+        except Exception:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+            raise
+
+        with self._lock:
+            self._entries[key] = [value, 1]
+            del self._loading[key]
+
+        loading.set()
+
+        return key, value
+
+    def release(self, key):
+        """Release one reference to the data, the data are discarded when there
+        are no references left"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return
+
+            entry[1] -= 1
+
+            if entry[1] <= 0:
+                del self._entries[key]
+
+    def references(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# The registry used by all plugins in the process
+shared_data = SharedDataRegistry()
@@ -0,0 +1,304 @@
+"""Grid bucket index over polylines (well trajectories and polygons) used to answer
+map queries (bounding box, nearest polyline and polygon hit test)"""
+
+import numpy as np
+
+
+class SpatialIndex:
+    """Spatial index over the segments of a collection of polylines.
+
+    Each segment is registered in all grid cells covered by its bounding box.
+    The cells are stored as a sorted array of cell numbers with pointers into
+    an array of segment numbers, so all queries are vectorized numpy operations.
+
+    * `keys`: A list with one key (e.g. well name) per polyline
+    * `polylines`: A list of arrays (or nested lists) with x- and y-positions
+    * `cell_size`: Size of the grid cells, estimated from the segments if not given
+    """
+
+    def __init__(self, keys, polylines, cell_size=None):
+        self.keys = list(keys)
+
+        owners = []
+        starts = []
+        ends = []
+        self.closed = np.zeros(len(self.keys), dtype=bool)
+        self.bounds = np.full((len(self.keys), 4), np.nan)
+
+        for number, positions in enumerate(polylines):
+            positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+
+            if len(positions) == 0:
+                continue
+
+            self.bounds[number] = [
+                positions[:, 0].min(),
+                positions[:, 1].min(),
+                positions[:, 0].max(),
+                positions[:, 1].max(),
+            ]
+            self.closed[number] = len(positions) > 3 and np.array_equal(
+                positions[0], positions[-1]
+            )
+
+            if len(positions) == 1:
+                positions = np.vstack([positions, positions])
+
+            starts.append(positions[:-1])
+            ends.append(positions[1:])
+            owners.append(np.full(len(positions) - 1, number))
+
+        if starts:
+            self.starts = np.concatenate(starts)
+            self.ends = np.concatenate(ends)
+            self.owners = np.concatenate(owners)
+        else:
+            self.starts = np.empty((0, 2))
+            self.ends = np.empty((0, 2))
+            self.owners = np.empty(0, dtype=int)
+
+        self.seg_min = np.minimum(self.starts, self.ends)
+        self.seg_max = np.maximum(self.starts, self.ends)
+
+        self._create_grid(cell_size)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_layer(cls, layer, key="tooltip", cell_size=None):
+        """Create an index over the polylines in a LayeredMap layer"""
+        keys = []
+        polylines = []
+
+        for item in layer.get("data", []):
+            if "positions" in item:
+                keys.append(item.get(key))
+                polylines.append(item["positions"])
+
+        return cls(keys, polylines, cell_size)
+
+    @classmethod
+    def from_wells(cls, wells_df, cell_size=None):
+        """Create an index over well trajectories (one polyline per WELLBORE_NAME)"""
+        keys = []
+        polylines = []
+
+        for well_name, well_df in wells_df.groupby("WELLBORE_NAME", sort=False):
+            keys.append(well_name)
+            polylines.append(well_df[["X_UTME", "Y_UTMN"]].values)
+
+        return cls(keys, polylines, cell_size)
+
+    def _create_grid(self, cell_size):
+        if len(self.owners) == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0 if cell_size is None else cell_size
+            self.nx = 1
+            self.ny = 1
+            self.cells = np.empty(0, dtype=np.int64)
+            self.cell_pointers = np.zeros(1, dtype=np.int64)
+            self.cell_segments = np.empty(0, dtype=np.int64)
+            return
+
+        self.origin = self.seg_min.min(axis=0)
+        extent = self.seg_max.max(axis=0) - self.origin
+
+        if cell_size is None:
+            # Aim at a few segments per cell, but not more cells than segments
+            lengths = np.hypot(*(self.ends - self.starts).T)
+            cell_size = max(
+                4.0 * np.median(lengths),
+                2.0 * np.sqrt(extent[0] * extent[1] / len(self.owners)),
+                1.0,
+            )
+
+        self.cell_size = float(cell_size)
+        self.nx = int(extent[0] // self.cell_size) + 1
+        self.ny = int(extent[1] // self.cell_size) + 1
+
+        i_min, j_min = self._cell(self.seg_min)
+        i_max, j_max = self._cell(self.seg_max)
+
+        counts = (i_max - i_min + 1) * (j_max - j_min + 1)
+        segments = np.repeat(np.arange(len(self.owners)), counts)
+
+        # Position of each (segment, cell) pair within the bounding box of the segment
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        offsets = np.arange(len(segments)) - first
+        heights = np.repeat(j_max - j_min + 1, counts)
+        i_cells = np.repeat(i_min, counts) + offsets // heights
+        j_cells = np.repeat(j_min, counts) + offsets % heights
+
+        cell_numbers = i_cells * self.ny + j_cells
+        order = np.argsort(cell_numbers, kind="stable")
+
+        self.cell_segments = segments[order]
+        self.cells, first_in_cell = np.unique(cell_numbers[order], return_index=True)
+        self.cell_pointers = np.append(first_in_cell, len(order))
+
+    def _cell(self, positions):
+        cells = np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+
+        return cells[..., 0], cells[..., 1]
+
+    def _segments_in_cells(self, i_range, j_range):
+        """Return the segments registered in a rectangle of grid cells"""
+        i_min = max(i_range[0], 0)
+        i_max = min(i_range[1], self.nx - 1)
+        j_min = max(j_range[0], 0)
+        j_max = min(j_range[1], self.ny - 1)
+
+        if i_min > i_max or j_min > j_max:
+            return np.empty(0, dtype=np.int64)
+
+        n_cells = (i_max - i_min + 1) * (j_max - j_min + 1)
+
+        if n_cells > len(self.cells):
+            # Large rectangle, check all segments
+            return np.arange(len(self.owners))
+
+        i_cells, j_cells = np.meshgrid(
+            np.arange(i_min, i_max + 1), np.arange(j_min, j_max + 1), indexing="ij"
+        )
+        wanted = (i_cells * self.ny + j_cells).ravel()
+        found = np.searchsorted(self.cells, wanted)
+        valid = found < len(self.cells)
+        found = found[valid]
+        selected = found[self.cells[found] == wanted[valid]]
+
+        if len(selected) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        first = self.cell_pointers[selected]
+        counts = self.cell_pointers[selected + 1] - first
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+
+        # A segment may be registered in several of the cells
+        return self.cell_segments[np.repeat(first, counts) + offsets]
+
+    def query_bbox(self, xmin, ymin, xmax, ymax):
+        """Return the numbers of the polylines with segments inside a bounding box"""
+        if len(self.owners) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        i_min, j_min = self._cell(np.array([xmin, ymin]))
+        i_max, j_max = self._cell(np.array([xmax, ymax]))
+        segments = self._segments_in_cells((i_min, i_max), (j_min, j_max))
+
+        inside = (
+            (self.seg_max[segments, 0] >= xmin)
+            & (self.seg_min[segments, 0] <= xmax)
+            & (self.seg_max[segments, 1] >= ymin)
+            & (self.seg_min[segments, 1] <= ymax)
+        )
+
+        return np.unique(self.owners[segments[inside]])
+
+    def query_bbox_keys(self, xmin, ymin, xmax, ymax):
+        """Return the keys of the polylines with segments inside a bounding box"""
+        return [self.keys[number] for number in self.query_bbox(xmin, ymin, xmax, ymax)]
+
+    def _distances(self, segments, x, y):
+        start = self.starts[segments]
+        direction = self.ends[segments] - start
+        length2 = np.einsum("ij,ij->i", direction, direction)
+        point = np.array([x, y]) - start
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.einsum("ij,ij->i", point, direction) / length2
+
+        fraction = np.clip(np.nan_to_num(fraction), 0.0, 1.0)
+        closest = start + fraction[:, np.newaxis] * direction
+
+        return np.hypot(closest[:, 0] - x, closest[:, 1] - y)
+
+    def nearest(self, x, y, max_distance=None):
+        """Return the key and the distance of the polyline nearest to a point,
+        (None, None) if there are no polylines within max_distance"""
+        if len(self.owners) == 0:
+            return None, None
+
+        i, j = self._cell(np.array([x, y]))
+        n_max = max(abs(i), abs(i - self.nx), abs(j), abs(j - self.ny)) + 1
+
+        if max_distance is not None:
+            n_max = min(n_max, int(max_distance // self.cell_size) + 1)
+
+        ring = 0
+        best_segment = None
+        best_distance = np.inf
+
+        # Search in growing squares of cells until the nearest segment found
+        # is closer than any segment outside the searched cells
+        while True:
+            segments = self._segments_in_cells(
+                (i - ring, i + ring), (j - ring, j + ring)
+            )
+
+            if len(segments) > 0:
+                distances = self._distances(segments, x, y)
+                index = np.argmin(distances)
+
+                if distances[index] < best_distance:
+                    best_distance = distances[index]
+                    best_segment = segments[index]
+
+            if best_segment is not None and best_distance <= ring * self.cell_size:
+                break
+
+            if ring >= n_max:
+                break
+
+            ring = min(max(1, ring * 2), n_max)
+
+        if best_segment is None or (
+            max_distance is not None and best_distance > max_distance
+        ):
+            return None, None
+
+        return self.keys[self.owners[best_segment]], float(best_distance)
+
+    def contains(self, x, y):
+        """Return the keys of the closed polylines (polygons) containing a point"""
+        candidates = np.flatnonzero(
+            self.closed
+            & (self.bounds[:, 0] <= x)
+            & (self.bounds[:, 2] >= x)
+            & (self.bounds[:, 1] <= y)
+            & (self.bounds[:, 3] >= y)
+        )
+
+        if len(candidates) == 0:
+            return []
+
+        segments = np.flatnonzero(np.isin(self.owners, candidates))
+        start = self.starts[segments]
+        end = self.ends[segments]
+
+        # Ray casting: count the edges crossed by a ray from the point towards +x
+        crossing = (start[:, 1] > y) != (end[:, 1] > y)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x_cross = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (
+                end[:, 1] - start[:, 1]
+            )
+
+        crossing &= x < x_cross
+        counts = np.bincount(self.owners[segments[crossing]], minlength=len(self.keys))
+
+        return [self.keys[number] for number in candidates if counts[number] % 2 == 1]
+
+
+def cull_layer(layer, index, xmin, ymin, xmax, ymax):
+    """Return a copy of a LayeredMap layer with only the polylines inside a
+    bounding box. The index must have been created with SpatialIndex.from_layer"""
+    selected = index.query_bbox(xmin, ymin, xmax, ymax)
+    items = [item for item in layer.get("data", []) if "positions" in item]
+
+    culled_layer = dict(layer)
+    culled_layer["data"] = [items[number] for number in selected]
+
+    return culled_layer
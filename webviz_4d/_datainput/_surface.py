@@ -6,10 +6,29 @@ import xtgeo
 from webviz_config.common_cache import CACHE
 
 from .image_processing import array_to_png, get_colormap
+from ._cache import SingleFlight
+
+# Concurrent loads of the same surface (several maps or users asking for the
+# same uncached surface) are done once, the other callers wait for the result
+surface_loads = SingleFlight()
+surface_layers = SingleFlight()
+
+
+def get_single_flight_counters():
+    """Number of calls, executions and collapsed duplicate calls for surface
+    loads and surface layers"""
+    return {
+        "load_surface": surface_loads.counters(),
+        "make_surface_layer": surface_layers.counters(),
+    }
 
 
-@CACHE.memoize(timeout=CACHE.TIMEOUT)
 def load_surface(surface_path):
+    return surface_loads.do(str(surface_path), _load_surface, surface_path)
+
+
+@CACHE.memoize(timeout=CACHE.TIMEOUT)
+def _load_surface(surface_path):
     return xtgeo.surface_from_file(surface_path)
 
 
@@ -31,7 +50,6 @@ def get_surface_fence(fence, surface):
     return surface.get_fence(fence)
 
 
-@CACHE.memoize(timeout=CACHE.TIMEOUT)
 def make_surface_layer(
     surface,
     name="surface",
@@ -41,8 +59,59 @@ def make_surface_layer(
     hillshading=False,
     min_max_df=None,
     unit="",
+    surface_key=None,
+):
+    """Make LayeredMap surface image base layer. Concurrent calls with the same
+    surface_key (e.g. the surface file and its modification time) and layer
+    settings make the layer once"""
+    if surface_key is None:
+        return _make_surface_layer(
+            surface,
+            name=name,
+            min_val=min_val,
+            max_val=max_val,
+            color=color,
+            hillshading=hillshading,
+            min_max_df=min_max_df,
+            unit=unit,
+        )
+
+    key = (
+        surface_key,
+        name,
+        min_val,
+        max_val,
+        color,
+        hillshading,
+        None if min_max_df is None else min_max_df.to_json(),
+        unit,
+    )
+
+    return surface_layers.do(
+        key,
+        _make_surface_layer,
+        surface,
+        name=name,
+        min_val=min_val,
+        max_val=max_val,
+        color=color,
+        hillshading=hillshading,
+        min_max_df=min_max_df,
+        unit=unit,
+    )
+
+
+@CACHE.memoize(timeout=CACHE.TIMEOUT)
+def _make_surface_layer(
+    surface,
+    name="surface",
+    min_val=None,
+    max_val=None,
+    color="inferno",
+    hillshading=False,
+    min_max_df=None,
+    unit="",
 ):
-    """Make LayeredMap surface image base layer"""
     zvalues = get_surface_arr(surface)[2]
     bounds = [[surface.xmin, surface.ymin], [surface.xmax, surface.ymax]]
 
@@ -0,0 +1,58 @@
+import os
+import threading
+
+
+class UpdateWatcher:
+    """Call a function in a background thread when one of the watched files
+    has been modified. The files are checked every interval seconds"""
+
+    def __init__(self, files, callback, interval=60):
+        self.files = list(files)
+        self.callback = callback
+        self.interval = interval
+        self.mtimes = self.get_mtimes()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get_mtimes(self):
+        mtimes = []
+
+        for file_name in self.files:
+            try:
+                mtimes.append(os.path.getmtime(file_name))
+            except OSError:
+                mtimes.append(None)
+
+        return mtimes
+
+    def check(self):
+        """Call the function if any of the files have been modified since
+        the last check, return True if the function was called. If the
+        function fails (e.g. on a half written file), it is called again
+        at the next check"""
+        mtimes = self.get_mtimes()
+
+        if mtimes == self.mtimes:
+            return False
+
+        try:
+            self.callback()
+        except Exception as error:
+            print("WARNING: update failed, retrying at next check:", error)
+            return True
+
+        self.mtimes = mtimes
+
+        return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,260 @@
+"""Precompiled well layers (LayeredMap json) for a given well and production data update"""
+
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from webviz_4d._datainput.common import read_config, get_update_dates, get_dates
+from webviz_4d._datainput.well import load_all_wells, detail_levels
+from webviz_4d._datainput._production import make_new_well_layers
+from webviz_4d._datainput._shared_data import get_file_versions
+from webviz_4d._datainput._config import (
+    get_basic_well_layers,
+    get_additional_well_layers,
+    get_well_layer_labels,
+)
+
+BUNDLE_FORMAT = 2
+
+
+def get_bundle_version(well_update, production_update, sources=None):
+    """Return the bundle version given the well and production update dates and
+    the sources of the layers (see get_bundle_sources)"""
+    version = "v" + str(BUNDLE_FORMAT) + "_" + well_update + "_" + production_update
+
+    if sources is not None:
+        content = json.dumps(sources, sort_keys=True, default=str)
+        version = version + "_" + hashlib.sha1(content.encode()).hexdigest()[:16]
+
+    return version
+
+
+def get_bundle_sources(
+    well_layers_overview,
+    well_layer_dir,
+    production_update,
+    basic_labels,
+    additional_labels,
+    delta,
+):
+    """Return the layer labels, the well resampling and the versions (path and
+    modification time) of the layer files the well layers are made from"""
+    layer_files = [Path(well_layer_dir) / "well_layers.yaml"]
+    layer_files += [
+        layer_file
+        for _key, layer_file in get_basic_layer_files(
+            well_layers_overview, well_layer_dir
+        )
+    ]
+
+    for interval in well_layers_overview.get("additional") or {}:
+        layer_files += [
+            layer_file
+            for _key, layer_file in get_interval_layer_files(
+                well_layers_overview, well_layer_dir, interval, production_update
+            )
+        ]
+
+    return {
+        "labels": [basic_labels, additional_labels],
+        "delta": delta,
+        "files": get_file_versions(layer_files),
+    }
+
+
+def get_bundle_file(well_layer_dir, well_update, production_update):
+    """Return the path to the well layer bundle for the given update dates"""
+    version = get_bundle_version(well_update, production_update)
+
+    return Path(well_layer_dir) / "bundles" / ("well_layers_" + version + ".json")
+
+
+def get_basic_layer_files(well_layers_overview, well_layer_dir):
+    """Return the layer keys and files for all basic well layers"""
+    layer_files = []
+    basic_layers = well_layers_overview.get("basic")
+
+    if basic_layers:
+        for key, value in basic_layers.items():
+            layer_files.append((key, Path(well_layer_dir) / "basic" / value))
+
+    return layer_files
+
+
+def get_interval_layer_files(
+    well_layers_overview, well_layer_dir, interval, production_update
+):
+    """Return the layer keys and files for the well layers in a selected interval,
+    no layers are returned if the interval starts after the last production date"""
+    layer_files = []
+    interval_overview = well_layers_overview.get("additional").get(interval)
+
+    if interval_overview and get_dates(interval)[0] <= production_update:
+        layer_dir = Path(well_layer_dir) / "additional" / interval
+
+        for key, value in interval_overview.items():
+            layer_files.append((key, layer_dir / value))
+
+    return layer_files
+
+
+def _to_json(obj):
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+
+    raise TypeError(
+        "Object of type " + type(obj).__name__ + " is not JSON serializable"
+    )
+
+
+def write_well_layer_bundle(bundle_file, version, basic_layers, interval_layers):
+    """Write basic and interval well layers to a bundle file. The file is written
+    to a temporary file first, so a reader never sees a partly written bundle"""
+    bundle = {
+        "version": version,
+        "basic": basic_layers,
+        "additional": interval_layers,
+    }
+
+    bundle_dir = os.path.dirname(bundle_file)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    file_handle, tmp_file = tempfile.mkstemp(dir=bundle_dir, suffix=".tmp")
+
+    try:
+        with os.fdopen(file_handle, "w") as stream:
+            json.dump(bundle, stream, default=_to_json)
+
+        os.replace(tmp_file, bundle_file)
+    except:
+        os.remove(tmp_file)
+        raise
+
+
+def load_well_layer_bundle(bundle_file, version):
+    """Return the well layer bundle if it exists and is current, otherwise None"""
+    if bundle_file is None or not os.path.isfile(bundle_file):
+        return None
+
+    try:
+        with open(bundle_file, "r") as stream:
+            bundle = json.load(stream)
+    except ValueError:
+        print("WARNING: Could not read well layer bundle", bundle_file)
+        return None
+
+    if bundle.get("version") != version:
+        return None
+
+    return bundle
+
+
+def create_well_layer_bundle(
+    well_data,
+    well_layer_dir,
+    basic_well_layers=None,
+    additional_well_layers=None,
+    delta=40,
+):
+    """Create all basic and interval well layers and write them to a well layer bundle"""
+    update_dates = get_update_dates(
+        welldata=Path(well_data) / ".welldata_update.yaml",
+        productiondata=Path(well_data) / ".production_update.yaml",
+    )
+    well_update = update_dates["well_update_date"]
+    production_update = update_dates["production_last_date"]
+
+    basic_labels = get_basic_well_layers(basic_well_layers)
+    additional_labels = get_additional_well_layers(additional_well_layers)
+
+    all_wells_info = pd.read_csv(Path(well_data) / "wellbore_info.csv")
+    all_wells_df = load_all_wells(all_wells_info, delta)
+    drilled_wells_info = all_wells_info.loc[
+        all_wells_info["layer_name"] == "Drilled wells"
+    ]
+    pdm_wells_info = drilled_wells_info.loc[
+        drilled_wells_info["wellbore.pdm_name"] != ""
+    ]
+    pdm_wells_df = load_all_wells(pdm_wells_info, delta)
+
+    well_layers_overview = read_config(Path(well_layer_dir) / "well_layers.yaml")
+
+    # The layers are stored for each level of detail
+    basic_layers = {level: [] for level in detail_levels}
+
+    for key, layer_file in get_basic_layer_files(well_layers_overview, well_layer_dir):
+        well_layers = make_new_well_layers(
+            layer_file, all_wells_df, basic_labels.get(key)
+        )
+
+        for level, well_layer in well_layers.items():
+            basic_layers[level].append(well_layer)
+
+    interval_layers = {}
+
+    for interval in well_layers_overview.get("additional"):
+        interval_layers[interval] = {level: [] for level in detail_levels}
+        layer_files = get_interval_layer_files(
+            well_layers_overview, well_layer_dir, interval, production_update
+        )
+
+        for key, layer_file in layer_files:
+            well_layers = make_new_well_layers(
+                layer_file, pdm_wells_df, additional_labels.get(key)
+            )
+
+            for level, well_layer in well_layers.items():
+                interval_layers[interval][level].append(well_layer)
+
+    bundle_file = get_bundle_file(well_layer_dir, well_update, production_update)
+    sources = get_bundle_sources(
+        well_layers_overview,
+        well_layer_dir,
+        production_update,
+        basic_labels,
+        additional_labels,
+        delta,
+    )
+    version = get_bundle_version(well_update, production_update, sources)
+    write_well_layer_bundle(bundle_file, version, basic_layers, interval_layers)
+
+    return bundle_file
+
+
+def main():
+    """Create a well layer bundle for a webviz-4d configuration"""
+    description = "Create precompiled well layers for the current well data update"
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("config_file", help="Enter path to the configuration file")
+    parser.add_argument(
+        "--well_layer_dir",
+        help="Folder with well layers (default: well_layers in the configuration folder)",
+    )
+
+    args = parser.parse_args()
+
+    config_file = os.path.abspath(args.config_file)
+    config_folder = os.path.dirname(config_file)
+    config = read_config(config_file)
+
+    shared_settings = config.get("shared_settings")
+    well_data = os.path.join(config_folder, shared_settings.get("well_data"))
+    well_layer_dir = args.well_layer_dir
+
+    if well_layer_dir is None:
+        well_layer_dir = os.path.join(config_folder, "well_layers")
+
+    basic_labels, additional_labels = get_well_layer_labels(shared_settings)
+    bundle_file = create_well_layer_bundle(
+        well_data, well_layer_dir, basic_labels, additional_labels
+    )
+    print("Well layer bundle written to", bundle_file)
+
+
+if __name__ == "__main__":
+    main()
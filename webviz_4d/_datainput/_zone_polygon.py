@@ -1,17 +1,24 @@
 import os
-import math
 import pandas as pd
 from typing import Optional
 from pathlib import Path
 
 from webviz_4d.plugins._surface_viewer_4D._webvizstore import get_path, read_csv
+from webviz_4d._datainput._polygons import (
+    read_prm_receivers,
+    make_prm_layer_df,
+    split_polylines,
+)
 
 
 class Polygon:
     """Class for a polygon in webviz-4d"""
 
     def __init__(
-        self, file_name: str, layer_name: str, polygon_format: Optional[str] = "rms"
+        self,
+        file_name: str,
+        layer_name: str,
+        polygon_format: Optional[str] = "rms",
     ):
         rms_headers = ["X", "Y", "Z", "ID"]
         prm_headers = [
@@ -37,7 +44,11 @@ class Polygon:
             print("ERROR: File", file_name, "not found")
             exit()
 
-        self.dataframe = pd.read_csv(file_name, sep=sep)
+        if polygon_format == "prm":
+            self.dataframe = read_prm_receivers(file_name)
+        else:
+            self.dataframe = pd.read_csv(file_name, sep=sep)
+
         self.format = polygon_format
         self.layer_name = layer_name
 
@@ -52,83 +63,19 @@ class Polygon:
         return txt
 
     def create_rms_layer(self):
-        all_positions = []
-        positions = []
-        ids = []
-
-        polygon_df = self.dataframe
-
-        for _index, row in polygon_df.iterrows():
-            if not math.isnan(row["ID"]):
-                position = [row["X"], row["Y"]]
-
-                if _index == 0:
-                    poly_id = row["ID"]
-
-                if row["ID"] == poly_id:
-                    position = [row["X"], row["Y"]]
-                    positions.append(position)
-                else:
-                    all_positions.append(positions)
-                    positions = []
-                    poly_id = row["ID"]
-                    position = [row["X"], row["Y"]]
-                    positions.append(position)
-                    ids.append(poly_id)
-
-        # Add last line
-        all_positions.append(positions)
-        ids.append(poly_id)
+        polygon_df = self.dataframe.dropna(subset=["ID"])
+        ids, _starts, positions = split_polylines(polygon_df)
 
         layer_df = pd.DataFrame()
         layer_df["id"] = ids
         layer_df["geometry"] = "Polygon"
-        layer_df["coordinates"] = all_positions
+        layer_df["coordinates"] = [polyline.tolist() for polyline in positions]
         layer_df["name"] = self.layer_name
 
         return layer_df
 
     def create_prm_layer(self):
-        layer_df = pd.DataFrame()
-        years = []
-        lines = []
-        coordinates = []
-        coordinates_row = []
-
-        current_line = 1
-        for _index, row in self.dataframe.iterrows():
-            utmx = float(row["RCV_UTMX"])
-            utmy = float(row["RCV_UTMY"])
-            line = int(row["RECEIVER_LINE"])
-            year = int(row["Installation"])
-
-            if current_line == 1:
-                current_year = year
-
-            if line == current_line:
-                coordinates_row.append([utmx, utmy])
-            else:
-                coordinates.append(coordinates_row)
-                years.append(current_year)
-                lines.append(current_line)
-
-                coordinates_row = []
-                coordinates_row.append([utmx, utmy])
-                current_line = line
-                current_year = year
-
-        # Add last line
-        coordinates.append(coordinates_row)
-        years.append(current_year)
-        lines.append(current_line)
-
-        layer_df["line"] = lines
-        layer_df["geometry"] = "Polygon"
-        layer_df["coordinates"] = coordinates
-        layer_df["year"] = years
-        layer_df["name"] = self.layer_name
-
-        return layer_df
+        return make_prm_layer_df(self.dataframe, self.layer_name)
 
     def create_layer(self):
         if self.format == "prm":
@@ -7,6 +7,12 @@ import argparse
 from pathlib import Path
 
 from webviz_4d._datainput.common import read_config
+from webviz_4d._datainput._rms_well import read_rms_well
+
+# Minimum lateral distance (m) between the trajectory points sent to the map
+# for each level of detail
+detail_levels = {"low": 500, "medium": 200, "high": 50}
+default_detail_level = "medium"
 
 
 def load_well(well_path):
@@ -14,7 +20,61 @@ def load_well(well_path):
     return xtgeo.well_from_file(well_path, mdlogname="MD")
 
 
-def load_all_wells(metadata, delta):
+def load_well_trajectory(well_path):
+    """Return the trajectory of a well (RMS ascii format) read with the fast reader,
+    use xtgeo if the file can not be read by the fast reader"""
+    try:
+        return read_rms_well(well_path, mdlogname="MD")
+    except (OSError, ValueError) as error:
+        print("WARNING:", error, ": using xtgeo")
+
+    return load_well(well_path)
+
+
+def load_resampled_well(wellfile, delta, well_cache=None):
+    """Return a well with the trajectory (X, Y, Z and MD) resampled to delta.
+    If a well cache (dict) is given, wells are only read again if the well
+    file has been modified. The cache keeps one version of each well file"""
+    key = (str(wellfile), delta)
+    mtime = None
+
+    if well_cache is not None:
+        try:
+            mtime = os.path.getmtime(wellfile)
+        except OSError:
+            mtime = None
+
+        cached = well_cache.get(key)
+
+        if mtime is not None and cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    well = load_well_trajectory(wellfile)
+
+    # Resample well trajectory to delta
+    try:
+        well.rescale(delta=delta)
+    except:
+        print("WARNING:", well.name, ": rescaling failed, keeping original trajectory")
+
+    well.dataframe = well.dataframe[["X_UTME", "Y_UTMN", "Z_TVDSS", "MD"]]
+
+    if mtime is not None:
+        well_cache[key] = (mtime, well)
+
+    return well
+
+
+def prune_well_cache(well_cache, wellfiles):
+    """Remove wells which are no longer used from a well cache"""
+    wellfiles = set(str(wellfile) for wellfile in wellfiles)
+
+    for key in list(well_cache):
+        if key[0] not in wellfiles:
+            well_cache.pop(key, None)
+
+
+def load_all_wells(metadata, delta, well_cache=None):
     """For all wells in a folder return
     - a list of dataframes with the well trajectories
     - dataframe with metadata for all the wells"""
@@ -29,40 +89,32 @@ def load_all_wells(metadata, delta):
         raise Exception("No wellfiles found")
 
     for wellfile in wellfiles:
-        well = load_well(wellfile)
-
-        # Resample well trajectory to delta
-        try:
-            well.rescale(delta=delta)
-        except:
-            print(
-                "WARNING:", well.name, ": rescaling failed, keeping original trajectory"
-            )
+        well = load_resampled_well(wellfile, delta, well_cache)
+        well_dataframe = well.dataframe.copy()
 
-        well.dataframe = well.dataframe[["X_UTME", "Y_UTMN", "Z_TVDSS", "MD"]]
         well_metadata = metadata.loc[metadata["wellbore.rms_name"] == well.wellname]
         layer_name = well_metadata["layer_name"].values[0]
 
         if layer_name == "Drilled wells":
-            well.dataframe["WELLBORE_NAME"] = well.truewellname
+            well_dataframe["WELLBORE_NAME"] = well.truewellname
             short_name = well.shortwellname
         else:
-            well.dataframe["WELLBORE_NAME"] = well.wellname
+            well_dataframe["WELLBORE_NAME"] = well.wellname
             short_name = well.wellname
 
         well_info = metadata.loc[metadata["wellbore.short_name"] == short_name]
         layer_name = well_info["layer_name"].values[0]
-        well.dataframe["layer_name"] = layer_name
+        well_dataframe["layer_name"] = layer_name
 
-        all_wells_list.append(well.dataframe)
+        all_wells_list.append(well_dataframe)
 
     all_wells_df = pd.concat(all_wells_list)
     return all_wells_df
 
 
-def get_position_data(well_dataframe, md_start, md_end):
-    """Return x- and y-values for a well between given depths"""
-    delta = 200
+def get_position_data(well_dataframe, md_start, md_end, delta=200):
+    """Return x- and y-values for a well between given depths, with a
+    minimum lateral distance delta between the points"""
     positions = [[]]
 
     if not math.isnan(md_start):
@@ -122,10 +174,11 @@ def get_well_polyline(
     md_end,
     color,
     tooltip,
+    delta=200,
 ):
     """Create polyline data - contains well trajectory, color and tooltip"""
 
-    positions = get_position_data(well_dataframe, md_start, md_end)
+    positions = get_position_data(well_dataframe, md_start, md_end, delta)
 
     return {
         "type": "polyline",
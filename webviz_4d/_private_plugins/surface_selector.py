@@ -2,7 +2,6 @@ from datetime import datetime
 from uuid import uuid4
 import json
 import numpy as np
-import dash
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 from dash import html
@@ -10,6 +9,44 @@ from dash import dcc
 
 from webviz_4d._datainput._metadata import unique_values
 
+# Clientside callback for a pair of previous/next buttons (the first two
+# inputs) stepping through the options of a dropdown. Only the new value is
+# sent to the server, the button clicks are handled in the browser
+step_value_js = """
+function(n_prev, n_next, value, options) {
+    const context = dash_clientside.callback_context;
+
+    if (!context.triggered.length || !context.triggered[0].value || value == null) {
+        return dash_clientside.no_update;
+    }
+
+    const values = (options || []).map(
+        (option) => (option !== null && typeof option === "object" ? option.value : option)
+    );
+    const index = values.indexOf(value);
+
+    if (index < 0) {
+        return dash_clientside.no_update;
+    }
+
+    const step = context.triggered_id === context.inputs_list[0].id ? -1 : 1;
+    const new_index = Math.min(values.length - 1, Math.max(0, index + step));
+
+    return new_index === index ? dash_clientside.no_update : values[new_index];
+}
+"""
+
+
+def set_step_value_callback(app, dropdown_id, prev_id, next_id):
+    """Let the previous/next buttons change the dropdown value in the browser"""
+    app.clientside_callback(
+        step_value_js,
+        Output(dropdown_id, "value"),
+        [Input(prev_id, "n_clicks"), Input(next_id, "n_clicks")],
+        [State(dropdown_id, "value"), State(dropdown_id, "options")],
+        prevent_initial_call=True,
+    )
+
 
 class SurfaceSelector:
     # pylint: disable=too-many-instance-attributes,too-many-statements
@@ -137,11 +174,28 @@ class SurfaceSelector:
         )
 
     def selector(
-        self, wrapper_id, dropdown_id, title, default_value, btn_prev, btn_next
+        self,
+        wrapper_id,
+        dropdown_id,
+        title,
+        values,
+        labels,
+        default_value,
+        btn_prev,
+        btn_next,
     ):
+        if not values or not values[0]:
+            return html.Div(
+                id=wrapper_id,
+                style={"visibility": "hidden"},
+                children=[
+                    dcc.Dropdown(id=dropdown_id),
+                    self._make_buttons(btn_prev, btn_next),
+                ],
+            )
+
         return html.Div(
             id=wrapper_id,
-            style={"display": "none"},
             children=[
                 html.Label(title, style={"fontSize": 15, "fontWeight": "bold"}),
                 html.Div(
@@ -149,7 +203,13 @@ class SurfaceSelector:
                     children=[
                         dcc.Dropdown(
                             id=dropdown_id,
-                            value=default_value,
+                            options=[
+                                {"label": label, "value": value}
+                                for label, value in zip(labels, values)
+                            ],
+                            value=(
+                                default_value if default_value in values else values[0]
+                            ),
                             clearable=False,
                             persistence=True,
                             persistence_type="session",
@@ -167,6 +227,10 @@ class SurfaceSelector:
 
     @property
     def layout(self):
+        # The names and intervals do not depend on the selected attribute
+        names = self._names_in_attr()
+        intervals = self._interval_in_attr()
+
         return html.Div(
             children=[
                 html.Div(
@@ -176,6 +240,8 @@ class SurfaceSelector:
                             self.name_wrapper_id,
                             self.name_id,
                             "Surface/Zone name",
+                            names,
+                            names,
                             self.current_selections["name"],
                             self.name_id_btn_prev,
                             self.name_id_btn_next,
@@ -184,6 +250,8 @@ class SurfaceSelector:
                             self.date_wrapper_id,
                             self.date_id,
                             "Interval",
+                            intervals,
+                            [format_date(interval) for interval in intervals],
                             self.current_selections["interval"],
                             self.date_id_btn_prev,
                             self.date_id_btn_next,
@@ -195,92 +263,15 @@ class SurfaceSelector:
         )
 
     def set_callbacks(self, app):
-        # pylint: disable=inconsistent-return-statements
-        @app.callback(
-            Output(self.attr_id, "value"),
-            [
-                Input(self.attr_id_btn_prev, "n_clicks"),
-                Input(self.attr_id_btn_next, "n_clicks"),
-            ],
-            [State(self.attr_id, "value")],
+        set_step_value_callback(
+            app, self.attr_id, self.attr_id_btn_prev, self.attr_id_btn_next
         )
-        def _update_attr(_n_prev, _n_next, current_value):
-            ctx = dash.callback_context.triggered
-            if ctx is None or not current_value:
-                raise PreventUpdate
-            if not ctx[0]["value"]:
-                return current_value
-            callback = ctx[0]["prop_id"]
-            if callback == f"{self.attr_id_btn_prev}.n_clicks":
-                return prev_value(current_value, self.attrs)
-            if callback == f"{self.attr_id_btn_next}.n_clicks":
-                return next_value(current_value, self.attrs)
-
-        @app.callback(
-            [
-                Output(self.name_id, "options"),
-                Output(self.name_id, "value"),
-                Output(self.name_wrapper_id, "style"),
-            ],
-            [
-                Input(self.attr_id, "value"),
-                Input(self.name_id_btn_prev, "n_clicks"),
-                Input(self.name_id_btn_next, "n_clicks"),
-            ],
-            [State(self.name_id, "value")],
+        set_step_value_callback(
+            app, self.name_id, self.name_id_btn_prev, self.name_id_btn_next
         )
-        def _update_name(attr, _n_prev, _n_next, current_value):
-            ctx = dash.callback_context.triggered
-
-            if ctx is None:
-                raise PreventUpdate
-            names = self._names_in_attr()
-
-            if not names:
-                return None, None, {"visibility": "hidden"}
-
-            callback = ctx[0]["prop_id"]
-            if callback == f"{self.name_id_btn_prev}.n_clicks":
-                value = prev_value(current_value, names)
-            elif callback == f"{self.name_id_btn_next}.n_clicks":
-                value = next_value(current_value, names)
-            else:
-                value = current_value if current_value in names else names[0]
-            options = [{"label": name, "value": name} for name in names]
-            return options, value, {}
-
-        @app.callback(
-            [
-                Output(self.date_id, "options"),
-                Output(self.date_id, "value"),
-                Output(self.date_wrapper_id, "style"),
-            ],
-            [
-                Input(self.attr_id, "value"),
-                Input(self.date_id_btn_prev, "n_clicks"),
-                Input(self.date_id_btn_next, "n_clicks"),
-            ],
-            [State(self.date_id, "value")],
+        set_step_value_callback(
+            app, self.date_id, self.date_id_btn_prev, self.date_id_btn_next
         )
-        def _update_date(attr, _n_prev, _n_next, current_value):
-            ctx = dash.callback_context.triggered
-
-            if ctx is None:
-                raise PreventUpdate
-            interval = self._interval_in_attr()
-
-            if not interval or not interval[0]:
-                return [], None, {"visibility": "hidden"}
-
-            callback = ctx[0]["prop_id"]
-            if callback == f"{self.date_id_btn_prev}.n_clicks":
-                value = prev_value(current_value, interval)
-            elif callback == f"{self.date_id_btn_next}.n_clicks":
-                value = next_value(current_value, interval)
-            else:
-                value = current_value if current_value in interval else interval[0]
-            options = [{"label": format_date(date), "value": date} for date in interval]
-            return options, value, {}
 
         @app.callback(
             Output(self.storage_id, "children"),
@@ -307,22 +298,6 @@ class SurfaceSelector:
             return json.dumps({"name": name, "attr": attr, "date": date})
 
 
-def prev_value(current_value, options):
-    try:
-        index = options.index(current_value)
-        return options[max(0, index - 1)]
-    except ValueError:
-        return current_value
-
-
-def next_value(current_value, options):
-    try:
-        index = options.index(current_value)
-        return options[min(len(options) - 1, index + 1)]
-    except ValueError:
-        return current_value
-
-
 def format_date(date_string):
     """Reformat date string for presentation
     20010101 => Jan 2001
@@ -2,101 +2,192 @@ import dash
 from dash.exceptions import PreventUpdate
 from dash.dependencies import Input, Output, State
 
+from webviz_4d._private_plugins.surface_selector import set_step_value_callback
 
-def set_first_map(parent, app):
-    # First map
-    @app.callback(
-        [
-            Output(parent.uuid("heading1"), "children"),
-            Output(parent.uuid("sim_info1"), "children"),
-            Output(parent.uuid("map"), "layers"),
-            Output(parent.uuid("interval-label1"), "children"),
-        ],
+from ._layer_patch import make_layers_patch
+
+
+def get_map_inputs(parent):
+    """Return the ids of the inputs (selected surface, iteration and realization)
+    for each of the three maps"""
+    return [
         [
-            Input(parent.selector.storage_id, "children"),
-            Input(parent.uuid("iteration"), "value"),
-            Input(parent.uuid("realization"), "value"),
-            Input(parent.uuid("attribute-settings"), "data"),
+            parent.selector.storage_id,
+            parent.uuid("iteration"),
+            parent.uuid("realization"),
         ],
-    )
-    # pylint: disable=too-many-arguments, too-many-locals
-    def _set_base_layer(
-        data,
-        iteration,
-        real,
-        attribute_settings,
-    ):
-        return parent.make_map(data, iteration, real, attribute_settings, 0)
-
-
-def set_second_map(parent, app):
-    # Second map
-    @app.callback(
         [
-            Output(parent.uuid("heading2"), "children"),
-            Output(parent.uuid("sim_info2"), "children"),
-            Output(parent.uuid("map2"), "layers"),
-            Output(parent.uuid("interval-label2"), "children"),
+            parent.selector2.storage_id,
+            parent.uuid("iteration2"),
+            parent.uuid("realization2"),
         ],
         [
-            Input(parent.selector2.storage_id, "children"),
-            Input(parent.uuid("iteration2"), "value"),
-            Input(parent.uuid("realization2"), "value"),
-            Input(parent.uuid("attribute-settings"), "data"),
+            parent.selector3.storage_id,
+            parent.uuid("iteration3"),
+            parent.uuid("realization3"),
         ],
+    ]
+
+
+# Clientside callback giving each page load its own session id, used to let a
+# new map render supersede older renders of the same map in the same page
+session_id_js = """
+function(_id) {
+    return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2);
+}
+"""
+
+
+def set_session_id(parent, app):
+    """Store a new session id in the browser when the page is loaded"""
+    app.clientside_callback(
+        session_id_js,
+        Output(parent.uuid("session-id"), "data"),
+        Input(parent.uuid("session-id"), "id"),
     )
-    # pylint: disable=too-many-arguments, too-many-locals
-    def _set_base_layer(
-        data,
-        iteration,
-        real,
-        attribute_settings,
-    ):
-        return parent.make_map(data, iteration, real, attribute_settings, 1)
-
-
-def set_third_map(parent, app):
-    # Third map
-    @app.callback(
-        [
-            Output(parent.uuid("heading3"), "children"),
-            Output(parent.uuid("sim_info3"), "children"),
-            Output(parent.uuid("map3"), "layers"),
-            Output(parent.uuid("interval-label3"), "children"),
-        ],
+
+
+def get_maps_to_update(triggered_ids, map_inputs):
+    """Return the numbers of the maps to update, all maps are updated if a
+    common input (or no input) triggered the callback"""
+    maps = set()
+
+    for triggered_id in triggered_ids:
+        numbers = [
+            number for number, inputs in enumerate(map_inputs) if triggered_id in inputs
+        ]
+
+        if not numbers:
+            return list(range(len(map_inputs)))
+
+        maps.update(numbers)
+
+    if not maps:
+        return list(range(len(map_inputs)))
+
+    return sorted(maps)
+
+
+# Heading, info, map, interval label and layer signatures ids for each map
+map_outputs = [
+    ("heading1", "sim_info1", "map", "interval-label1", "layer-signatures1"),
+    ("heading2", "sim_info2", "map2", "interval-label2", "layer-signatures2"),
+    ("heading3", "sim_info3", "map3", "interval-label3", "layer-signatures3"),
+]
+
+
+def get_map_outputs(parent, allow_duplicate=False):
+    outputs = []
+
+    for heading, sim_info, map_id, label, signatures_id in map_outputs:
+        outputs.extend(
+            [
+                Output(parent.uuid(heading), "children", allow_duplicate),
+                Output(parent.uuid(sim_info), "children", allow_duplicate),
+                Output(parent.uuid(map_id), "layers", allow_duplicate),
+                Output(parent.uuid(label), "children", allow_duplicate),
+                Output(parent.uuid(signatures_id), "data", allow_duplicate),
+            ]
+        )
+
+    return outputs
+
+
+def set_maps(parent, app):
+    # All three maps are rendered in one callback, so a common input (e.g. the
+    # attribute settings) renders each distinct surface once
+    map_inputs = get_map_inputs(parent)
+
+    # The signatures of the layers shown in each map are kept in the browser,
+    # so only changed layers are sent (as partial updates of the layers)
+    outputs = get_map_outputs(parent)
+    states = [
+        State(parent.uuid(signatures_id), "data")
+        for *_ids, signatures_id in map_outputs
+    ]
+    states.append(State(parent.uuid("session-id"), "data"))
+
+    inputs = []
+    for selector_id, iteration_id, realization_id in map_inputs:
+        inputs.extend(
+            [
+                Input(selector_id, "children"),
+                Input(iteration_id, "value"),
+                Input(realization_id, "value"),
+            ]
+        )
+
+    inputs.extend(
         [
-            Input(parent.selector3.storage_id, "children"),
-            Input(parent.uuid("iteration3"), "value"),
-            Input(parent.uuid("realization3"), "value"),
             Input(parent.uuid("attribute-settings"), "data"),
-        ],
+            Input(parent.uuid("detail-level"), "value"),
+        ]
     )
-    # pylint: disable=too-many-arguments, too-many-locals
-    def _set_base_layer(
-        data,
-        iteration,
-        real,
-        attribute_settings,
-    ):
-        return parent.make_map(data, iteration, real, attribute_settings, 2)
 
+    @app.callback(outputs, inputs, states)
+    def _set_base_layers(*args):
+        attribute_settings, detail_level = args[-6:-4]
+        client_signatures = args[-4:-1]
+        session_id = args[-1]
+        triggered_ids = [
+            item["prop_id"].rsplit(".", 1)[0]
+            for item in dash.callback_context.triggered
+            if item["prop_id"] != "."
+        ]
+        maps = get_maps_to_update(triggered_ids, map_inputs)
 
-def change_maps_from_button(parent, app):
-    def _update_from_btn(_n_prev, _n_next, current_value, options):
-        """Updates dropdown value if previous/next btn is clicked"""
-        options = [opt["value"] for opt in options]
-        ctx = dash.callback_context.triggered
-        if not ctx or current_value is None:
+        map_requests = [
+            (number, args[3 * number], args[3 * number + 1], args[3 * number + 2])
+            for number in maps
+        ]
+        results = parent.make_maps(
+            map_requests, attribute_settings, detail_level, client=session_id
+        )
+
+        # Renders superseded by a newer request from the same page return None
+        if all(result is None for result in results):
             raise PreventUpdate
-        if not ctx[0]["value"]:
-            return current_value
-        callback = ctx[0]["prop_id"]
-        if "-prev" in callback:
-            return prev_value(current_value, options)
-        if "-next" in callback:
-            return next_value(current_value, options)
-        return current_value
 
+        values = [dash.no_update] * len(outputs)
+
+        for number, result in zip(maps, results):
+            if result is not None:
+                heading, sim_info, layers, label, signatures = result
+                layers, signatures = make_layers_patch(
+                    layers, signatures, client_signatures[number]
+                )
+                values[5 * number : 5 * number + 5] = [
+                    heading,
+                    sim_info,
+                    layers,
+                    label,
+                    signatures,
+                ]
+
+        return values
+
+
+def set_map_info(parent, app):
+    # Information about the position of a marker placed in one of the maps
+    for map_id, info_id in [
+        ("map", "map-info1"),
+        ("map2", "map-info2"),
+        ("map3", "map-info3"),
+    ]:
+
+        @app.callback(
+            Output(parent.uuid(info_id), "children"),
+            [Input(parent.uuid(map_id), "marker_point")],
+        )
+        def _set_map_info(marker_point):
+            if not marker_point:
+                raise PreventUpdate
+
+            return parent.get_map_info(marker_point)
+
+
+def change_maps_from_button(parent, app):
+    # The buttons are handled in the browser, only the new value hits the server
     for btn_name in [
         "iteration",
         "realization",
@@ -105,31 +196,105 @@ def change_maps_from_button(parent, app):
         "iteration3",
         "realization3",
     ]:
-        app.callback(
-            Output(parent.uuid(f"{btn_name}"), "value"),
-            [
-                Input(parent.uuid(f"{btn_name}-prev"), "n_clicks"),
-                Input(parent.uuid(f"{btn_name}-next"), "n_clicks"),
-            ],
-            [
-                State(parent.uuid(f"{btn_name}"), "value"),
-                State(parent.uuid(f"{btn_name}"), "options"),
-            ],
-        )(_update_from_btn)
+        set_step_value_callback(
+            app,
+            parent.uuid(f"{btn_name}"),
+            parent.uuid(f"{btn_name}-prev"),
+            parent.uuid(f"{btn_name}-next"),
+        )
+
 
+def set_background_jobs(parent, app):
+    map_inputs = get_map_inputs(parent)
 
-def prev_value(current_value, options):
-    try:
-        index = options.index(current_value)
-        return options[max(0, index - 1)]
-    except ValueError:
-        return current_value
+    @app.callback(
+        [
+            Output(parent.uuid("job"), "data"),
+            Output(parent.uuid("job-interval"), "disabled"),
+            Output(parent.uuid("job-progress"), "value"),
+            Output(parent.uuid("job-status"), "children"),
+        ],
+        [
+            Input(parent.uuid("job-start"), "n_clicks"),
+            Input(parent.uuid("job-cancel"), "n_clicks"),
+            Input(parent.uuid("job-interval"), "n_intervals"),
+        ],
+        [
+            State(parent.uuid("job-map"), "value"),
+            State(parent.uuid("job-statistic"), "value"),
+            State(parent.uuid("job"), "data"),
+        ]
+        + [State(selector_id, "children") for selector_id, _, _ in map_inputs]
+        + [State(iteration_id, "value") for _, iteration_id, _ in map_inputs],
+        prevent_initial_call=True,
+    )
+    def _update_job(_n_start, _n_cancel, _n_intervals, map_idx, statistic, job, *args):
+        """Start, cancel and poll the status of an ensemble statistic job"""
+        triggered = dash.callback_context.triggered[0]["prop_id"]
+        job_changed = False
+
+        if triggered.startswith(parent.uuid("job-start")) and map_idx is not None:
+            data = args[map_idx]
+            iteration = args[len(map_inputs) + map_idx]
+            job_id = parent.start_statistic_job(map_idx, data, iteration, statistic)
+
+            if job_id is None:
+                return None, True, "0", "No realization surfaces found"
+
+            job = {
+                "job_id": job_id,
+                "map_idx": map_idx,
+                "data": data,
+                "iteration": iteration,
+                "statistic": statistic,
+            }
+            job_changed = True
+        elif triggered.startswith(parent.uuid("job-cancel")) and job:
+            parent.background_jobs.cancel(job["job_id"])
+
+        if not job:
+            raise PreventUpdate
+
+        status = parent.background_jobs.status(job["job_id"])
+        running = status["state"] in ["queued", "running"]
+
+        message = f"{job['statistic']}: {status['state']} {status['message']}"
+
+        # The job is only updated when it is started and when it has stopped
+        if job_changed or status["state"] != job.get("state"):
+            new_job = dict(job, state=status["state"], result=status.get("result"))
+        else:
+            new_job = dash.no_update
+
+        return new_job, not running, str(status["progress"]), message
+
+    @app.callback(
+        get_map_outputs(parent, allow_duplicate=True),
+        [Input(parent.uuid("job"), "data")],
+        [
+            State(parent.uuid("attribute-settings"), "data"),
+            State(parent.uuid("detail-level"), "value"),
+        ],
+        prevent_initial_call=True,
+    )
+    def _show_job_result(job, attribute_settings, detail_level):
+        """Show the result of a completed job in the selected map"""
+        if not job or job.get("state") != "done":
+            raise PreventUpdate
 
+        number = job["map_idx"]
+        values = [dash.no_update] * len(map_outputs) * 5
+        heading, sim_info, layers, label, signatures = parent.make_statistic_map(
+            job, attribute_settings, detail_level
+        )
 
-def next_value(current_value, options):
-    try:
-        index = options.index(current_value)
-        return options[min(len(options) - 1, index + 1)]
+        # All layers are sent
+        values[5 * number : 5 * number + 5] = [
+            heading,
+            sim_info,
+            layers,
+            label,
+            signatures,
+        ]
 
-    except ValueError:
-        return current_value
+        return values
@@ -0,0 +1,70 @@
+import json
+import hashlib
+
+import dash
+from plotly.utils import PlotlyJSONEncoder
+
+from webviz_4d._datainput._cache import LRUCache
+
+
+class LayerSignatures:
+    """Content signatures of map layers. A surface layer is signed by its render
+    key (surface file, modification time and settings), so surface layers are
+    neither serialized nor kept here. The other layers (polygon and well layers)
+    are cached objects reused for every map, their signature (md5 of the json)
+    is cached per layer object. The layer is kept in the cache together with
+    its signature, so the id of a cached layer is not reused"""
+
+    def __init__(self, maxsize: int = 256):
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def get(self, layer):
+        cached = self.cache.get(id(layer))
+
+        if cached is not None and cached[0] is layer:
+            return cached[1]
+
+        signature = hashlib.md5(
+            json.dumps(layer, cls=PlotlyJSONEncoder).encode()
+        ).hexdigest()
+        self.cache.put(id(layer), (layer, signature))
+
+        return signature
+
+    @staticmethod
+    def get_surface(render_key):
+        """Return the signature of the surface layer rendered with render_key"""
+        content = json.dumps(render_key, default=str)
+
+        return "surface-" + hashlib.md5(content.encode()).hexdigest()
+
+    def get_map(self, layers, render_key):
+        """Return the signatures of the layers of a map, the first layer is the
+        surface layer"""
+        if not layers:
+            return []
+
+        return [self.get_surface(render_key)] + [
+            self.get(layer) for layer in layers[1:]
+        ]
+
+
+def make_layers_patch(layers, signatures, client_signatures):
+    """Return the update of the map layers and the new signatures. Only the
+    layers with a changed signature are sent (as a dash.Patch), all layers are
+    sent if the number of layers has changed or the client has no signatures"""
+    if client_signatures is None or len(client_signatures) != len(signatures):
+        return layers, signatures
+
+    patch = dash.Patch()
+    changed = False
+
+    for index, (layer, signature) in enumerate(zip(layers, signatures)):
+        if signature != client_signatures[index]:
+            patch[index] = layer
+            changed = True
+
+    if not changed:
+        return dash.no_update, dash.no_update
+
+    return patch, signatures
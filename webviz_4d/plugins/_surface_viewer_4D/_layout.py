@@ -6,6 +6,9 @@ from dash import dcc
 
 from webviz_subsurface_components import LayeredMap
 
+from webviz_4d._datainput.well import detail_levels, default_detail_level
+from webviz_4d._datainput._ensemble_statistics import ensemble_statistics
+
 
 def set_grid_layout(columns):
     return {
@@ -121,6 +124,88 @@ def iteration_layout(
     )
 
 
+def detail_level_layout(parent):
+    """Selection of the level of detail for the map overlays (same for all maps)"""
+    return html.Div(
+        style={"margin": "10px"},
+        children=[
+            html.Label(
+                "Level of detail",
+                style={"fontSize": 15, "fontWeight": "bold"},
+            ),
+            dcc.RadioItems(
+                id=parent.uuid("detail-level"),
+                options=[
+                    {"label": level.capitalize(), "value": level}
+                    for level in detail_levels
+                ],
+                value=default_detail_level,
+                inline=True,
+                persistence=True,
+                persistence_type="session",
+                style={"fontSize": 15},
+                inputStyle={"marginLeft": "10px", "marginRight": "5px"},
+            ),
+        ],
+    )
+
+
+def background_job_layout(parent):
+    """Ensemble statistics calculated as background jobs, with progress and
+    cancellation. The result is shown in the selected (simulated) map"""
+    maps = [
+        {"label": f"Map {number + 1}", "value": number}
+        for number, map_defaults in enumerate(parent.map_defaults)
+        if map_defaults["map_type"] == parent.simulations
+    ]
+
+    return html.Div(
+        style={"margin": "10px"},
+        children=[
+            html.Label(
+                "Ensemble statistics",
+                style={"fontSize": 15, "fontWeight": "bold"},
+            ),
+            html.Div(
+                style=set_grid_layout("2fr 2fr 1fr 1fr 3fr 4fr"),
+                children=[
+                    dcc.Dropdown(
+                        id=parent.uuid("job-map"),
+                        options=maps,
+                        value=maps[0]["value"] if maps else None,
+                        clearable=False,
+                        style={"fontSize": 15, "fontWeight": "normal"},
+                    ),
+                    dcc.Dropdown(
+                        id=parent.uuid("job-statistic"),
+                        options=[
+                            {"label": statistic, "value": statistic}
+                            for statistic in ensemble_statistics
+                        ],
+                        value=ensemble_statistics[0],
+                        clearable=False,
+                        style={"fontSize": 15, "fontWeight": "normal"},
+                    ),
+                    html.Button("Calculate", id=parent.uuid("job-start")),
+                    html.Button("Cancel", id=parent.uuid("job-cancel")),
+                    html.Progress(
+                        id=parent.uuid("job-progress"),
+                        value="0",
+                        max="1",
+                        style={"width": "100%"},
+                    ),
+                    html.Div(
+                        id=parent.uuid("job-status"),
+                        style={"fontSize": 15},
+                    ),
+                ],
+            ),
+            dcc.Store(id=parent.uuid("job")),
+            dcc.Interval(id=parent.uuid("job-interval"), interval=1000, disabled=True),
+        ],
+    )
+
+
 def set_layout(parent):
     update_txt = "Well data update: " + parent.well_update
     if parent.production_update != "":
@@ -187,6 +272,8 @@ def set_layout(parent):
                     ),
                 ],
             ),
+            detail_level_layout(parent),
+            background_job_layout(parent),
             wcc.FlexBox(
                 style={"fontSize": "1rem"},
                 children=[
@@ -215,6 +302,7 @@ def set_layout(parent):
                                 height=600,
                                 layers=[],
                                 hillShading=False,
+                                draw_toolbar_marker=True,
                             ),
                             html.Div(
                                 id=parent.uuid("interval-label1"),
@@ -224,6 +312,10 @@ def set_layout(parent):
                                     "fontWeight": "bold",
                                 },
                             ),
+                            html.Div(
+                                id=parent.uuid("map-info1"),
+                                style={"textAlign": "center", "fontSize": 15},
+                            ),
                         ],
                     ),
                     html.Div(
@@ -251,6 +343,7 @@ def set_layout(parent):
                                 height=600,
                                 layers=[],
                                 hillShading=False,
+                                draw_toolbar_marker=True,
                             ),
                             html.Div(
                                 id=parent.uuid("interval-label2"),
@@ -260,6 +353,10 @@ def set_layout(parent):
                                     "fontWeight": "bold",
                                 },
                             ),
+                            html.Div(
+                                id=parent.uuid("map-info2"),
+                                style={"textAlign": "center", "fontSize": 15},
+                            ),
                         ],
                     ),
                     html.Div(
@@ -287,6 +384,7 @@ def set_layout(parent):
                                 height=600,
                                 layers=[],
                                 hillShading=False,
+                                draw_toolbar_marker=True,
                             ),
                             html.Div(
                                 id=parent.uuid("interval-label3"),
@@ -296,12 +394,20 @@ def set_layout(parent):
                                     "fontWeight": "bold",
                                 },
                             ),
+                            html.Div(
+                                id=parent.uuid("map-info3"),
+                                style={"textAlign": "center", "fontSize": 15},
+                            ),
                         ],
                     ),
                     dcc.Store(
                         id=parent.uuid("attribute-settings"),
                         data=json.dumps(parent.attribute_settings),
                     ),
+                    dcc.Store(id=parent.uuid("layer-signatures1")),
+                    dcc.Store(id=parent.uuid("layer-signatures2")),
+                    dcc.Store(id=parent.uuid("layer-signatures3")),
+                    dcc.Store(id=parent.uuid("session-id")),
                 ],
             ),
             html.H6(update_txt),
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+
+def get_surface_type(realization):
+    """Return the surface type (realization, observation or aggregation)
+    given the selected realization"""
+    if "realization" in realization:
+        return "realization"
+
+    if "---" in realization:
+        return "observation"
+
+    return "aggregation"
+
+
+class RenderSuperseded(Exception):
+    """Raised at a render checkpoint when a newer render of the same map
+    has been requested"""
+
+
+class RenderGenerations:
+    """Thread safe generation counters, one per map (and client). Each new
+    render of a map gets a new generation, and older renders of the same
+    map are superseded. Only the maxsize most recently rendered maps are
+    kept (each page load is a new client)"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._generations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, key):
+        with self._lock:
+            generation = self._generations.pop(key, 0) + 1
+            self._generations[key] = generation
+
+            while len(self._generations) > self.maxsize:
+                self._generations.popitem(last=False)
+
+            return generation
+
+    def is_current(self, key, generation):
+        with self._lock:
+            return self._generations.get(key, 0) == generation
+
+
+def check_superseded(contexts):
+    """Stop the render (raise RenderSuperseded) if all the maps it is made
+    for have been superseded"""
+    if all(context.is_superseded() for context in contexts):
+        raise RenderSuperseded()
+
+
+class RenderContext:
+    """The selections for one map render (one call to make_map). The plugin
+    is not changed while a map is rendered, all state for the render is kept
+    here, so several maps (and users) can be rendered at the same time"""
+
+    def __init__(
+        self,
+        map_idx,
+        map_type,
+        data,
+        iteration,
+        realization,
+        detail_level,
+        well_data,
+        generations=None,
+        generation_key=None,
+    ):
+        self.map_idx = map_idx
+        self.map_type = map_type
+        self.data = data
+        self.name = data.get("name")
+        self.attribute = data.get("attr")
+        self.interval = data.get("date")
+        self.iteration = iteration
+        self.realization = realization
+        self.surface_type = get_surface_type(realization)
+        self.detail_level = detail_level
+
+        # The same well data are used for the whole map, also if updated
+        # data are loaded in the meantime
+        self.well_data = well_data
+
+        # Renders without a generation key are never superseded
+        self.generations = generations
+        self.generation_key = generation_key
+        self.generation = None
+
+        if generations is not None and generation_key is not None:
+            self.generation = generations.start(generation_key)
+
+    def is_superseded(self):
+        if self.generation is None:
+            return False
+
+        return not self.generations.is_current(self.generation_key, self.generation)
@@ -2,6 +2,11 @@ from typing import List, Tuple, Callable
 from pathlib import Path
 import json
 import os
+import stat
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 
@@ -9,33 +14,52 @@ from webviz_config import WebvizPluginABC
 from webviz_4d._datainput._surface import make_surface_layer, load_surface
 from webviz_4d._datainput.common import (
     read_config,
-    get_update_dates,
     get_plot_label,
     get_dates,
     get_last_date,
     get_map_min_max,
 )
-from webviz_4d._datainput.well import load_all_wells
-from webviz_4d._datainput._production import make_new_well_layer
+from webviz_4d._datainput.well import detail_levels, default_detail_level
 from webviz_4d._private_plugins.surface_selector import SurfaceSelector
 from webviz_4d._datainput._colormaps import load_custom_colormaps
-from webviz_4d._datainput._config import get_basic_well_layers
+from webviz_4d._datainput._config import (
+    get_well_layer_labels,
+)
 from webviz_4d._datainput._settings import get_color
 from webviz_4d._datainput._polygons import (
     make_polyline_layer,
+    make_polygon_layers,
     get_polygon_name,
     get_polygon_files,
     get_default_polygon_files,
+    PolygonFileIndex,
 )
 from webviz_4d._datainput._metadata import define_map_defaults
-from ._webvizstore import read_csv, read_csvs, find_files, get_path
+from webviz_4d._datainput._cache import LRUCache
+from webviz_4d._datainput._shared_data import shared_data
+from webviz_4d._datainput._render_cache import DiskRenderCache
+from webviz_4d._datainput._background_jobs import BackgroundJobs
+from webviz_4d._datainput._ensemble_statistics import make_statistic_surface
+from webviz_4d._datainput._spatial_index import SpatialIndex
+from webviz_4d._datainput._update_watcher import UpdateWatcher
+from ._webvizstore import read_csv, read_production_data, find_files, get_path
+from ._well_data import WellData
 from ._callbacks import (
-    set_first_map,
-    set_second_map,
-    set_third_map,
+    set_session_id,
+    set_maps,
+    set_map_info,
     change_maps_from_button,
+    set_background_jobs,
 )
 from ._layout import set_layout
+from ._layer_patch import LayerSignatures
+from ._render_context import (
+    get_surface_type,
+    RenderContext,
+    RenderGenerations,
+    RenderSuperseded,
+    check_superseded,
+)
 
 
 class SurfaceViewer4D(WebvizPluginABC):
@@ -58,15 +82,24 @@ class SurfaceViewer4D(WebvizPluginABC):
         surface_scaling_file: Path = None,
         interval_mode: str = "normal",
         selector_file: Path = None,
+        interval_layers_cache_size: int = 10,
+        prewarm_interval_layers: bool = False,
+        well_data_reload_interval: int = 60,
+        polygon_layers_cache_size: int = 32,
+        polygon_rescan_interval: int = 60,
+        compact_layers: bool = False,
+        layer_decimals: int = 1,
+        render_cache_directory: Path = None,
+        render_cache_size: int = 1024,
+        job_directory: Path = None,
+        background_workers: int = 2,
+        job_directory_size: int = 1024,
     ):
         super().__init__()
         self.shared_settings = app.webviz_settings.get("shared_settings")
         self.fmu_directory = self.shared_settings.get("fmu_directory")
         self.label = self.shared_settings.get("label", self.fmu_directory)
 
-        basic_well_layers = self.shared_settings.get("basic_well_layers", None)
-        additional_well_layers = self.shared_settings.get("additional_well_layers")
-
         self.map_suffix = map_suffix
         self.interval_mode = interval_mode
 
@@ -77,20 +110,68 @@ class SurfaceViewer4D(WebvizPluginABC):
 
         self.surface_layer = None
         self.attribute_settings = {}
-        self.well_update = ""
-        self.production_update = ""
-        self.selected_names = [None, None, None]
-        self.selected_attributes = [None, None, None]
-        self.selected_iterations = [None, None, None]
-        self.selected_realizations = [None, None, None]
-        self.selected_intervals = ["", "", ""]
         self.well_base_layers = []
-        self.interval_well_layers = {}
+        self.polygon_index = None
+        self.max_well_distance = 1000  # Max distance (m) to the nearest well
+        self.interval_layers_cache_size = interval_layers_cache_size
+        self.well_delta = 40  # Well trajectory resampling (along MD)
+        self.well_cache = {}
+        self.reload_lock = threading.Lock()
+        self.update_watcher = None
+
+        # Data which can be shared with other plugin instances (e.g. on other
+        # pages) are kept in the process wide registry, see acquire_shared_data
+        self.shared_data_keys = []
+        weakref.finalize(self, release_shared_data, self.shared_data_keys)
+
+        self.polygon_layers_cache = self.acquire_shared_data(
+            "polygon_layers_cache",
+            [],
+            lambda: LRUCache(maxsize=polygon_layers_cache_size),
+            polygon_layers_cache_size,
+        )
+        self.polygon_names = {}
+        self.polygon_files = self.acquire_shared_data(
+            "polygon_files",
+            [],
+            lambda: PolygonFileIndex(rescan_interval=polygon_rescan_interval),
+            polygon_rescan_interval,
+        )
+
+        # The distinct surface layers of the three maps are rendered in parallel
+        self.render_executor = ThreadPoolExecutor(max_workers=self.number_of_maps)
+        self.render_generations = RenderGenerations()
+        self.layer_signatures = LayerSignatures()
+
+        # Optional cache of rendered surface layers on local disk (size in MB),
+        # shared by all worker processes on the host
+        self.render_cache = None
+
+        if render_cache_directory is not None:
+            self.render_cache = DiskRenderCache(
+                render_cache_directory, render_cache_size * 1024**2
+            )
+
+        # Long running computations (ensemble statistics) run as background
+        # jobs in a local process pool (started by the first job), with status
+        # and results on local disk
+        if job_directory is None:
+            job_directory = Path(tempfile.gettempdir()) / "webviz_4d_jobs"
+
+        self.background_jobs = BackgroundJobs(
+            job_directory, background_workers, max_bytes=job_directory_size * 1024**2
+        )
+
+        # Polyline layers can be sent to the map in compact form, with the
+        # positions rounded to layer_decimals (see compact_polyline_layer)
+        self.compact_layers = compact_layers
+        self.layer_decimals = layer_decimals
 
         # Define well layers
-        self.basic_well_layers = get_basic_well_layers(basic_well_layers)
-        self.additional_well_layers = get_basic_well_layers(basic_well_layers)
-        self.all_well_layers = self.basic_well_layers.update(additional_well_layers)
+        self.basic_well_layers, self.additional_well_layers = get_well_layer_labels(
+            self.shared_settings
+        )
+        self.all_well_layers = {**self.basic_well_layers, **self.additional_well_layers}
 
         # Top reservoir settings
         self.top_reservoir = self.shared_settings.get("top_reservoir", None)
@@ -116,30 +197,42 @@ class SurfaceViewer4D(WebvizPluginABC):
 
             directory = self.top_reservoir.get("directory")
             self.polygon_paths = get_polygon_files(
-                self.polygon_mapping, self.selection_dict, directory, self.fmu_directory
+                self.polygon_mapping,
+                self.selection_dict,
+                directory,
+                self.fmu_directory,
+                self.polygon_files,
             )
         else:
             print("WARNING: Polygon mapping not supplied")
             self.polygon_mapping = pd.DataFrame()
+            self.polygon_paths = []
 
         # Get path to default polygon files
         default_polygon_files = get_default_polygon_files(
-            self.fmu_directory, self.top_reservoir
+            self.fmu_directory, self.top_reservoir, self.polygon_files
         )
 
         self.polygon_paths = self.polygon_paths + default_polygon_files
 
-        # Read production data
+        # Production data (read together with the well data)
         self.prod_names = ["BORE_OIL_VOL.csv", "BORE_GI_VOL.csv", "BORE_WI_VOL.csv"]
         self.prod_folder = production_data
-        print("Reading production data from", self.prod_folder)
-        self.prod_data = read_csvs(folder=self.prod_folder, csv_files=self.prod_names)
+        # The compact production data are cached (as parquet) outside the
+        # production data folder, which may be read-only
+        self.prod_cache_directory = (
+            Path(tempfile.gettempdir()) / "webviz_4d_production_cache"
+        )
 
         # Read maps metadata
         print("Reading maps metadata from", surface_metadata_file)
         self.surface_metadata_file = surface_metadata_file
         self.surface_metadata = (
-            read_csv(csv_file=surface_metadata_file)
+            self.acquire_shared_data(
+                "surface_metadata",
+                [surface_metadata_file],
+                lambda: read_csv(csv_file=surface_metadata_file).replace(np.nan, ""),
+            )
             if surface_metadata_file is not None
             else None
         )
@@ -152,7 +245,11 @@ class SurfaceViewer4D(WebvizPluginABC):
                 get_path(Path(fn))
                 for fn in json.load(find_files(self.colormap_data, ".csv"))
             ]
-            load_custom_colormaps(self.colormap_files)
+            self.acquire_shared_data(
+                "custom_colormaps",
+                self.colormap_files,
+                lambda: load_custom_colormaps(self.colormap_files),
+            )
 
         # Read attribute maps settings (min-/max-values)
         self.surface_scaling_file = surface_scaling_file
@@ -188,7 +285,6 @@ class SurfaceViewer4D(WebvizPluginABC):
         self.zone_polygon_tagnames = []
         self.zone_polygon_layers = []
         self.additional_polygons = []
-        self.surface_type = None
 
         self.zone_polygon_layers = self.shared_settings.get("zone_polygon_layers")
 
@@ -199,8 +295,8 @@ class SurfaceViewer4D(WebvizPluginABC):
 
             if self.zone_polygon_layers:
                 for zone_polygon in self.zone_polygon_layers:
-                    layer = self.create_polygon_layer(zone_polygon, "zone", zone_name)
-                    self.default_polygon_layers.append(layer)
+                    layers = self.create_polygon_layer(zone_polygon, "zone", zone_name)
+                    self.default_polygon_layers.append(layers)
 
         # Create additional polygon layers (read )
         self.additional_polygons = self.shared_settings.get("additional_polygon_layers")
@@ -208,27 +304,36 @@ class SurfaceViewer4D(WebvizPluginABC):
 
         if self.additional_polygons and len(self.additional_polygons) > 0:
             for additional_polygon in self.additional_polygons:
-                layer = self.create_polygon_layer(
+                layers = self.create_polygon_layer(
                     additional_polygon, "additional", None
                 )
 
-                if layer:
-                    self.additional_layers.append(layer)
-
-        # Read update dates and well data
-        #    self.drilled_wells_df: dataframe with wellpaths (x- and y positions) for all drilled wells
-        #    self.drilled_wells_info: dataframe with metadata for all drilled wells
+                if layers:
+                    self.additional_layers.append(layers)
 
+        # Read update dates, well data, production data and well layers
+        #    (see WellData), the data are reloaded in the background when
+        #    the well or production data have been updated
         self.well_layer_dir = Path(os.path.join(config_dir, "well_layers"))
         self.well_data = well_data
         print("Reading well data from", self.well_data)
+        self.well_data_key = None
+        self.well_data_snapshot = self.acquire_well_data()
 
         if self.well_data:
-            delta = 40  # Well trajectory resampling (along MD)
-            self.process_well_data(delta)
+            if prewarm_interval_layers:
+                self.prewarm_interval_well_layers()
 
-            print("Loading all well layers ...")
-            self.create_well_layers()
+            if well_data_reload_interval:
+                self.update_watcher = UpdateWatcher(
+                    [
+                        Path(self.well_data) / ".welldata_update.yaml",
+                        Path(self.well_data) / ".production_update.yaml",
+                    ],
+                    self.reload_well_data,
+                    well_data_reload_interval,
+                )
+                self.update_watcher.start()
 
         # Create selectors (attributes, names and dates) for all 3 maps
         self.selector = SurfaceSelector(app, self.selection_dict, self.map_defaults[0])
@@ -239,8 +344,13 @@ class SurfaceViewer4D(WebvizPluginABC):
     def add_webvizstore(self) -> List[Tuple[Callable, list]]:
         store_functions: List[Tuple[Callable, list]] = [
             (
-                read_csvs,
-                [{"folder": self.prod_folder, "csv_files": self.prod_names}],
+                read_production_data,
+                [
+                    {
+                        "folder": self.prod_folder,
+                        "csv_files": self.prod_names,
+                    }
+                ],
             )
         ]
 
@@ -249,7 +359,8 @@ class SurfaceViewer4D(WebvizPluginABC):
                 (get_path, [{"path": Path(self.polygon_mapping_file)}])
             )
 
-            for fn in self.polygon_paths:
+            # Only existing polygon files are included (see PolygonFileIndex)
+            for fn in dict.fromkeys(self.polygon_paths):
                 store_functions.append((get_path, [{"path": Path(fn)}]))
 
         store_functions.append(
@@ -283,10 +394,11 @@ class SurfaceViewer4D(WebvizPluginABC):
             store_functions.append((get_path, [{"path": self.selector_file}]))
 
         if self.well_data is not None:
+            well_data = self.well_data_snapshot
             store_functions.append(
                 (read_csv, [{"csv_file": Path(self.well_data) / "wellbore_info.csv"}])
             )
-            for fn in list(self.wellbore_info["file_name"]):
+            for fn in list(well_data.wellbore_info["file_name"]):
                 store_functions.append((get_path, [{"path": Path(fn)}]))
 
             store_functions.append(
@@ -308,9 +420,14 @@ class SurfaceViewer4D(WebvizPluginABC):
                 )
             )
 
-            for fn in self.layer_files:
+            for fn in well_data.layer_files:
                 store_functions.append((get_path, [{"path": Path(fn)}]))
 
+            if well_data.well_layer_bundle is not None:
+                store_functions.append(
+                    (get_path, [{"path": Path(well_data.well_layer_bundle_file)}])
+                )
+
         for fn in list(self.surface_metadata["filename"]):
             store_functions.append((get_path, [{"path": Path(fn)}]))
 
@@ -343,8 +460,6 @@ class SurfaceViewer4D(WebvizPluginABC):
             time1 = selected_interval[0:10]
             time2 = selected_interval[11:]
 
-        self.surface_metadata.replace(np.nan, "", inplace=True)
-
         try:
             selected_metadata = self.surface_metadata[
                 (self.surface_metadata["fmu_id.realization"] == real)
@@ -366,52 +481,140 @@ class SurfaceViewer4D(WebvizPluginABC):
 
         return path
 
-    def get_heading(self, map_ind, observation_type):
-        if self.map_defaults[map_ind]["map_type"] == observation_type:
+    def get_heading(self, context, observation_type):
+        if context.map_type == observation_type:
             txt = "Observed map: "
             info = "-"
         else:
             txt = "Simulated map: "
-            info = (
-                self.selected_iterations[map_ind]
-                + " "
-                + self.selected_realizations[map_ind]
-            )
+            info = context.iteration + " " + context.realization
 
-        heading = (
-            txt
-            + self.selected_attributes[map_ind]
-            + " ("
-            + self.selected_names[map_ind]
-            + ")"
-        )
+        heading = txt + context.attribute + " (" + context.name + ")"
 
         sim_info = info
-        label = get_plot_label(self.settings, self.selected_intervals[map_ind])
+        label = get_plot_label(self.settings, context.interval)
 
         return heading, sim_info, label
 
-    def create_additional_well_layers(self, interval):
-        interval_overview = self.well_layers_overview.get("additional").get(interval)
-        interval_well_layers = []
+    @property
+    def well_update(self):
+        return self.well_data_snapshot.well_update
 
-        if get_dates(interval)[0] <= self.production_update:
-            for key, value in interval_overview.items():
-                layer_dir = Path(self.well_layer_dir / "additional" / interval)
-                well_layer_file = get_path(Path(layer_dir / value))
-                label = self.additional_well_layers.get(key)
+    @property
+    def production_update(self):
+        return self.well_data_snapshot.production_update
 
-                well_layer = make_new_well_layer(
-                    well_layer_file,
-                    self.pdm_wells_df,
-                    label,
-                )
+    @property
+    def prod_data(self):
+        return self.well_data_snapshot.prod_data
+
+    @property
+    def production_cube(self):
+        return self.well_data_snapshot.production_cube
+
+    def get_interval_well_layers(self, interval):
+        """Return the well layers for a selected interval (current well data)"""
+        return self.well_data_snapshot.get_interval_well_layers(interval)
+
+    def reload_well_data(self):
+        """Load updated well and production data and replace the current data
+        when complete. Data which has not changed are reused. Callbacks which
+        already started keep using the data they started with"""
+        with self.reload_lock:
+            previous = self.well_data_snapshot
+            print("Reloading well and production data from", self.well_data)
+
+            try:
+                well_data = self.acquire_well_data(previous)
+            except Exception as error:
+                # Raised again, so the update watcher retries the reload
+                print("WARNING: reloading well data failed, keeping old data:", error)
+                raise
+
+            self.well_data_snapshot = well_data
+
+        return well_data
+
+    def acquire_shared_data(self, name, paths, load_function, settings=None):
+        """Return data from the process wide registry (loaded by load_function
+        if not already loaded by this or another plugin instance), the data
+        are released in close()"""
+        key, value = shared_data.acquire(name, paths, load_function, settings)
+        self.shared_data_keys.append(key)
+
+        return value
+
+    def release_shared_data(self, key):
+        if key in self.shared_data_keys:
+            self.shared_data_keys.remove(key)
+            shared_data.release(key)
+
+    def acquire_well_data(self, previous=None):
+        """Return the well and production data (WellData) from the registry,
+        the previous well data are released if replaced"""
+        files = [Path(self.prod_folder) / name for name in self.prod_names]
+
+        if self.well_data:
+            files = files + [
+                Path(self.well_data) / ".welldata_update.yaml",
+                Path(self.well_data) / ".production_update.yaml",
+                Path(self.well_data) / "wellbore_info.csv",
+                Path(self.well_layer_dir) / "well_layers.yaml",
+            ]
+
+        settings = json.dumps(
+            [
+                str(self.well_data),
+                str(self.well_layer_dir),
+                self.well_delta,
+                self.basic_well_layers,
+                self.additional_well_layers,
+                self.compact_layers,
+                self.layer_decimals,
+                self.interval_layers_cache_size,
+            ],
+            default=str,
+        )
 
-                if well_layer is not None:
-                    interval_well_layers.append(well_layer)
-                    self.layer_files.append(well_layer_file)
+        well_data = self.acquire_shared_data(
+            "well_data", files, lambda: WellData(self, previous), settings
+        )
+        previous_key = self.well_data_key
+        self.well_data_key = self.shared_data_keys[-1]
+
+        if previous_key is not None:
+            self.release_shared_data(previous_key)
+
+        return well_data
+
+    def close(self):
+        """Stop the background threads and release the shared data"""
+        if self.update_watcher is not None:
+            self.update_watcher.stop()
+
+        self.render_executor.shutdown(wait=False)
+        self.background_jobs.shutdown()
+        release_shared_data(self.shared_data_keys)
 
-        return interval_well_layers
+    def prewarm_interval_well_layers(self):
+        """Create the well layers for the default intervals in a background thread"""
+        intervals = []
+
+        for map_defaults in self.map_defaults:
+            interval = map_defaults.get("interval")
+
+            if (
+                interval in self.well_data_snapshot.interval_names
+                and interval not in intervals
+            ):
+                intervals.append(interval)
+
+        def _prewarm():
+            for interval in intervals:
+                self.get_interval_well_layers(interval)
+
+        thread = threading.Thread(target=_prewarm, daemon=True)
+        thread.start()
 
     def get_map_scaling(self, data, map_type, realization):
         min_max = None
@@ -433,174 +636,271 @@ class SurfaceViewer4D(WebvizPluginABC):
 
         return min_max
 
-    def make_map(self, data, iteration, real, attribute_settings, map_idx):
-        self.realization = real
-        self.iteration = iteration
-        data = json.loads(data)
-        selected_zone = data.get("name")
-        map_type = self.map_defaults[map_idx]["map_type"]
-        surface_file = self.get_real_runpath(data, iteration, real, map_type)
+    def make_map(
+        self, data, iteration, real, attribute_settings, map_idx, detail_level=None
+    ):
+        return self.make_maps(
+            [(map_idx, data, iteration, real)], attribute_settings, detail_level
+        )[0]
 
-        if "realization" in real:
-            self.surface_type = "realization"
-        elif "---" in real:
-            self.surface_type = "observation"
-        else:
-            self.surface_type = "aggregation"
+    def make_maps(
+        self, map_requests, attribute_settings, detail_level=None, client=None
+    ):
+        """Render several maps, each request is (map_idx, data, iteration, real).
+        Maps showing the same surface with the same settings share one surface
+        layer, and the distinct surface layers are rendered in parallel.
+
+        If a client (the session id of a page) is given, a new render of a map
+        from the same client supersedes the running one. A superseded render is stopped at the
+        next checkpoint, and None is returned for the map"""
+        if detail_level not in detail_levels:
+            detail_level = default_detail_level
+
+        attribute_settings = json.loads(attribute_settings)
+
+        # All state for a render is kept in its context, not in the plugin
+        contexts = [
+            RenderContext(
+                map_idx,
+                self.map_defaults[map_idx]["map_type"],
+                json.loads(data),
+                iteration,
+                real,
+                detail_level,
+                self.well_data_snapshot,
+                self.render_generations,
+                None if client is None else (client, map_idx),
+            )
+            for map_idx, data, iteration, real in map_requests
+        ]
+        surface_keys = [
+            self.get_surface_key(context, attribute_settings) for context in contexts
+        ]
 
-        if os.path.isfile(surface_file):
-            surface = load_surface(surface_file)
-            attribute_settings = json.loads(attribute_settings)
+        # Checkpoint after the metadata lookup
+        surface_contexts = {}
 
-            min_val, max_val = get_map_min_max(surface, attribute_settings, data)
-            metadata = self.get_map_scaling(data, map_type, real)
+        for key, context in zip(surface_keys, contexts):
+            if key is not None and not context.is_superseded():
+                surface_contexts.setdefault(key, []).append(context)
 
-            surface_layers = [
-                make_surface_layer(
-                    surface,
-                    name=data["attr"],
-                    color=attribute_settings.get(data["attr"], {}).get(
-                        "color", self.default_colormap
-                    ),
-                    min_val=min_val,
-                    max_val=max_val,
-                    unit=attribute_settings.get(data["attr"], {}).get("unit", ""),
-                    hillshading=False,
-                    min_max_df=metadata,
-                )
-            ]
+        futures = {
+            key: self.render_executor.submit(
+                self.make_surface_layer, key_contexts, key, attribute_settings
+            )
+            for key, key_contexts in surface_contexts.items()
+        }
 
-            # Check if there are polygons available for the new map
-            if self.zone_polygon_layers and len(self.zone_polygon_layers) > 0:
-                for index, zone_polygon in enumerate(self.zone_polygon_layers):
-                    layer = self.create_polygon_layer(
-                        zone_polygon, "zone", selected_zone
-                    )
+        results = []
 
-                    if len(layer) == 0:  # Specific polygon not found, use default
-                        layer = self.default_polygon_layers[index]
+        for key, context in zip(surface_keys, contexts):
+            future = futures.get(key)
 
-                    surface_layers.append(layer)
+            try:
+                surface_layer = future.result() if future is not None else None
+            except RenderSuperseded:
+                surface_layer = None
 
-            # Add additional polygon layers (if existing)
-            if self.additional_layers and len(self.additional_layers) > 0:
-                for layer in self.additional_layers:
-                    surface_layers.append(layer)
+            if context.is_superseded():
+                results.append(None)
+                continue
 
-            if self.basic_well_layers:
-                for well_layer in self.well_basic_layers:
-                    surface_layers.append(well_layer)
+            result = self.make_map_layers(context, surface_layer, key)
 
-            interval = data["date"]
+            # A superseded render never emits output
+            results.append(None if context.is_superseded() else result)
 
-            # Load new interval well layers if selected interval has changed (or has not been set)
-            if interval != self.selected_intervals[map_idx]:
-                if get_dates(interval)[0] <= self.last_observed_date:
-                    index = self.interval_names.index(interval)
-                    self.interval_well_layers = self.all_interval_layers[index]
-                    self.selected_intervals[map_idx] = interval
-                else:
-                    self.interval_well_layers = []
+        return results
 
-            for interval_layer in self.interval_well_layers:
-                surface_layers.append(interval_layer)
+    def get_realization_files(self, map_idx, data, iteration):
+        """Return the surface files of all realizations for a map selection"""
+        map_type = self.map_defaults[map_idx]["map_type"]
+        files = []
 
-            self.selected_names[map_idx] = data["name"]
-            self.selected_attributes[map_idx] = data["attr"]
-            self.selected_iterations[map_idx] = iteration
-            self.selected_realizations[map_idx] = real
-            self.selected_intervals[map_idx] = interval
+        for realization in self.realizations(map_idx):
+            if get_surface_type(realization) != "realization":
+                continue
 
-            heading, sim_info, label = self.get_heading(map_idx, self.observations)
-        else:
-            heading = "Selected map doesn't exist"
-            sim_info = "-"
-            surface_layers = []
-            label = "-"
+            surface_file = self.get_real_runpath(data, iteration, realization, map_type)
 
-        return (
-            heading,
-            sim_info,
-            surface_layers,
-            label,
-        )
+            if os.path.isfile(surface_file):
+                files.append(str(surface_file))
 
-    def create_well_layers(self):
-        self.well_basic_layers = []
-        self.all_interval_layers = []
-        self.layer_files = []
+        return files
 
-        basic_layers = self.well_layers_overview.get("basic")
+    def start_statistic_job(self, map_idx, data, iteration, statistic):
+        """Start the calculation of an ensemble statistic surface as a background
+        job, return the job id (None if there are no realization surfaces)"""
+        surface_files = self.get_realization_files(map_idx, json.loads(data), iteration)
 
-        for key, value in basic_layers.items():
-            layer_file = get_path(Path(self.well_layer_dir / "basic" / value))
-            label = self.basic_well_layers.get(key)
+        if not surface_files:
+            return None
 
-            well_layer = make_new_well_layer(
-                layer_file,
-                self.all_wells_df,
-                label,
+        return self.background_jobs.submit(
+            make_statistic_surface, surface_files, statistic, files=surface_files
+        )
+
+    def make_statistic_map(self, job, attribute_settings, detail_level=None):
+        """Render a map from the result of a completed ensemble statistic job"""
+        if detail_level not in detail_levels:
+            detail_level = default_detail_level
+
+        map_idx = job["map_idx"]
+        attribute_settings = json.loads(attribute_settings)
+        context = RenderContext(
+            map_idx,
+            self.map_defaults[map_idx]["map_type"],
+            json.loads(job["data"]),
+            job["iteration"],
+            job["statistic"],
+            detail_level,
+            self.well_data_snapshot,
+        )
+        surface_key = self.get_surface_key(context, attribute_settings, job["result"])
+        surface_layer = None
+
+        if surface_key is not None:
+            surface_layer = self.make_surface_layer(
+                [context], surface_key, attribute_settings
             )
 
-            if well_layer:
-                self.well_basic_layers.append(well_layer)
-                self.layer_files.append(layer_file)
+        return self.make_map_layers(context, surface_layer, surface_key)
 
-        self.intervals = self.well_layers_overview.get("additional")
-        self.interval_names = []
+    def get_surface_key(self, context, attribute_settings, surface_file=None):
+        """Return a key for the surface layer of a map (surface file, modification
+        time and the selections used for the layer), None if the map doesn't exist.
+        The key is also the signature of the layer sent to the browser"""
+        if surface_file is None:
+            surface_file = self.get_real_runpath(
+                context.data, context.iteration, context.realization, context.map_type
+            )
 
-        for interval in self.intervals:
-            interval_layers = self.create_additional_well_layers(interval)
-            self.all_interval_layers.append(interval_layers)
-            self.interval_names.append(interval)
+        try:
+            file_stat = os.stat(surface_file)
+        except OSError:
+            return None
 
-    def process_well_data(self, delta):
-        self.well_update, self.production_update = self.get_dates()
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
 
-        self.wellbore_info = read_csv(
-            csv_file=Path(self.well_data) / "wellbore_info.csv"
+        return (
+            str(surface_file),
+            context.map_type,
+            context.name,
+            context.attribute,
+            context.interval,
+            json.dumps(attribute_settings.get(context.attribute), sort_keys=True),
+            bool(attribute_settings),
+            file_stat.st_mtime_ns,
         )
 
-        self.all_wells_info = read_csv(
-            csv_file=Path(self.well_data) / "wellbore_info.csv"
-        )
+    def make_surface_layer(self, contexts, surface_key, attribute_settings):
+        """Make the surface layer shared by the maps in contexts, given the
+        surface key (see get_surface_key). The render is stopped
+        (RenderSuperseded) if all these maps have been superseded"""
+        context = contexts[0]
+        surface_file = surface_key[0]
+        data = context.data
+        settings = attribute_settings.get(data["attr"], {})
+        metadata = self.get_map_scaling(data, context.map_type, context.realization)
+
+        cache_key = None
+
+        if self.render_cache is not None:
+            # All render parameters, the min/max values are taken from the
+            # surface if there are no attribute settings
+            cache_key = self.render_cache.get_key(
+                surface_file,
+                [
+                    data["attr"],
+                    settings,
+                    bool(attribute_settings),
+                    self.default_colormap,
+                    None if metadata is None else metadata.to_json(),
+                ],
+            )
+            surface_layer = self.render_cache.get(cache_key) if cache_key else None
 
-        self.all_wells_info["file_name"] = self.all_wells_info["file_name"].apply(
-            lambda x: get_path(Path(x))
-        )
+            if surface_layer is not None:
+                return surface_layer
 
-        self.all_wells_df = load_all_wells(self.all_wells_info, delta)
-        self.drilled_wells_files = list(
-            self.wellbore_info[self.wellbore_info["layer_name"] == "Drilled wells"][
-                "file_name"
-            ]
+        surface = load_surface(surface_file)
+
+        check_superseded(contexts)
+
+        min_val, max_val = get_map_min_max(surface, attribute_settings, data)
+        check_superseded(contexts)
+
+        surface_layer = make_surface_layer(
+            surface,
+            name=data["attr"],
+            color=settings.get("color", self.default_colormap),
+            min_val=min_val,
+            max_val=max_val,
+            unit=settings.get("unit", ""),
+            hillshading=False,
+            min_max_df=metadata,
+            surface_key=surface_key,
         )
-        self.drilled_wells_df = self.all_wells_df.loc[
-            self.all_wells_df["layer_name"] == "Drilled wells"
-        ]
-        self.drilled_wells_info = self.all_wells_info.loc[
-            self.all_wells_info["layer_name"] == "Drilled wells"
-        ]
 
-        self.pdm_wells_info = self.drilled_wells_info.loc[
-            self.drilled_wells_info["wellbore.pdm_name"] != ""
-        ]
+        if cache_key is not None:
+            self.render_cache.put(cache_key, surface_layer)
 
-        self.pdm_wells_df = load_all_wells(self.pdm_wells_info, delta)
+        return surface_layer
 
-        layer_overview_file = get_path(Path(self.well_layer_dir / "well_layers.yaml"))
-        self.well_layers_overview = read_config(layer_overview_file)
+    def make_map_layers(self, context, surface_layer, surface_key=None):
+        """Return the heading, info, layers, label and layer signatures of a map
+        given its surface layer (and the key it was rendered with)"""
+        if surface_layer is None:
+            return "Selected map doesn't exist", "-", [], "-", []
 
-    def get_dates(self):
-        update_dates = get_update_dates(
-            welldata=get_path(Path(self.well_data) / ".welldata_update.yaml"),
-            productiondata=get_path(Path(self.well_data) / ".production_update.yaml"),
-        )
+        detail_level = context.detail_level
+        well_data = context.well_data
+        surface_layers = [surface_layer]
+
+        # Check if there are polygons available for the new map
+        if self.zone_polygon_layers and len(self.zone_polygon_layers) > 0:
+            for index, zone_polygon in enumerate(self.zone_polygon_layers):
+                layers = self.create_polygon_layer(
+                    zone_polygon, "zone", context.name, context
+                )
+
+                if not layers:  # Specific polygon not found, use default
+                    layers = self.default_polygon_layers[index]
+
+                surface_layers.append(layers.get(detail_level))
+
+        # Add additional polygon layers (if existing)
+        if self.additional_layers and len(self.additional_layers) > 0:
+            for layers in self.additional_layers:
+                surface_layers.append(layers.get(detail_level))
+
+        if self.basic_well_layers:
+            for well_layer in well_data.well_basic_layers.get(detail_level, []):
+                surface_layers.append(well_layer)
+
+        interval = context.interval
+
+        # Interval well layers are created on first use (and then cached)
+        if get_dates(interval)[0] <= self.last_observed_date:
+            interval_well_layers = well_data.get_interval_well_layers(interval).get(
+                detail_level, []
+            )
+        else:
+            interval_well_layers = []
+
+        for interval_layer in interval_well_layers:
+            surface_layers.append(interval_layer)
 
-        well_update = update_dates["well_update_date"]
-        production_update = update_dates["production_last_date"]
+        heading, sim_info, label = self.get_heading(context, self.observations)
 
-        return well_update, production_update
+        return (
+            heading,
+            sim_info,
+            surface_layers,
+            label,
+            self.layer_signatures.get_map(surface_layers, surface_key),
+        )
 
     def load_polygon_mapping(self, mapping_file):
         print("Reading polygon mapping from", mapping_file)
@@ -624,12 +924,15 @@ class SurfaceViewer4D(WebvizPluginABC):
 
         return surface_scaling
 
-    def create_polygon_layer(self, polygon, polygon_type, zone_name):
+    def create_polygon_layer(self, polygon, polygon_type, zone_name, context=None):
         """Create a polygon layer which can either be a zone polygon or an additional polygon
         Two types of polygons are supported:
         - zone polygons (from the fmu execution)
-        - additional polygons (e.g. prm lines, shadow areas, ...)"""
-        layer = []
+        - additional polygons (e.g. prm lines, shadow areas, ...)
+        The zone polygons are selected given the render context of a map (the
+        default polygons are used without context).
+        The layer is returned for each level of detail ({} if not found)"""
+        layer = {}
         color = None
 
         if polygon_type == "additional":
@@ -648,13 +951,26 @@ class SurfaceViewer4D(WebvizPluginABC):
                 tagname + "." + format,
             )
 
-            print("Reading polygon file:", polygon_file)
-
             self.polygon_paths.append(polygon_file)
-            polygon_df = pd.read_csv(get_path(Path(polygon_file)))
 
-            layer = make_polyline_layer(
-                polygon_type, polygon_df, format, tagname, label, tooltip, color
+            def _create_layer():
+                print("Reading polygon file:", polygon_file)
+                polygon_df = pd.read_csv(get_path(Path(polygon_file)))
+
+                return make_polygon_layers(
+                    make_polyline_layer(
+                        polygon_type, polygon_df, format, tagname, label, tooltip, color
+                    ),
+                    compact=self.compact_layers,
+                    decimals=self.layer_decimals,
+                )
+
+            layer = self.acquire_shared_data(
+                "additional_polygon_layer",
+                [polygon_file],
+                _create_layer,
+                (format, tagname, label, tooltip, color)
+                + (self.compact_layers, self.layer_decimals),
             )
 
         elif polygon_type == "zone":
@@ -671,10 +987,16 @@ class SurfaceViewer4D(WebvizPluginABC):
                 "case_polygon_directory"
             )
 
-            if self.surface_type is None:
-                self.surface_type = "observation"
+            if context is not None:
+                surface_type = context.surface_type
+                realization = context.realization
+                iteration = context.iteration
+            else:
+                surface_type = "observation"
+                realization = self.realization
+                iteration = self.iteration
 
-            if self.surface_type == "realization":
+            if surface_type == "realization":
                 if (
                     case_polygon_directory is not None
                 ):  # Use default iteration (case polygon)
@@ -687,8 +1009,8 @@ class SurfaceViewer4D(WebvizPluginABC):
                 ):  # Use actual iteration and realization for selected realizations
                     polygons_folder = os.path.join(
                         self.fmu_directory,
-                        self.realization,
-                        self.iteration,
+                        realization,
+                        iteration,
                         self.top_reservoir.get("directory"),
                         self.top_reservoir.get("polygons_directory"),
                     )
@@ -713,51 +1035,148 @@ class SurfaceViewer4D(WebvizPluginABC):
                         self.top_reservoir.get("directory"),
                         self.top_reservoir.get("polygons_directory"),
                     )
-                else:  # Use default iteration (case polygon)
+                elif case_polygon_directory is not None:  # Use case polygon
                     polygons_folder = os.path.join(
                         self.fmu_directory,
                         case_polygon_directory,
                     )
+                else:  # Use default iteration and realization
+                    polygons_folder = os.path.join(
+                        self.fmu_directory,
+                        self.realization,
+                        self.iteration,
+                        self.top_reservoir.get("directory"),
+                        self.top_reservoir.get("polygons_directory"),
+                    )
 
             if polygons_folder is not None:
-                if not self.polygon_mapping.empty:
-                    name = get_polygon_name(self.polygon_mapping, zone_name, tagname)
-                else:
-                    name = self.top_reservoir.get("polygon_name")
-
+                name = self.get_polygon_name(zone_name, tagname)
                 tooltip = name + "-" + tagname
 
-                polygon_file = name + "--" + tagname + "." + format
-                polygon_file = os.path.join(polygons_folder, polygon_file)
-
-                if os.path.exists(get_path(Path(polygon_file))):
-                    polygon_df = pd.read_csv(get_path(Path(polygon_file)))
-
-                    if "REAL" in polygon_df.columns:
-                        selected_df = polygon_df[polygon_df["REAL"] == 0]
-                        polygon_df = selected_df.copy()
-
-                    polygon_type = "zone"
-                    color = get_color(self.settings, "polygon", polygon)
-
-                    if len(polygon_df) > 0 and "ID" in polygon_df.columns:
-                        layer = make_polyline_layer(
-                            polygon_type,
-                            polygon_df,
-                            format,
-                            tagname,
-                            label,
-                            tooltip,
-                            color,
-                        )
+                polygon_file = self.polygon_files.find(
+                    polygons_folder, name + "--" + tagname + "." + format
+                )
+                color = get_color(self.settings, "polygon", polygon)
+
+                if polygon_file is not None:
+                    layer = self.load_zone_polygon_layer(
+                        polygon_file, format, tagname, label, tooltip, color
+                    )
                 else:
                     print("WARNING: layer not created")
-                    layer = None
 
         return layer
 
+    def get_polygon_name(self, zone_name, tagname):
+        """Return the name of the polygon file for a zone and a polygon type"""
+        key = (zone_name, tagname)
+
+        if key not in self.polygon_names:
+            if not self.polygon_mapping.empty:
+                name = get_polygon_name(self.polygon_mapping, zone_name, tagname)
+            else:
+                name = self.top_reservoir.get("polygon_name")
+
+            self.polygon_names[key] = name
+
+        return self.polygon_names[key]
+
+    def load_zone_polygon_layer(
+        self, polygon_file, format, tagname, label, tooltip, color
+    ):
+        """Return a zone polygon layer for each level of detail, the layers are
+        cached by file, modification time, color and label and shared by all maps.
+        The modification time is taken from the polygon file index"""
+        mtime = self.polygon_files.get_mtime(polygon_file)
+        polygon_file = get_path(Path(polygon_file))
+
+        if mtime is None:  # Not indexed (e.g. portable app)
+            try:
+                mtime = os.path.getmtime(polygon_file)
+            except OSError:
+                print("WARNING: layer not created")
+                return {}
+
+        # The cache can be shared with other plugin instances (with other
+        # compact layer settings)
+        key = (str(polygon_file), mtime, format, tagname, label, tooltip, color)
+        key = key + (self.compact_layers, self.layer_decimals)
+
+        def _create_layer():
+            layer = None
+            polygon_df = pd.read_csv(polygon_file)
+
+            if "REAL" in polygon_df.columns:
+                selected_df = polygon_df[polygon_df["REAL"] == 0]
+                polygon_df = selected_df.copy()
+
+            if len(polygon_df) > 0 and "ID" in polygon_df.columns:
+                layer = make_polyline_layer(
+                    "zone",
+                    polygon_df,
+                    format,
+                    tagname,
+                    label,
+                    tooltip,
+                    color,
+                )
+
+            return make_polygon_layers(
+                layer, compact=self.compact_layers, decimals=self.layer_decimals
+            )
+
+        return self.polygon_layers_cache.get_or_create(key, _create_layer)
+
+    def get_polygon_index(self):
+        """Return a spatial index over the default zone polygons and the
+        additional polygons"""
+        if self.polygon_index is None:
+            keys = []
+            polylines = []
+
+            for layers in self.default_polygon_layers + self.additional_layers:
+                layer = layers.get("high") if layers else None
+
+                if not layer:
+                    continue
+
+                for item in layer.get("data", []):
+                    keys.append(layer.get("name"))
+                    polylines.append(item.get("positions"))
+
+            self.polygon_index = SpatialIndex(keys, polylines)
+
+        return self.polygon_index
+
+    def get_map_info(self, marker_point):
+        """Return the nearest well and the polygons at a selected map position"""
+        x_pos, y_pos = marker_point[0], marker_point[1]
+        info = "Position: {:.0f}, {:.0f}".format(x_pos, y_pos)
+
+        well_index = self.well_data_snapshot.get_well_index()
+        well_name, distance = well_index.nearest(
+            x_pos, y_pos, max_distance=self.max_well_distance
+        )
+
+        if well_name is not None:
+            info = info + "  Nearest well: {} ({:.0f} m)".format(well_name, distance)
+
+        polygons = sorted(set(self.get_polygon_index().contains(x_pos, y_pos)))
+
+        if polygons:
+            info = info + "  Inside: " + ", ".join(polygons)
+
+        return info
+
     def set_callbacks(self, app):
-        set_first_map(parent=self, app=app)
-        set_second_map(parent=self, app=app)
-        set_third_map(parent=self, app=app)
+        set_session_id(parent=self, app=app)
+        set_maps(parent=self, app=app)
+        set_map_info(parent=self, app=app)
         change_maps_from_button(parent=self, app=app)
+        set_background_jobs(parent=self, app=app)
+
+
+def release_shared_data(keys):
+    """Release the shared data used by a plugin instance"""
+    while keys:
+        shared_data.release(keys.pop())
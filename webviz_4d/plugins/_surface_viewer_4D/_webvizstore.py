@@ -7,6 +7,8 @@ from pathlib import Path
 import pandas as pd
 from webviz_config.webviz_store import webvizstore
 
+from webviz_4d._datainput._production import load_production_data
+
 
 @webvizstore
 def get_path(path) -> Path:
@@ -29,6 +31,11 @@ def read_csvs(folder: Path, csv_files: list) -> pd.DataFrame:
     return all_prod_df
 
 
+@webvizstore
+def read_production_data(folder: Path, csv_files: list) -> pd.DataFrame:
+    return load_production_data(folder, csv_files)
+
+
 @webvizstore
 def read_csv(
     csv_file: Path,
@@ -0,0 +1,357 @@
+import os
+import threading
+from pathlib import Path
+
+from webviz_config.webviz_store import WEBVIZ_STORAGE
+
+from webviz_4d._datainput.common import read_config, get_update_dates
+from webviz_4d._datainput.well import (
+    load_all_wells,
+    prune_well_cache,
+    detail_levels,
+)
+from webviz_4d._datainput._production import (
+    make_new_well_layers,
+    load_production_data,
+    ProductionCube,
+    check_interval,
+)
+from webviz_4d._datainput._interval_well_layers import create_interval_well_layers
+from webviz_4d._datainput._cache import LRUCache
+from webviz_4d._datainput._polygons import compact_polyline_layer
+from webviz_4d._datainput._spatial_index import SpatialIndex
+from webviz_4d._datainput._well_layer_bundle import (
+    get_bundle_file,
+    get_bundle_version,
+    get_bundle_sources,
+    get_basic_layer_files,
+    get_interval_layer_files,
+    load_well_layer_bundle,
+)
+from ._webvizstore import read_csv, read_production_data, get_path
+
+
+class WellData:
+    """Well trajectories, production data and well layers for one well and
+    production data update. A WellData object is not changed after it has
+    been loaded (except for the lazily created layers), updated data are
+    loaded into a new object which replaces the old one. Data which has not
+    changed since the previous update is reused"""
+
+    def __init__(self, parent, previous=None):
+        self.well_data = parent.well_data
+        self.well_layer_dir = parent.well_layer_dir
+        self.delta = parent.well_delta
+        self.basic_well_layers = parent.basic_well_layers
+        self.additional_well_layers = parent.additional_well_layers
+        self.well_cache = parent.well_cache
+        self.compact_layers = parent.compact_layers
+        self.layer_decimals = parent.layer_decimals
+
+        self.well_update = ""
+        self.production_update = ""
+        self.well_layers_overview = {}
+        self.well_layer_bundle = None
+        self.well_layer_bundle_file = None
+        self.wellbore_info = None
+        self.pdm_wells_info = None
+        self.all_wells_df = None
+        self.drilled_wells_df = None
+        self.pdm_wells_df = None
+        self.well_basic_layers = {level: [] for level in detail_levels}
+        self.basic_layer_sources = {}
+        self.layer_files = []
+        self.interval_names = []
+        self.interval_layers_cache = LRUCache(maxsize=parent.interval_layers_cache_size)
+        self.well_index = None
+        self._lock = threading.Lock()
+
+        if self.well_data:
+            self.well_update, self.production_update = self.get_dates()
+
+        self.load_production_data(parent, previous)
+
+        if self.well_data:
+            self.process_well_data(previous)
+            self.create_well_layers(previous)
+
+    def get_dates(self):
+        update_dates = get_update_dates(
+            welldata=get_path(Path(self.well_data) / ".welldata_update.yaml"),
+            productiondata=get_path(Path(self.well_data) / ".production_update.yaml"),
+        )
+
+        well_update = update_dates["well_update_date"]
+        production_update = update_dates["production_last_date"]
+
+        return well_update, production_update
+
+    def wells_changed(self, previous):
+        return previous is None or previous.well_update != self.well_update
+
+    def production_changed(self, previous):
+        return previous is None or previous.production_update != self.production_update
+
+    def load_production_data(self, parent, previous):
+        if not self.production_changed(previous) and previous.prod_data is not None:
+            self.prod_data = previous.prod_data
+            self.production_cube = previous.production_cube
+            return
+
+        print("Reading production data from", parent.prod_folder)
+
+        if WEBVIZ_STORAGE.use_storage:
+            # Portable app, the production data are read from the webviz store
+            self.prod_data = read_production_data(
+                folder=parent.prod_folder, csv_files=parent.prod_names
+            )
+        else:
+            self.prod_data = load_production_data(
+                parent.prod_folder, parent.prod_names, parent.prod_cache_directory
+            )
+        self.production_cube = ProductionCube(self.prod_data)
+
+    def process_well_data(self, previous):
+        layer_overview_file = get_path(Path(self.well_layer_dir / "well_layers.yaml"))
+        self.well_layers_overview = read_config(layer_overview_file)
+
+        if self.wells_changed(previous):
+            self.wellbore_info = read_csv(
+                csv_file=Path(self.well_data) / "wellbore_info.csv"
+            )
+
+            self.all_wells_info = read_csv(
+                csv_file=Path(self.well_data) / "wellbore_info.csv"
+            )
+
+            self.all_wells_info["file_name"] = self.all_wells_info["file_name"].apply(
+                lambda x: get_path(Path(x))
+            )
+        else:
+            self.wellbore_info = previous.wellbore_info
+            self.all_wells_info = previous.all_wells_info
+
+        self.drilled_wells_info = self.all_wells_info.loc[
+            self.all_wells_info["layer_name"] == "Drilled wells"
+        ]
+
+        self.pdm_wells_info = self.drilled_wells_info.loc[
+            self.drilled_wells_info["wellbore.pdm_name"] != ""
+        ]
+
+        # Use the precompiled well layers if they are current, otherwise
+        # load all well trajectories and create the layers
+        self.well_layer_bundle = self.load_well_layer_bundle()
+
+        if self.well_layer_bundle is not None:
+            return
+
+        if not self.wells_changed(previous) and previous.all_wells_df is not None:
+            self.all_wells_df = previous.all_wells_df
+            self.drilled_wells_df = previous.drilled_wells_df
+            self.pdm_wells_df = previous.pdm_wells_df
+            return
+
+        # Only well files which have been modified are read again
+        self.all_wells_df = load_all_wells(
+            self.all_wells_info, self.delta, self.well_cache
+        )
+        self.drilled_wells_df = self.all_wells_df.loc[
+            self.all_wells_df["layer_name"] == "Drilled wells"
+        ]
+        self.pdm_wells_df = load_all_wells(
+            self.pdm_wells_info, self.delta, self.well_cache
+        )
+
+        # The PDM wells are a subset of all wells
+        prune_well_cache(self.well_cache, self.all_wells_info["file_name"])
+
+    def load_well_layer_bundle(self):
+        """Return the precompiled well layers if they exist for the current
+        well and production data update, layer files and labels"""
+        bundle_file = get_bundle_file(
+            self.well_layer_dir, self.well_update, self.production_update
+        )
+        sources = get_bundle_sources(
+            self.well_layers_overview,
+            self.well_layer_dir,
+            self.production_update,
+            self.basic_well_layers,
+            self.additional_well_layers,
+            self.delta,
+        )
+        version = get_bundle_version(self.well_update, self.production_update, sources)
+
+        try:
+            bundle = load_well_layer_bundle(get_path(bundle_file), version)
+        except (OSError, IndexError):  # Bundle not included in portable app
+            bundle = None
+
+        intervals = self.well_layers_overview.get("additional")
+
+        if bundle is not None and set(bundle.get("additional")) != set(intervals):
+            print("WARNING: well layer bundle does not match", self.well_layer_dir)
+            bundle = None
+
+        if bundle is not None:
+            print("Loading well layers from", bundle_file)
+            self.well_layer_bundle_file = bundle_file
+        else:
+            print("No current well layer bundle found, creating well layers")
+
+        return bundle
+
+    def create_well_layers(self, previous):
+        print("Loading all well layers ...")
+        self.well_basic_layers = {level: [] for level in detail_levels}
+        self.layer_files = []
+
+        for key, layer_file in get_basic_layer_files(
+            self.well_layers_overview, self.well_layer_dir
+        ):
+            layer_file = get_path(Path(layer_file))
+            self.layer_files.append(layer_file)
+
+            if self.well_layer_bundle is not None:
+                continue
+
+            label = self.basic_well_layers.get(key)
+
+            # Layers are only created again if the layer file or the wells
+            # have been modified
+            source = (str(layer_file), get_mtime(layer_file), label)
+
+            if (
+                previous is not None
+                and not self.wells_changed(previous)
+                and source in previous.basic_layer_sources
+            ):
+                well_layers = previous.basic_layer_sources[source]
+            else:
+                well_layers = make_new_well_layers(
+                    layer_file,
+                    self.all_wells_df,
+                    label,
+                )
+
+            self.basic_layer_sources[source] = well_layers
+
+            for level, well_layer in well_layers.items():
+                self.well_basic_layers[level].append(well_layer)
+
+        if self.well_layer_bundle is not None:
+            self.well_basic_layers = self.well_layer_bundle.get("basic")
+
+        self.well_basic_layers = self.get_compact_layers(self.well_basic_layers)
+
+        # Interval layers are created when selected (see get_interval_well_layers)
+        self.intervals = self.well_layers_overview.get("additional")
+        self.interval_names = []
+
+        for interval in self.intervals:
+            self.interval_names.append(interval)
+
+            for _key, layer_file in self.get_interval_layer_files(interval):
+                self.layer_files.append(layer_file)
+
+    def get_interval_layer_files(self, interval):
+        """Return the layer keys and well layer files for a selected interval"""
+        layer_files = get_interval_layer_files(
+            self.well_layers_overview,
+            self.well_layer_dir,
+            interval,
+            self.production_update,
+        )
+
+        return [(key, get_path(Path(layer_file))) for key, layer_file in layer_files]
+
+    def create_additional_well_layers(self, interval):
+        if self.well_layer_bundle is not None and interval in self.interval_names:
+            return self.well_layer_bundle.get("additional").get(interval, {})
+
+        # Intervals without precomputed well layers are classified from the
+        # production data
+        if interval not in self.interval_names:
+            return create_interval_well_layers(
+                self.production_cube,
+                self.pdm_wells_info,
+                self.get_pdm_wells_df(),
+                interval,
+                self.additional_well_layers,
+            )
+
+        interval_well_layers = {level: [] for level in detail_levels}
+
+        for key, well_layer_file in self.get_interval_layer_files(interval):
+            label = self.additional_well_layers.get(key)
+
+            well_layers = make_new_well_layers(
+                well_layer_file,
+                self.pdm_wells_df,
+                label,
+            )
+
+            for level, well_layer in well_layers.items():
+                interval_well_layers[level].append(well_layer)
+
+        return interval_well_layers
+
+    def get_interval_well_layers(self, interval):
+        """Return the well layers for a selected interval, the layers are
+        created on first use and kept in a LRU cache"""
+        if interval not in self.interval_names and (
+            not self.well_data
+            or len(self.production_cube) == 0
+            or check_interval(interval)[:10] > self.production_update
+        ):
+            return {}
+
+        return self.interval_layers_cache.get_or_create(
+            interval,
+            lambda: self.get_compact_layers(
+                self.create_additional_well_layers(interval)
+            ),
+        )
+
+    def get_compact_layers(self, well_layers):
+        """Return the well layers for each level of detail in compact form
+        (see compact_polyline_layer), if selected"""
+        if not self.compact_layers:
+            return well_layers
+
+        return {
+            level: [
+                compact_polyline_layer(layer, self.layer_decimals) for layer in layers
+            ]
+            for level, layers in well_layers.items()
+        }
+
+    def get_pdm_wells_df(self):
+        """Return the trajectories of the PDM wells, loaded on first use if
+        the well layers were read from a well layer bundle"""
+        with self._lock:
+            if self.pdm_wells_df is None:
+                self.pdm_wells_df = load_all_wells(
+                    self.pdm_wells_info, self.delta, self.well_cache
+                )
+
+        return self.pdm_wells_df
+
+    def get_well_index(self):
+        """Return a spatial index over the well trajectories in the basic well layers"""
+        if self.well_index is None:
+            layer = {"data": []}
+
+            for well_layer in self.well_basic_layers.get("high", []):
+                layer["data"].extend(well_layer.get("data", []))
+
+            self.well_index = SpatialIndex.from_layer(layer)
+
+        return self.well_index
+
+
+def get_mtime(file_name):
+    try:
+        return os.path.getmtime(file_name)
+    except OSError:
+        return None